@@ -0,0 +1,317 @@
+"""
+Compares throughput of `ScraperManager` (one manager and its pool of threads shared by all searches)
+and `AsyncScraperManager` (one event loop shared by all searches). Both search 30 stub websites served by a local
+HTTP server answering like wp-json and GeneralSearch APIs, with artificial latency.
+AsyncScraperManager's requests are sent by a non-blocking client and don't hold threads, so it has to serve
+the searches at least `--min-speedup` times faster than ScraperManager and start fewer threads.
+It also checks searches with a deadline shorter than latency of some websites - the slow websites have to be listed
+in response's 'incomplete' and the response mustn't be cached.
+The benchmark fails (exit code 1) if any of the checks fails.
+
+Usage (from the repository's root):
+    python benchmarks/async_manager_benchmark.py --searches 40 --concurrency 20 --latency 0.05
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "src")]
+
+# configured before the managers do it, so the benchmark doesn't write to 'sample.log'
+logging.basicConfig(level=logging.ERROR)
+
+from scrapers_manager import ScraperManager
+from async_scrapers_manager import AsyncScraperManager
+from src.base import CuisineType, IngrMatch, TagCache, SearchCache, Deadline, DeadlineExceeded, run_with_deadline, \
+    AsyncClientPool
+from src.base.base_scrapers import BaseScraper, WordPressScraper, TagsSearchingWordPressScraper, \
+    GeneralSearchScraper, AsyncBaseScraper
+
+N_WP_SITES = 10
+N_TAG_SITES = 15
+N_GENERAL_SEARCH_SITES = 5
+N_POSTS = 20
+
+N_SLOW_SITES = 2  # websites slower than the deadline of the checked search
+SLOW_LATENCY = 2.0
+SEARCH_DEADLINE = 0.5
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """ Answers every request like a website's API after `latency` seconds """
+    protocol_version = "HTTP/1.1"
+    latency = 0.05
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+
+        if url.path.endswith("/wp-json/wp/v2/tags"):
+            slugs = params.get("slug", [""])[0].split()
+            body = [{"id": n + 1, "slug": slug} for n, slug in enumerate(slugs)]
+        elif url.path.endswith("/wp-json/wp/v2/posts"):
+            body = [self.get_post(n) for n in range(N_POSTS)]
+        else:
+            body = {"items": [{"title": f"Recipe {n}", "itemUrl": f"/recipe-{n}", "categories": ["Main-dish"]}
+                              for n in range(N_POSTS)]}
+
+        content = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        try:
+            self.wfile.write(content)
+        except ConnectionError:
+            pass  # the client has stopped waiting, e.x. its search's deadline has passed
+
+    def get_post(self, n:int) -> dict:
+        return {"id": n + 1,
+                "title": {"rendered": f"Recipe {n}"},
+                "link": f"http://{self.headers['Host']}/recipe-{n}/",
+                "content": {"rendered": "<p>Tofu, pesto, makaron i pomidory.</p>"},
+                "tags": [1, 2],
+                "categories": [1]}
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(latency:float, port_queue) -> None:
+    """ Runs stub server - in a separate process, so its threads aren't counted as the managers' ones """
+    StubHandler.latency = latency
+    ThreadingHTTPServer.request_queue_size = 1024
+    server = ThreadingHTTPServer(("", 0), StubHandler)
+    server.daemon_threads = True
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def get_stub_scrapers(port:int) -> list:
+    """ Returns classes of 30 scrapers of stub websites, every one on its own loopback address like real hosts """
+    class StubWordPressScraper(WordPressScraper):
+        DIET = CuisineType.VEGAN
+
+        def meal_type_trans(self, meal_type:str=None) -> list or None:
+            return [1]
+
+    class StubTagsScraper(TagsSearchingWordPressScraper):
+        DIET = CuisineType.VEGAN
+
+        def meal_type_trans(self, meal_type:str=None) -> list or None:
+            return [1]
+
+    class StubGeneralSearchScraper(GeneralSearchScraper):
+        DIET = CuisineType.VEGAN
+
+        def get_data_from_response(self, web_response:str=None, ingrs:list=None, meal_types:list=None, *args, **kwargs):
+            for recipe in web_response["items"]:
+                yield self.recipe_data_to_dict(recipe["title"], self.WEB_URL + recipe["itemUrl"])
+
+        def meal_type_trans(self, meal_type:str=None) -> list or None:
+            return ["Main-dish"]
+
+    scrapers = []
+    hosts = (f"http://127.0.0.{n}:{port}" for n in range(2, 255))
+    for base, n_sites in [(StubWordPressScraper, N_WP_SITES), (StubTagsScraper, N_TAG_SITES),
+                          (StubGeneralSearchScraper, N_GENERAL_SEARCH_SITES)]:
+        for n in range(n_sites):
+            site_url = next(hosts)
+            attrs = {"NAME": f"{base.__name__} {n}", "WEB_URL": site_url,
+                     "REQUEST_URL": site_url + "/wp-json/wp/v2/posts?per_page=100",
+                     "TAG_URL": site_url + "/wp-json/wp/v2/tags?slug="}
+            if base is StubGeneralSearchScraper:
+                attrs["REQUEST_URL"] = site_url + "/api/search/GeneralSearch?q="
+            scrapers.append(type(f"{base.__name__}{n}", (base,), attrs))
+    return scrapers
+
+
+class PeakThreads:
+    """
+    Samples number of alive threads in the background and remembers the highest one and number of threads
+    started meanwhile (`started`) - threads left by the earlier runs aren't counted
+    """
+    def __init__(self):
+        self.start = threading.active_count()
+        self.peak = self.start
+        self.running = True
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+
+    def sample(self):
+        while self.running:
+            self.peak = max(self.peak, threading.active_count())
+            time.sleep(0.005)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.running = False
+        self.thread.join()
+
+    @property
+    def started(self) -> int:
+        return self.peak - self.start
+
+
+def run_threaded(scrapers:list, n_searches:int, concurrency:int, search:dict) -> int:
+    """ Runs searches concurrently in threads, using one ScraperManager (and its shared pool of threads) """
+    class StubScraperManager(ScraperManager):
+        def get_scrapers_classes(self, precise=False) -> list:
+            return scrapers
+
+    manager = StubScraperManager()
+
+    def one_search(_):
+        return manager.get_recipes(**dict(search))["number_of_recipes"]
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return sum(executor.map(one_search, range(n_searches)))
+
+
+def run_async(scrapers:list, n_searches:int, concurrency:int, search:dict) -> int:
+    """ Runs searches concurrently in one event loop, using one AsyncScraperManager """
+    class StubAsyncScraperManager(AsyncScraperManager):
+        def get_scrapers_classes(self, precise=False) -> list:
+            return scrapers
+
+    async def all_searches():
+        manager = StubAsyncScraperManager()
+        limit = asyncio.Semaphore(concurrency)
+
+        async def one_search():
+            async with limit:
+                response = await manager.get_recipes(**dict(search))
+                return response["number_of_recipes"]
+
+        return sum(await asyncio.gather(*[one_search() for _ in range(n_searches)]))
+
+    return asyncio.run(all_searches())
+
+
+def check_throughput(results:dict, min_speedup:float) -> list:
+    """ Returns problems - AsyncScraperManager has to be `min_speedup` times faster and start fewer threads """
+    threaded, async_ = results["ScraperManager"], results["AsyncScraperManager"]
+    problems = []
+    if async_["searches_per_second"] < threaded["searches_per_second"] * min_speedup:
+        problems.append(f"AsyncScraperManager - {async_['searches_per_second']:.2f} searches/s, expected at least "
+                        f"{min_speedup} times ScraperManager's {threaded['searches_per_second']:.2f}")
+    if async_["threads"] >= threaded["threads"]:
+        problems.append(f"AsyncScraperManager - started {async_['threads']} threads, "
+                        f"ScraperManager only {threaded['threads']}")
+    return problems
+
+
+def check_deadline(scrapers:list, search:dict) -> list:
+    """
+    Searches with SEARCH_DEADLINE by a slow scraper and both managers, the last N_SLOW_SITES scrapers are slower
+    than it. Returns problems - the slow scraper has to raise DeadlineExceeded instead of returning no recipes,
+    the slow websites have to be listed in 'incomplete' only, the rest of websites have to be searched
+    and the response mustn't be cached
+    """
+    class StubScraperManager(ScraperManager):
+        def get_scrapers_classes(self, precise=False) -> list:
+            return scrapers
+
+    class StubAsyncScraperManager(AsyncScraperManager):
+        def get_scrapers_classes(self, precise=False) -> list:
+            return scrapers
+
+    slow_names = {scraper.NAME for scraper in scrapers[-N_SLOW_SITES:]}
+    problems = []
+    slow_scraper = scrapers[-1]()
+    try:
+        run_with_deadline(Deadline(SEARCH_DEADLINE), slow_scraper.get_recipes, **search)
+        problems.append(f"{slow_scraper} - search which missed the deadline didn't raise DeadlineExceeded")
+    except DeadlineExceeded:
+        pass
+
+    for name, search_with_deadline in [
+        ("ScraperManager", lambda: StubScraperManager().get_recipes(**search, deadline=SEARCH_DEADLINE)),
+        ("AsyncScraperManager",
+         lambda: asyncio.run(StubAsyncScraperManager().get_recipes(**search, deadline=SEARCH_DEADLINE)))]:
+        ScraperManager.SEARCH_CACHE = SearchCache()
+        response = search_with_deadline()
+        searched_names = {web_recipes["web_name"] for web_recipes in response["recipes"]}
+
+        if set(response["incomplete"]) != slow_names:
+            problems.append(f"{name} - incomplete websites: {sorted(response['incomplete'])}, "
+                            f"expected: {sorted(slow_names)}")
+        if searched_names & slow_names:
+            problems.append(f"{name} - slow websites listed as searched: {sorted(searched_names & slow_names)}")
+        if ScraperManager.SEARCH_CACHE.entries:
+            problems.append(f"{name} - incomplete response has been cached")
+    ScraperManager.SEARCH_CACHE = None
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--searches", type=int, default=40, help="number of searches")
+    parser.add_argument("--concurrency", type=int, default=20, help="searches running at the same time")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub server's latency in seconds")
+    parser.add_argument("--max-requests", type=int, default=AsyncBaseScraper.MAX_REQUESTS,
+                        help="AsyncScraperManager's global limit of requests (and its connections)")
+    parser.add_argument("--min-speedup", type=float, default=1.0,
+                        help="AsyncScraperManager's searches/s have to be at least this times ScraperManager's ones")
+    args = parser.parse_args()
+
+    # every search has to reach the stub server
+    BaseScraper.RESPONSE_CACHE = None
+    BaseScraper.FRAGMENT_CACHE = None
+    BaseScraper.NEGATIVE_CACHE = None
+    ScraperManager.SEARCH_CACHE = None
+    TagsSearchingWordPressScraper.TAG_CACHE = TagCache(path=":memory:")
+
+    AsyncBaseScraper.MAX_REQUESTS = args.max_requests
+    AsyncBaseScraper.CLIENT_POOL = AsyncClientPool(max_connections=args.max_requests)
+
+    port_queue = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(args.latency, port_queue), daemon=True)
+    server.start()
+    slow_port_queue = multiprocessing.Queue()
+    slow_server = multiprocessing.Process(target=serve, args=(SLOW_LATENCY, slow_port_queue), daemon=True)
+    slow_server.start()
+
+    scrapers = get_stub_scrapers(port_queue.get())
+    # scrapers of both servers have the same names, the slow ones are taken from other kind of websites
+    slow_scrapers = get_stub_scrapers(slow_port_queue.get())[N_WP_SITES:N_WP_SITES + N_SLOW_SITES]
+    search = {"ingrs": ["tofu", "pesto", "makaron"], "ingrs_match": IngrMatch.PART}
+
+    results = {}
+    for name, runner in [("ScraperManager", run_threaded), ("AsyncScraperManager", run_async)]:
+        with PeakThreads() as threads:
+            start = time.perf_counter()
+            n_recipes = runner(scrapers, args.searches, args.concurrency, search)
+            taken_time = time.perf_counter() - start
+
+        results[name] = {"searches_per_second": args.searches / taken_time, "threads": threads.started}
+        print(f"{name:<26} {args.searches / taken_time:8.2f} searches/s  {taken_time:7.2f}s  "
+              f"started threads: {threads.started:4}  recipes: {n_recipes}")
+
+    problems = check_throughput(results, args.min_speedup)
+    problems += check_deadline(scrapers[:N_WP_SITES] + slow_scrapers, search)
+    server.terminate()
+    slow_server.terminate()
+    for problem in problems:
+        print(f"FAILED {problem}")
+    if problems:
+        sys.exit(1)
+    print(f"\nAsyncScraperManager is at least {args.min_speedup} times faster and starts fewer threads, "
+          f"slow websites are incomplete after the deadline of {SEARCH_DEADLINE}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Compares CPU time of checking if posts' content contains the ingredients - the old way (BeautifulSoup's parse
+and `get_text` of every post, then one scan per ingredient) and the new one (`html_to_text`
+and `IngredientMatcher`), as done by `WordPressScraper.get_recipe_from_response` for every post of a response.
+
+Posts are read from fixtures - wp-json responses saved as JSON files, e.x.
+    curl 'https://www.agamasmaka.pl/wp-json/wp/v2/posts?per_page=100' > benchmarks/fixtures/agamasmaka.json
+or, if no fixture is given, generated to look like recipes' posts.
+
+Usage (from the repository's root):
+    python benchmarks/ingredient_matching_benchmark.py --fixtures benchmarks/fixtures/*.json --repeat 5
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "src")]
+
+from bs4 import BeautifulSoup
+
+from src.base import html_to_text, get_ingredients_matcher
+
+INGREDIENTS = ["tofu", "pesto", "makaron", "pomidory", "cebula", "czosnek", "oliwa", "bazylia", "ryż", "soczewica",
+               "marchewka", "ciecierzyca", "kurkuma", "imbir", "mleko kokosowe", "szpinak", "kasza jaglana"]
+FILLER = ["przepis", "wegański", "bardzo", "smaczny", "prosty", "do", "zrobienia", "w", "domu", "minut", "łyżka",
+          "szklanka", "pokroić", "dodać", "gotować", "piec", "podawać", "z", "na", "&amp;", "&nbsp;"]
+SEARCHES = [["tofu"], ["tofu", "pesto"], ["mleko kokosowe", "kurkuma", "imbir"],
+            ["awokado", "seitan", "tempeh", "jarmuż", "kasza", "ryż", "tofu", "pesto", "szpinak", "imbir"]]
+
+
+def generate_posts(n_posts:int, seed:int=0) -> list:
+    """ Returns posts like wp-json's ones, with content of a few kilobytes of html """
+    rand = random.Random(seed)
+    posts = []
+    for n in range(n_posts):
+        paragraphs = []
+        for _ in range(rand.randint(10, 40)):
+            words = [rand.choice(INGREDIENTS if rand.random() < 0.1 else FILLER) for _ in range(rand.randint(5, 30))]
+            paragraphs.append(f'<p class="wp-block-paragraph"><strong>{words[0]}</strong> {" ".join(words[1:])}</p>')
+        content = "\n".join(paragraphs) + "\n<!-- wp:image --><figure><img src=\"x.jpg\" alt=\"tofu\"/></figure>"
+        posts.append({"id": n, "title": {"rendered": f"Przepis {n}"}, "link": f"https://example.com/{n}/",
+                      "content": {"rendered": content}})
+    return posts
+
+
+def read_fixtures(paths:list) -> list:
+    """ Returns posts of all fixtures """
+    posts = []
+    for path in paths:
+        with open(path, encoding="utf-8") as file:
+            posts.extend(json.load(file))
+    return posts
+
+
+def old_matching(posts:list, ingrs:list) -> list:
+    """ Returns posts' positions whose content contains all ingredients - BeautifulSoup's way """
+    matching = []
+    for position, post in enumerate(posts):
+        soup = BeautifulSoup(post["content"]["rendered"], features="html.parser").get_text().lower()
+        if all(ingr.lower() in soup for ingr in ingrs):
+            matching.append(position)
+    return matching
+
+
+def new_matching(posts:list, ingrs:list) -> list:
+    """ Returns posts' positions whose content contains all ingredients - `html_to_text` and `IngredientMatcher` """
+    matcher = get_ingredients_matcher(ingrs)
+    return [position for position, post in enumerate(posts)
+            if matcher.matches_all(html_to_text(post["content"]["rendered"]))]
+
+
+def measure(func, posts:list, repeat:int) -> (float, list):
+    """ Returns the best time of `repeat` runs of all searches and results of the last run """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [func(posts, ingrs) for ingrs in SEARCHES]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", nargs="*", default=[], help="wp-json responses (JSON lists of posts)")
+    parser.add_argument("--posts", type=int, default=100, help="number of generated posts if no fixture is given")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    posts = read_fixtures(args.fixtures) if args.fixtures else generate_posts(args.posts)
+    n_bytes = sum(len(post["content"]["rendered"].encode()) for post in posts)
+    print(f"{len(posts)} posts, {n_bytes / 1024:.0f} KiB of content, {len(SEARCHES)} searches\n")
+
+    texts_equal = all(html_to_text(post["content"]["rendered"]) ==
+                      BeautifulSoup(post["content"]["rendered"], features="html.parser").get_text().lower()
+                      for post in posts)
+
+    old_time, old_results = measure(old_matching, posts, args.repeat)
+    new_time, new_results = measure(new_matching, posts, args.repeat)
+
+    print(f"{'BeautifulSoup + scan per ingredient':<40}{old_time * 1000:>10.1f} ms")
+    print(f"{'html_to_text + IngredientMatcher':<40}{new_time * 1000:>10.1f} ms")
+    print(f"\nspeedup: {old_time / new_time:.1f}x, same texts: {texts_equal}, same results: {old_results == new_results}")
+
+
+if __name__ == "__main__":
+    main()
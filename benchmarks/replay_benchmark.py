@@ -0,0 +1,489 @@
+"""
+Measures parse path of every scraper of `scrapers_dict.scrapers_` offline. Website's responses are recorded once
+(wp-json arrays, HTML search pages, GeneralSearch JSON - whatever the scraper asks for) and saved as fixtures,
+then scraper's search is replayed through a stand-in transport serving them - no network, no caches.
+Calls of `get_data_from_response`, `get_recipe_from_response` and `clean_data` made during the replay are captured
+and run again, so their time, memory peak (tracemalloc) and recipes/second are measured on the real inputs.
+
+Results are written as JSON and may be compared with a baseline - the benchmark fails (exit code 1) if a method
+became slower than `--max-slowdown` times or returns other number of recipes, if a scraper has no fixture
+or if the baseline can't be read.
+
+The committed fixtures are representative ones, generated offline with `--synthesize` - responses shaped like
+the websites' ones (wp-json posts, tags, GeneralSearch JSON, search pages' HTML). Fixtures recorded with `--record`
+replace them. Times depend on the machine, so the baseline should be written on the machine it's compared on.
+
+Usage (from the repository's root):
+    python benchmarks/replay_benchmark.py --record  # needs network - saves benchmarks/fixtures/replay/*.json
+    python benchmarks/replay_benchmark.py --synthesize  # offline, the same with representative responses
+    python benchmarks/replay_benchmark.py --output benchmarks/replay_baseline.json
+    python benchmarks/replay_benchmark.py --baseline benchmarks/replay_baseline.json --max-slowdown 1.25
+"""
+import argparse
+import copy
+import json
+import logging
+import os
+import platform
+import re
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "src")]
+
+# configured before the scrapers do it, so the benchmark doesn't write to 'sample.log'
+logging.basicConfig(level=logging.ERROR)
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from scrapers_dict import scrapers_
+from src.base import IngrMatch, SessionPool, TagCache, IngredientsTranslator
+from src.base.base_scrapers import BaseScraper, TagsSearchingWordPressScraper
+from src.base.ingredients_dictionary import PL_EN_INGREDIENTS
+
+FIXTURES_DIR = os.path.join(ROOT, "benchmarks", "fixtures", "replay")
+MEASURED_METHODS = ["get_data_from_response", "get_recipe_from_response", "clean_data"]
+# headers which don't describe the recorded body (it's saved decoded) or aren't needed by the scrapers
+SKIPPED_HEADERS = ["content-encoding", "content-length", "transfer-encoding", "set-cookie", "connection"]
+
+
+class RecordingAdapter(HTTPAdapter):
+    """ Sends requests to the websites and saves every response """
+    def __init__(self, exchanges:list, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.exchanges = exchanges
+
+    def send(self, request, *args, **kwargs):
+        response = super().send(request, *args, **kwargs)
+        self.exchanges.append({"url": request.url,
+                               "status": response.status_code,
+                               "headers": {name: value for name, value in response.headers.items()
+                                           if name.lower() not in SKIPPED_HEADERS},
+                               "body": response.content.decode(response.encoding or "utf-8", errors="replace")})
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """ Answers requests with the recorded responses, 404 if the url hasn't been recorded """
+    def __init__(self, exchanges:list):
+        super().__init__()
+        self.exchanges = {exchange["url"]: exchange for exchange in exchanges}
+        self.missing_urls = []
+
+    def send(self, request, *args, **kwargs):
+        exchange = self.exchanges.get(request.url)
+        if exchange is None:
+            self.missing_urls.append(request.url)
+            exchange = {"status": 404, "headers": {}, "body": ""}
+
+        response = requests.Response()
+        response.status_code = exchange["status"]
+        response.headers = CaseInsensitiveDict(exchange["headers"])
+        response._content = exchange["body"].encode("utf-8")
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class SyntheticAdapter(BaseAdapter):
+    """
+    Answers requests of the scraper with representative responses, the way its website would - wp-json posts
+    (SYNTHETIC_WP_PAGES pages of SYNTHETIC_POSTS posts), tags, GeneralSearch JSON or HTML of a search page
+    (see SYNTHETIC_HTML) about the searched words. Responses are saved like the recorded ones
+    """
+    def __init__(self, scraper, words:list, exchanges:list):
+        super().__init__()
+        self.scraper = scraper
+        self.words = words
+        self.exchanges = exchanges
+
+    def send(self, request, *args, **kwargs):
+        status, headers, body = self.get_response(request.url)
+        self.exchanges.append({"url": request.url, "status": status, "headers": headers, "body": body})
+
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = body.encode("utf-8")
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+    def get_response(self, url:str) -> (int, dict, str):
+        """ Returns status, headers and body of the response to the url """
+        tag_url = getattr(self.scraper, "TAG_URL", None)
+        if tag_url is not None and url.startswith(tag_url):
+            slugs = unquote(url[len(tag_url):]).split("+")
+            return 200, {"Content-Type": "application/json"}, json.dumps(get_synthetic_tags(slugs))
+
+        if "/wp-json/" in url:
+            query = parse_qs(urlsplit(url).query)
+            posts = get_synthetic_posts(self.scraper, self.words, url, int(query.get("page", ["1"])[0]))
+            if "_fields" in query:
+                fields = query["_fields"][0].split(",")
+                posts = [{field: value for field, value in post.items() if field in fields} for post in posts]
+            return 200, {"Content-Type": "application/json", "X-WP-TotalPages": str(SYNTHETIC_WP_PAGES)}, \
+                json.dumps(posts, ensure_ascii=False)
+
+        if "/api/search/GeneralSearch" in url:
+            return 200, {"Content-Type": "application/json"}, json.dumps(get_synthetic_items(self.words))
+
+        page = re.search(r"/page/(\d+)/", url)
+        n_page = int(page.group(1)) if page else 1
+        if n_page > SYNTHETIC_HTML_PAGES:
+            return 404, {"Content-Type": "text/html"}, ""
+        return 200, {"Content-Type": "text/html; charset=utf-8"}, get_synthetic_html(self.scraper, self.words, n_page)
+
+
+SYNTHETIC_WP_PAGES = 2
+SYNTHETIC_HTML_PAGES = 2
+SYNTHETIC_POSTS = 40
+SYNTHETIC_TAGS_IDS = 1000  # id of the first requested tag, the next ones have the next ids
+# filler of posts' content and pages - descriptions, steps, navigation
+SYNTHETIC_TEXT = "Wymieszaj wszystkie składniki, dopraw solą i pieprzem, a potem piecz 20 minut w 180 stopniach. "
+SYNTHETIC_NAV = "<li class=\"menu-item\"><a href=\"{url}/kategoria/{n}/\">Kategoria {n}</a></li>"
+# html of search page's recipe (`item`) and the recipes' container (`page`) of every html scraper
+SYNTHETIC_HTML = {
+    "JadlonomiaScraper": ('<div class="clear row">{items}</div>',
+                          '<div class="text absolute"><h2><a href="{link}">{title}</a></h2></div>'),
+    "WeganonScraper": ('<div class="row">{items}</div>',
+                       '<div class="fix-special"><h3 class="item-title"><a href="{link}" title="{title}">{title}</a>'
+                       '</h3></div>'),
+    "VeganbandaScraper": ('<div class="recipe-grid">{items}</div>',
+                          '<div class="item-content"><h3 class="item-title"><a href="{link}">{title}</a></h3></div>'),
+    "EkspresjaSmakuScraper": ('<div class="sp-grid col3">{items}</div>',
+                              '<div class="post-header"><span class="cat">Obiad, Wegańskie</span>'
+                              '<h2 class="entry-title"><a href="{link}">{title}</a></h2></div>'),
+    "WegannerdScraper": ('<div id="Blog1">{items}</div>',
+                         '<h3 class="post-title entry-title"><a href="{link}">{title}</a></h3>'),
+    "TrueTasteHuntersScraper": ('<div id="Blog1">{items}</div>',
+                                '<h3 class="post-title entry-title"><a href="{link}">{title}</a></h3>'),
+    "WegankaScraper": ('<div class="blog-posts hfeed container">{items}</div>',
+                       '<h3 class="post-title entry-title"><a href="{link}">{title}</a></h3>'),
+}
+
+
+def get_synthetic_tags(slugs:list) -> list:
+    """ Returns wp-json's tags of the slugs """
+    return [{"id": SYNTHETIC_TAGS_IDS + n, "slug": slug} for n, slug in enumerate(slugs)]
+
+
+def get_synthetic_taxonomies(scraper) -> (list, list, list):
+    """ Returns ids the scraper checks posts for - (required categories, excluded categories, required tags) """
+    required, excluded, tags = [], [], []
+    for name in dir(scraper):
+        value = getattr(scraper, name)
+        if name.isupper() and ("CATEGOR" in name or name.endswith("_ID")):
+            ids = [taxonomy_id for taxonomy_id in (value if isinstance(value, list) else [value])
+                   if isinstance(taxonomy_id, int)]
+            (excluded if "EXCLU" in name else tags if "TAG" in name else required).extend(ids)
+    return required or [1], excluded or [2], tags
+
+
+def get_synthetic_posts(scraper, words:list, url:str, n_page:int) -> list:
+    """
+    Returns wp-json's posts of the url's page - a third of them has all searched words in the content and a third
+    only one of them, a quarter of them is in an excluded category and half of them has one of the tags only
+    """
+    required_categories, excluded_categories, required_tags = get_synthetic_taxonomies(scraper)
+    tags = [SYNTHETIC_TAGS_IDS, SYNTHETIC_TAGS_IDS + 1]
+    tags_name = getattr(scraper, "tags_name", "tags")
+    # posts found by other ingredients partly overlap
+    first_id = (n_page - 1) * SYNTHETIC_POSTS + sum(map(ord, urlsplit(url).query)) % (SYNTHETIC_POSTS // 2)
+
+    posts = []
+    for post_id in range(first_id, first_id + SYNTHETIC_POSTS):
+        content_words = [" i ".join(words), "warzywa", words[post_id % len(words)]][post_id % 3]
+        content = "".join(f"<p>{SYNTHETIC_TEXT}{content_words}.</p>" for _ in range(4 + post_id % 8))
+        posts.append({"id": post_id,
+                      "title": {"rendered": f"Przepis {post_id} &#8211; {content_words}"},
+                      "link": f"{scraper.WEB_URL}/przepis-{post_id}/",
+                      "categories": required_categories if post_id % 4 else
+                                    [required_categories[0], excluded_categories[post_id % len(excluded_categories)]],
+                      tags_name: tags if post_id % 2 else tags[:1],
+                      "content": {"rendered": content, "protected": False}})
+        posts[-1]["tags"] = required_tags + posts[-1][tags_name]
+    return posts
+
+
+def get_synthetic_items(words:list) -> dict:
+    """ Returns GeneralSearch's JSON of recipes about the words """
+    return {"items": [{"title": f"{' '.join(words).title()} Recipe {n}",
+                       "urlId": f"recipe-{n}",
+                       "itemUrl": f"/blog/recipe-{n}",
+                       "categories": ["mains", "Main-dish"] if n % 2 else ["breakfast", "Breakfast"]}
+                      for n in range(SYNTHETIC_POSTS)]}
+
+
+def get_synthetic_html(scraper, words:list, n_page:int) -> str:
+    """ Returns search page of the html scraper - its recipes in the page's layout, among the navigation """
+    page, item = SYNTHETIC_HTML[type(scraper).__name__]
+    words = " ".join(words)
+    first = (n_page - 1) * SYNTHETIC_POSTS
+    items = "".join(item.format(link=f"{scraper.WEB_URL}/przepis-{n}/", title=f"Przepis {n} - {words}")
+                    for n in range(first, first + SYNTHETIC_POSTS))
+    nav = "".join(SYNTHETIC_NAV.format(url=scraper.WEB_URL, n=n) for n in range(60))
+    return (f"<html><head><title>{words}</title></head><body><ul class=\"menu\">{nav}</ul>"
+            f"{page.format(items=items)}<footer><p>{SYNTHETIC_TEXT * 10}</p></footer></body></html>")
+
+
+class StandInSessionPool(SessionPool):
+    """ SessionPool whose sessions send all requests through the given adapter """
+    def __init__(self, adapter:BaseAdapter):
+        super().__init__()
+        self.adapter = adapter
+
+    def create_session(self) -> requests.Session:
+        session = requests.Session()
+        session.mount("http://", self.adapter)
+        session.mount("https://", self.adapter)
+        return session
+
+
+def use_transport(adapter:BaseAdapter, translator:IngredientsTranslator) -> None:
+    """ Makes all scrapers send requests through the adapter, without responses', fragments' and tags' caches """
+    BaseScraper.SESSION_POOL = StandInSessionPool(adapter)
+    BaseScraper.RESPONSE_CACHE = None
+    BaseScraper.FRAGMENT_CACHE = None
+    BaseScraper.TRANSLATOR = translator
+    TagsSearchingWordPressScraper.TAG_CACHE = TagCache(path=":memory:")
+
+
+def get_fixture_path(fixtures_dir:str, scraper_class) -> str:
+    return os.path.join(fixtures_dir, f"{scraper_class.__name__}.json")
+
+
+def record(scraper_class, search:dict, fixtures_dir:str) -> dict:
+    """ Searches the website and saves its responses (and translations of the ingredients) as scraper's fixture """
+    exchanges = []
+    translator = IngredientsTranslator()
+    translations = dict(zip([translator.normalize(ingr) for ingr in search["ingrs"]],
+                            translator.translate(search["ingrs"])))
+    use_transport(RecordingAdapter(exchanges), translator)
+
+    data = scraper_class().get_recipes(**search)
+    fixture = {"scraper": scraper_class.NAME,
+               "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+               "search": search,
+               "translations": translations,
+               "n_recipes": data["n_recipes"],
+               "exchanges": exchanges}
+    save_fixture(scraper_class, fixture, fixtures_dir)
+    return fixture
+
+
+def synthesize(scraper_class, search:dict, fixtures_dir:str) -> dict:
+    """ Searches the website's stand-in (see `SyntheticAdapter`) and saves its responses as scraper's fixture """
+    exchanges = []
+    translator = IngredientsTranslator(path=":memory:")
+    translations = {word: PL_EN_INGREDIENTS.get(word, word)
+                    for word in [translator.normalize(ingr) for ingr in search["ingrs"]]}
+
+    words = list(dict.fromkeys([*translations, *translations.values()]))  # english websites are searched in english
+    scraper = scraper_class()
+    use_transport(SyntheticAdapter(scraper, words, exchanges),
+                  IngredientsTranslator(path=":memory:", dictionary={**PL_EN_INGREDIENTS, **translations}))
+    data = scraper.get_recipes(**search)
+    fixture = {"scraper": scraper_class.NAME,
+               "synthetic": True,
+               "search": search,
+               "translations": translations,
+               "n_recipes": data["n_recipes"],
+               "exchanges": exchanges}
+    save_fixture(scraper_class, fixture, fixtures_dir)
+    return fixture
+
+
+def save_fixture(scraper_class, fixture:dict, fixtures_dir:str) -> None:
+    os.makedirs(fixtures_dir, exist_ok=True)
+    with open(get_fixture_path(fixtures_dir, scraper_class), "w", encoding="utf-8") as file:
+        json.dump(fixture, file, ensure_ascii=False, indent=1)
+
+
+def capture_calls(scraper, calls:dict) -> None:
+    """ Replaces scraper's measured methods with the ones saving their arguments in `calls` """
+    for name in MEASURED_METHODS:
+        method = getattr(scraper, name, None)
+        if method is None:
+            continue
+
+        def capturing(*args, _method=method, _calls=calls.setdefault(name, []), **kwargs):
+            # clean_data changes the data, so it's measured on copies of the original one
+            _calls.append(copy.deepcopy((args, kwargs)))
+            return _method(*args, **kwargs)
+        setattr(scraper, name, capturing)
+
+
+def count_recipes(result) -> int:
+    """ Returns number of recipes returned by a measured method """
+    if result is None:
+        return 0
+    if isinstance(result, dict):
+        return len(result["recipes"]) if "recipes" in result else 1
+    return len(list(result))
+
+
+def measure_calls(method, calls:list, repeat:int) -> dict:
+    """ Returns time (the best of `repeat` runs of all calls), memory peak and recipes/second of the method """
+    best = None
+    n_recipes = 0
+    for _ in range(repeat):
+        calls_ = copy.deepcopy(calls)
+        start = time.perf_counter()
+        n_recipes = sum(count_recipes(method(*args, **kwargs)) for args, kwargs in calls_)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    calls_ = copy.deepcopy(calls)
+    tracemalloc.start()
+    for args, kwargs in calls_:
+        count_recipes(method(*args, **kwargs))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {"calls": len(calls),
+            "seconds": best,
+            "recipes": n_recipes,
+            "recipes_per_second": n_recipes / best if best else None,
+            "peak_kib": round(peak / 1024, 1)}
+
+
+def replay(scraper_class, fixture:dict, repeat:int) -> dict:
+    """ Replays scraper's search from the fixture and measures its parse methods """
+    adapter = ReplayAdapter(fixture["exchanges"])
+    translator = IngredientsTranslator(path=":memory:", dictionary={**PL_EN_INGREDIENTS, **fixture["translations"]})
+    use_transport(adapter, translator)
+
+    scraper = scraper_class()
+    calls = {}
+    capture_calls(scraper, calls)
+
+    start = time.perf_counter()
+    data = scraper.get_recipes(**fixture["search"])
+    replay_seconds = time.perf_counter() - start
+
+    measured = scraper_class()  # without capturing wrappers
+    methods = {name: measure_calls(getattr(measured, name), method_calls, repeat)
+               for name, method_calls in calls.items() if method_calls}
+
+    return {"fixture": os.path.basename(get_fixture_path("", scraper_class)),
+            "replay_seconds": replay_seconds,
+            "n_recipes": data["n_recipes"],
+            "recorded_n_recipes": fixture["n_recipes"],
+            "n_responses": len(fixture["exchanges"]),
+            "missing_urls": adapter.missing_urls,
+            "methods": methods}
+
+
+def compare(results:dict, baseline:dict, max_slowdown:float, min_slowdown_ms:float=0) -> list:
+    """
+    Returns descriptions of regressions - methods slower than `max_slowdown` times (and more than `min_slowdown_ms`,
+    so the noise of the fastest ones isn't reported) or with other results
+    """
+    regressions = []
+    for name, scraper in results["scrapers"].items():
+        base_scraper = baseline["scrapers"].get(name)
+        if base_scraper is None:
+            continue
+
+        for method, measurement in scraper["methods"].items():
+            base = base_scraper["methods"].get(method)
+            if base is None:
+                continue
+            if measurement["recipes"] != base["recipes"]:
+                regressions.append(f"{name}.{method}: {measurement['recipes']} recipes, "
+                                   f"baseline: {base['recipes']}")
+            elif base["seconds"] and measurement["seconds"] / base["seconds"] > max_slowdown \
+                    and (measurement["seconds"] - base["seconds"]) * 1000 > min_slowdown_ms:
+                regressions.append(f"{name}.{method}: {measurement['seconds'] / base['seconds']:.2f}x slower "
+                                   f"({base['seconds'] * 1000:.2f} ms -> {measurement['seconds'] * 1000:.2f} ms)")
+    return regressions
+
+
+def print_results(results:dict) -> None:
+    print(f"{'scraper':<28}{'method':<28}{'calls':>7}{'ms':>10}{'recipes/s':>12}{'peak KiB':>10}")
+    for name, scraper in results["scrapers"].items():
+        for method, measurement in scraper["methods"].items():
+            per_second = measurement["recipes_per_second"]
+            print(f"{name:<28}{method:<28}{measurement['calls']:>7}{measurement['seconds'] * 1000:>10.2f}"
+                  f"{per_second if per_second is not None else 0:>12.0f}{measurement['peak_kib']:>10.1f}")
+        if scraper["missing_urls"]:
+            print(f"{name:<28}requests not in the fixture: {len(scraper['missing_urls'])}")
+    if results["skipped"]:
+        print(f"\nwithout fixtures (write them with --record or --synthesize): {', '.join(results['skipped'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--record", action="store_true", help="record fixtures from the websites (needs network)")
+    parser.add_argument("--synthesize", action="store_true", help="write representative fixtures (offline)")
+    parser.add_argument("--scrapers", nargs="*", default=None, help="names of scrapers, all if not given")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="directory of fixtures")
+    parser.add_argument("--ingrs", nargs="*", default=["tofu", "pomidory"], help="ingredients of recorded search")
+    parser.add_argument("--meal-types", nargs="*", default=None, help="meal types of recorded search")
+    parser.add_argument("--ingrs-match", default=IngrMatch.PART, choices=IngrMatch.show_variables())
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="file the results are written to (JSON)")
+    parser.add_argument("--baseline", help="results (JSON) the new ones are compared with")
+    parser.add_argument("--max-slowdown", type=float, default=1.25)
+    parser.add_argument("--min-slowdown-ms", type=float, default=1.0, help="smaller slowdowns aren't regressions")
+    args = parser.parse_args()
+
+    scrapers = {name: scraper_class for name, scraper_class in scrapers_.items()
+                if args.scrapers is None or name in args.scrapers}
+
+    if args.record or args.synthesize:
+        search = {"ingrs": args.ingrs, "meal_types": args.meal_types, "ingrs_match": args.ingrs_match}
+        for name, scraper_class in scrapers.items():
+            fixture = (record if args.record else synthesize)(scraper_class, search, args.fixtures)
+            print(f"{name:<28}{len(fixture['exchanges']):>4} responses, {fixture['n_recipes']:>4} recipes")
+        return
+
+    results = {"python": platform.python_version(), "repeat": args.repeat, "scrapers": {}, "skipped": []}
+    for name, scraper_class in scrapers.items():
+        path = get_fixture_path(args.fixtures, scraper_class)
+        if not os.path.exists(path):
+            results["skipped"].append(name)
+            continue
+        with open(path, encoding="utf-8") as file:
+            results["scrapers"][name] = replay(scraper_class, json.load(file), args.repeat)
+
+    print_results(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, ensure_ascii=False, indent=1)
+
+    if results["skipped"]:
+        sys.exit(1)
+
+    if args.baseline:
+        try:
+            with open(args.baseline, encoding="utf-8") as file:
+                baseline = json.load(file)
+        except (OSError, ValueError) as error:
+            print(f"\nbaseline {args.baseline} can't be read: {error}")
+            sys.exit(1)
+
+        regressions = compare(results, baseline, args.max_slowdown, args.min_slowdown_ms)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("\nno regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import asyncio
+import copy
+import logging
+
+from scrapers_manager import ScraperManager
+from src.base import Deadline, DeadlineExceeded, set_deadline
+from src.base.base_scrapers import get_async_scraper_class
+
+
+class AsyncScraperManager(ScraperManager):
+    """
+    Manager searching all websites in one event loop, for applications which are asyncio-based themselves.
+    Requests are sent by a non-blocking client and don't hold threads (see `AsyncBaseScraper`), so under load
+    it serves more searches than ScraperManager with fewer threads (see benchmarks/async_manager_benchmark.py).
+    It keeps no state of a search, so one instance can serve many searches at the same time:
+
+        sm = AsyncScraperManager(precise=False)
+        recipes = await sm.get_recipes(ingrs=ingrs, meal_types=types, ingrs_match=IngrMatch.PART)
+    """
+    def __init__(self, precise=False):
+        super().__init__(precise)
+        self.refresh_tasks = set()  # background refreshes of the cached searches
+
+    def create_scraper(self, scraper_class):
+        """ Returns instance of async version of the scraper """
+        return get_async_scraper_class(scraper_class)()
+
+    async def get_recipes(self, *args, **kwargs):
+        """ Returns get_recipes coroutine's result, running the program or raises an exception """
+        try:
+            return await self.perform_get_recipes(*args, **kwargs)
+        except Exception:
+            logging.exception("")
+
+    async def perform_get_recipes(self, *args, **kwargs):
+        """ Main coroutine managing scrapers and returning info about found recipes """
+        manager_response = None
+        async for manager_response in self.iter_recipes(*args, **kwargs):
+            pass  # the last yielded value is the manager's response
+        return manager_response
+
+    async def iter_recipes(self, *args, deadline:float=None, limit:int=None, rank_by:str=None, **kwargs):
+        """
+        Async generator managing scrapers - yields website's recipes as soon as the website is searched,
+        in order of finishing. The last yielded value is manager's response with all recipes, the same as
+        `ScraperManager.iter_recipes` does:
+
+            async for recipes in sm.iter_recipes(ingrs=ingrs, meal_types=types, ingrs_match=IngrMatch.PART):
+                ...
+        """
+
+        kwargs, manager_response, search_key, ready_response = self.start_search(args, kwargs, limit, rank_by)
+        if ready_response is not None:
+            for web_recipes in self.iter_cached_response(ready_response):
+                yield web_recipes
+            return
+
+        async for web_recipes in self.iter_search(args, kwargs, manager_response, deadline, limit, rank_by, search_key):
+            yield web_recipes
+
+    async def iter_search(self, args:tuple, kwargs:dict, manager_response:dict, deadline:float=None,
+                          limit:int=None, rank_by:str=None, search_key:tuple=None):
+        """ Searches the websites with validated params, yields like `iter_recipes` and caches complete response """
+        search = self.get_search_state(kwargs, limit, rank_by)
+        search_deadline = Deadline(deadline) if deadline is not None else None
+        async for web_recipes in self.iter_scrapers_recipes(self.scrapers, args, kwargs, search_deadline):
+            yield self.add_web_recipes(search, web_recipes)
+        yield self.finish_search(search, manager_response, search_key)
+
+    def refresh_in_background(self, search_key:tuple, args:tuple, kwargs:dict, limit:int=None, rank_by:str=None) -> None:
+        """ Searches again in a background task and saves the new response in the search cache """
+        task = asyncio.ensure_future(self.refresh_search(search_key, args, copy.deepcopy(kwargs), limit, rank_by))
+        self.refresh_tasks.add(task)  # the event loop keeps only weak references to tasks
+        task.add_done_callback(self.refresh_tasks.discard)
+
+    async def refresh_search(self, search_key:tuple, args:tuple, kwargs:dict, limit:int=None, rank_by:str=None) -> None:
+        try:
+            async for _ in self.iter_search(args, kwargs, self.get_empty_response(), None, limit, rank_by, search_key):
+                pass
+        except Exception:
+            logging.exception("Refresh of the cached search failed")
+        finally:
+            self.SEARCH_CACHE.end_refresh(search_key)
+
+    async def manage_many_scrapers_at_once(self, scrapers=None, args:tuple=(), kwargs:dict=None) -> list:
+        """ Runs searches of all scrapers concurrently """
+        recipes = [web_recipes async for web_recipes in self.iter_scrapers_recipes(scrapers, args, kwargs)]
+        logging.debug("All scrapers finished")
+        return recipes
+
+    async def iter_scrapers_recipes(self, scrapers=None, args:tuple=(), kwargs:dict=None, deadline:Deadline=None):
+        """
+        Runs searches of all scrapers concurrently and yields their recipes in order of finishing.
+        Searches which haven't finished before the deadline are cancelled, they and the ones which missed
+        the deadline (raised DeadlineExceeded) aren't yielded, so they're listed in response's 'incomplete'
+        """
+        kwargs = kwargs or {}
+        scrapers, empty_webs_recipes = self.split_known_empty(scrapers, args, kwargs)
+        # every task runs in its own copy of the context, so the deadline is seen only by this search's requests
+        tasks = [asyncio.ensure_future(self.search_with_deadline(scraper, deadline, args, kwargs))
+                 for scraper in scrapers]
+        timeout = deadline.remaining() if deadline is not None else None
+        try:
+            for task in asyncio.as_completed(tasks, timeout=timeout):
+                try:
+                    web_recipes = await task
+                except DeadlineExceeded:
+                    continue
+                logging.debug(f"{web_recipes['web_name']} - recipes have been added")
+                yield web_recipes
+        except asyncio.TimeoutError:
+            logging.debug("Search's deadline has passed")
+        finally:
+            for task in tasks:
+                task.cancel()  # the caller stopped reading or the deadline has passed
+        for web_recipes in empty_webs_recipes:
+            yield web_recipes
+
+    async def search_with_deadline(self, scraper, deadline:Deadline, args:tuple, kwargs:dict) -> dict:
+        """ Returns scraper's recipes, setting the search's deadline for its requests """
+        set_deadline(deadline)  # the task has its own copy of the context, the caller's one isn't changed
+        return await scraper.get_recipes(*args, **kwargs)
@@ -1,6 +1,27 @@
 """
-Imports all base classes, methods and strings from params_validator and utils.
+Imports all base classes, methods and strings from params_validator, utils, session_pool, tag_cache, translator,
+response_cache, deadline,
+text_matching, ranking, metrics,
+site_health, single_flight,
+search_cache, fragment_cache,
+negative_cache, parse_pool, pages_budget and async_client_pool.
 """
 
 from src.base.params_validator import ParamsValidator
 from src.base.utils import *
+from src.base.session_pool import SessionPool
+from src.base.tag_cache import TagCache
+from src.base.translator import IngredientsTranslator
+from src.base.response_cache import ResponseCache
+from src.base.deadline import Deadline, DeadlineExceeded, get_deadline, set_deadline, run_with_deadline
+from src.base.text_matching import IngredientMatcher, html_to_text, get_ingredients_matcher
+from src.base.ranking import TopRecipes
+from src.base.metrics import MetricsRegistry, SearchMetrics, METRICS
+from src.base.site_health import HealthTracker, CircuitState
+from src.base.single_flight import SingleFlight, AsyncSingleFlight, SharedCallFailed
+from src.base.search_cache import SearchCache
+from src.base.fragment_cache import FragmentCache
+from src.base.negative_cache import NegativeCache
+from src.base.parse_pool import ParsePool
+from src.base.pages_budget import PagesBudget
+from src.base.async_client_pool import AsyncClientPool, to_requests_response
@@ -0,0 +1,72 @@
+import asyncio
+import weakref
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from src.base.utils import ASYNC_MAX_REQUESTS, POOL_MAXSIZE
+
+
+class AsyncClientPool:
+    """
+    Keeps one pooled, keep-alive `httpx.AsyncClient` per event loop, so requests of all async searches
+    of the loop reuse already opened connections - within one search and between searches.
+    Limits of requests sent to one host at the same time are kept per loop too - asyncio objects
+    can be used only by the loop they were created in.
+    """
+    def __init__(self, max_connections:int=ASYNC_MAX_REQUESTS, host_max_requests:int=POOL_MAXSIZE):
+        self.max_connections = max_connections  # max number of connections opened by the loop's client
+        self.host_max_requests = host_max_requests  # max number of requests sent at once to one host
+
+        self.loops = weakref.WeakKeyDictionary()  # loop: (its client, {host: its limit})
+
+    def get_loop_pool(self) -> tuple:
+        """ Returns client and hosts' limits of the running loop, creates them with the loop's first request """
+        loop = asyncio.get_running_loop()
+        pool = self.loops.get(loop)
+        if pool is None:
+            limits = httpx.Limits(max_connections=self.max_connections,
+                                  max_keepalive_connections=self.max_connections)
+            pool = (httpx.AsyncClient(limits=limits, follow_redirects=True), {})
+            self.loops[loop] = pool
+        return pool
+
+    def get_client(self) -> httpx.AsyncClient:
+        """ Returns client of the running loop """
+        return self.get_loop_pool()[0]
+
+    def get_host_limit(self, url:str) -> asyncio.Semaphore:
+        """ Returns semaphore limiting number of requests sent to the url's host at the same time by the loop """
+        hosts_limits = self.get_loop_pool()[1]
+        host = self.get_host(url)
+        limit = hosts_limits.get(host)
+        if limit is None:
+            limit = asyncio.Semaphore(self.host_max_requests)
+            hosts_limits[host] = limit
+        return limit
+
+    def get_host(self, url:str) -> str:
+        """ Returns scheme and host of the url, e.x. 'https://www.jadlonomia.com' """
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}".lower()
+
+    async def close(self) -> None:
+        """ Closes client of the running loop and its connections """
+        pool = self.loops.pop(asyncio.get_running_loop(), None)
+        if pool is not None:
+            await pool[0].aclose()
+
+
+def to_requests_response(response:httpx.Response) -> requests.models.Response:
+    """ Returns response made of httpx' one, the same as the one returned by requests """
+    requests_response = requests.models.Response()
+    requests_response.url = str(response.url)
+    requests_response.status_code = response.status_code
+    requests_response.headers = CaseInsensitiveDict(response.headers)
+    requests_response._content = response.content
+    requests_response.encoding = get_encoding_from_headers(requests_response.headers)
+    requests_response.elapsed = response.elapsed
+    return requests_response
@@ -1,8 +1,10 @@
 """
-Imports all base scrapers used in the project.
+Imports all base scrapers used in the project and their async versions.
 """
 
 from src.base.base_scrapers.base_scraper import BaseScraper
 from src.base.base_scrapers.base_general_search_scraper import GeneralSearchScraper
 from src.base.base_scrapers.base_wp_scraper import WordPressScraper
 from src.base.base_scrapers.base_tag_wp_scraper import TagsSearchingWordPressScraper
+from src.base.base_scrapers.base_async_scrapers import AsyncBaseScraper, AsyncWordPressScraper, \
+    AsyncTagsSearchingWordPressScraper, AsyncGeneralSearchScraper, get_async_scraper_class
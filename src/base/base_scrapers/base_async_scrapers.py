@@ -0,0 +1,465 @@
+import asyncio
+import contextvars
+import logging
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import httpx
+import requests
+
+from src.base import IngrMatch, DeadlineExceeded, get_deadline, AsyncClientPool, AsyncSingleFlight, SharedCallFailed, \
+    to_requests_response, REQUEST_FAILED_MSG, ASYNC_MAX_REQUESTS, ASYNC_IO_WORKERS
+from src.base.base_scrapers.base_scraper import BaseScraper, _failed_requests
+from src.base.base_scrapers.base_wp_scraper import WordPressScraper
+from src.base.base_scrapers.base_tag_wp_scraper import TagsSearchingWordPressScraper
+from src.base.base_scrapers.base_general_search_scraper import GeneralSearchScraper
+
+
+# requests' limits of running event loops - asyncio.Semaphore can be used only by the loop it was created in
+_requests_limits = weakref.WeakKeyDictionary()
+
+
+def get_requests_limit(max_requests:int=ASYNC_MAX_REQUESTS) -> asyncio.Semaphore:
+    """ Returns semaphore limiting number of requests sent at the same time by all searches of the running loop """
+    loop = asyncio.get_running_loop()
+    limit = _requests_limits.get(loop)
+    if limit is None:
+        limit = asyncio.Semaphore(max_requests)
+        _requests_limits[loop] = limit
+    return limit
+
+
+class AsyncBaseScraper:
+    """
+    Mixin turning scraper's search into a coroutine. It has to be put before the scraper's class in bases,
+    e.x. `class AsyncWegepediaScraper(AsyncTagsSearchingWordPressScraper, WegepediaScraper)`.
+
+    Requests are sent by the non-blocking httpx client of the event loop (`CLIENT_POOL`), so a request in flight
+    holds no thread. Every request is awaited under one limit shared by all searches of the loop (`MAX_REQUESTS`)
+    and its host's limit. Requests go through the same response cache, deadline, metrics and website's health
+    as the sync scrapers' ones and return the same `requests` responses, identical ones sent at once by the loop's
+    searches are coalesced (`ASYNC_SINGLE_FLIGHT`, None turns it off).
+    The rest of blocking calls (googletrans translations of english websites) is offloaded to one executor shared
+    by the whole process (`IO_EXECUTOR`). Scrapers which don't have an async version of their search
+    run their `perform_get_recipes` in the executor, holding one request's place.
+    """
+    MAX_REQUESTS = ASYNC_MAX_REQUESTS
+    IO_EXECUTOR = ThreadPoolExecutor(max_workers=ASYNC_IO_WORKERS, thread_name_prefix="async-scrapers-io")
+    CLIENT_POOL = AsyncClientPool()  # shared by all async scrapers, one pooled client per event loop
+    ASYNC_SINGLE_FLIGHT = AsyncSingleFlight()  # shared by all async scrapers, see SINGLE_FLIGHT
+
+    async def get_recipes(self, ingrs:list, meal_types:list=None, ingrs_match:str=IngrMatch.FULL) -> dict:
+        """
+        Main coroutine, returns recipes which fulfill the conditions
+        or an empty website's dictionary.
+        Raises DeadlineExceeded if the search's deadline has passed before the website was searched
+        """
+        if not self.is_available():
+            return self.data_to_dict([])
+
+        start = time.perf_counter()
+        failed_requests = []
+        token = _failed_requests.set(failed_requests)
+        try:
+            data = await self.async_perform_get_recipes(ingrs, meal_types, ingrs_match)
+            self.add_empty_search(data, failed_requests, ingrs, meal_types)
+        except DeadlineExceeded:
+            # not an empty result - the manager lists the website in response's 'incomplete'
+            logging.warning(f"{self} missed the search's deadline")
+            self.METRICS.timeouts.inc(scraper=self.NAME, kind="deadline")
+            raise
+        except Exception:
+            logging.error(f"Problem with: {self}")
+            self.METRICS.errors.inc(scraper=self.NAME, kind="search")
+            data = self.data_to_dict([])
+        finally:
+            _failed_requests.reset(token)
+        self.add_search_metrics(data, start)
+        return data
+
+    async def async_perform_get_recipes(self, ingrs:list, meal_types:list=None, ingrs_match:str=IngrMatch.FULL) -> dict:
+        """ Returns recipes which fulfill the conditions, by default runs sync search in the executor """
+        async with get_requests_limit(self.MAX_REQUESTS):
+            return await self.run_in_executor(self.perform_get_recipes, ingrs, meal_types, ingrs_match)
+
+    def __reduce__(self):
+        """ Async classes are made at runtime, so the scraper is sent to parse workers as its sync class' name """
+        sync_class = next(base for base in type(self).__bases__ if not issubclass(base, AsyncBaseScraper))
+        return restore_async_scraper, (sync_class, self.__dict__)
+
+    async def run_in_executor(self, func, *args):
+        """ Runs blocking function in the shared executor, keeping context variables of the search """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.IO_EXECUTOR, context.run, func, *args)
+
+    async def async_get_response_from_request(self, url:str):
+        """ Awaitable version of `get_response_from_request` """
+        response = await self.async_send_request(url)
+        return self.get_checked_response(response, url, response.ok and len(response.text) != 0)
+
+    async def async_get_response_from_request_with_404(self, url:str):
+        """ Awaitable version of `get_response_from_request_with_404` """
+        response = await self.async_send_request(url)
+        return self.get_checked_response(response, url, response.ok or response.status_code == 404)
+
+    async def async_send_request(self, url:str) -> requests.models.Response:
+        """ Awaitable version of `send_request` """
+        try:
+            return await self.async_send_shared_request(url)
+        except (requests.exceptions.RequestException, DeadlineExceeded):
+            self.add_failed_request(url)
+            raise
+
+    async def async_send_shared_request(self, url:str) -> requests.models.Response:
+        """ Awaitable version of `send_shared_request` """
+        deadline = get_deadline()
+        if deadline is not None:
+            deadline.check()
+
+        if self.ASYNC_SINGLE_FLIGHT is None:
+            return await self.async_send_cached_request(url)
+
+        key = (url, tuple(sorted(self.HEADERS.items())))
+        wait_timeout = deadline.remaining() if deadline is not None else None
+        try:
+            response, is_shared = await self.ASYNC_SINGLE_FLIGHT.do(key, self.async_send_cached_request, url,
+                                                                    wait_timeout=wait_timeout)
+        except (TimeoutError, SharedCallFailed):
+            # the shared request took too long or failed - sent again if this search has time left,
+            # see `send_shared_request`
+            if deadline is not None:
+                deadline.check()
+            return await self.async_send_cached_request(url)
+
+        if is_shared:
+            self.METRICS.coalesced.inc(scraper=self.NAME)
+        return response
+
+    async def async_send_cached_request(self, url:str) -> requests.models.Response:
+        """ Awaitable version of `send_cached_request` """
+        if self.RESPONSE_CACHE is None:
+            return await self.async_send_get_request(url, self.HEADERS)
+
+        key, entry, response = self.get_cached_response(url)
+        if response is not None:
+            return response
+        return self.cache_response(key, entry, await self.async_send_get_request(url, self.get_request_headers(entry)))
+
+    async def async_send_get_request(self, url:str, headers:dict) -> requests.models.Response:
+        """
+        Awaitable version of `send_get_request` - sends GET request using the loop's pooled client
+        when the host's limit and the limit of all requests let it
+        """
+        timeout = self.get_timeout()
+        deadline = get_deadline()
+        host_limit = self.CLIENT_POOL.get_host_limit(url)
+        limits = await self.acquire_limits([host_limit, get_requests_limit(self.MAX_REQUESTS)], url)
+        try:
+            if deadline is None:
+                return await self.async_send_with_metrics(url, headers, timeout)
+
+            clamped_timeout = deadline.get_timeout(timeout)
+            try:
+                return await self.async_send_with_metrics(url, headers, clamped_timeout,
+                                                          is_clamped=clamped_timeout < timeout)
+            except requests.exceptions.Timeout:
+                deadline.check()
+                raise
+        finally:
+            for limit in limits:
+                limit.release()
+
+    async def acquire_limits(self, limits:list, url:str) -> list:
+        """
+        Acquires the semaphores one by one and returns them. Raises DeadlineExceeded (the acquired ones
+        are released) if the search's deadline passes before they're acquired
+        """
+        deadline = get_deadline()
+        acquired = []
+        try:
+            for limit in limits:
+                if deadline is None:
+                    await limit.acquire()
+                else:
+                    await asyncio.wait_for(limit.acquire(), deadline.remaining())
+                acquired.append(limit)
+        except BaseException as error:
+            for limit in acquired:
+                limit.release()
+            if isinstance(error, asyncio.TimeoutError):
+                raise DeadlineExceeded(f"Deadline of {deadline.seconds}s exceeded while waiting for {url}")
+            raise
+        return acquired
+
+    async def async_send_with_metrics(self, url:str, headers:dict, timeout:float,
+                                      is_clamped:bool=False) -> requests.models.Response:
+        """
+        Awaitable version of `send_with_metrics`. httpx' response and exceptions are turned into requests' ones,
+        so scrapers read them the same way as the sync scrapers' ones
+        """
+        start = time.perf_counter()
+        try:
+            response = await self.CLIENT_POOL.get_client().get(url, headers=headers, timeout=timeout)
+        except httpx.TimeoutException as error:
+            self.add_request_timeout(is_clamped)
+            raise requests.exceptions.Timeout(f"{error!r}, url: {url}") from error
+        except httpx.HTTPError as error:
+            self.add_request_error()
+            raise requests.exceptions.ConnectionError(f"{error!r}, url: {url}") from error
+
+        response = to_requests_response(response)
+        self.add_response_metrics(response, time.perf_counter() - start)
+        return response
+
+    async def async_get_fragments(self, ingrs:list, meal_types:list, get_fragment) -> list:
+        """ Awaitable version of `get_fragments`, `get_fragment` is a coroutine function """
+        fragments = self.get_cached_fragments(ingrs, meal_types)
+        missing_ingrs = [ingr for ingr in dict.fromkeys(ingrs) if ingr not in fragments]
+        missing_fragments = await asyncio.gather(*[get_fragment(ingr) for ingr in missing_ingrs])
+        for ingr, fragment in zip(missing_ingrs, missing_fragments):
+            self.save_fragment(ingr, meal_types, fragment, ingrs)
+            fragments[ingr] = fragment
+        return [fragments[ingr] for ingr in ingrs]
+
+
+class AsyncWordPressScraper(AsyncBaseScraper):
+    """ Async version of `WordPressScraper`'s search """
+
+    async def async_perform_get_recipes(self, ingrs:list, meal_types:list=None, ingrs_match:str=IngrMatch.FULL) -> dict:
+        """ Returns recipes which fulfill the conditions """
+        if self.exclude_by_params(ingrs, meal_types, ingrs_match):
+            return self.data_to_dict([])
+
+        ingrs_copy = ingrs.copy()
+        meal_types_copy = self.meal_types_copy(meal_types)
+
+        meal_types_ = self.get_meal_types_translated(meal_types)
+        ingrs_, meal_types_ = self.finally_change_data_to_url(ingrs, meal_types_)
+
+        if self.exclude_before_url(ingrs_, ingrs_copy, meal_types_, meal_types_copy, ingrs_match):
+            return self.data_to_dict([])
+
+        if ingrs_match == IngrMatch.FULL:
+            recipes = await self.async_get_full_match_recipes(ingrs, meal_types_)
+        elif ingrs_match == IngrMatch.PART:
+            recipes = await self.async_get_partial_match_recipes(ingrs, meal_types_)
+        else:
+            raise ValueError(f"`ingrs_match` must be '{IngrMatch.FULL}' or '{IngrMatch.PART}', not '{ingrs_match}'")
+
+        data = self.data_to_dict(recipes)
+        data = self.clean_data(data)
+        return data
+
+    async def async_get_full_match_recipes(self, ingrs:list, meal_types:list) -> list:
+        """
+        Returns list of recipes with full ingredients match, made of the ingredients' cached posts
+        if all of them are cached
+        """
+        posts = self.get_posts_from_fragments(ingrs, meal_types)
+        if posts is None:
+            url = self.get_url(ingrs, meal_types)
+            posts = await self.async_get_posts_from_request(url)
+            if len(ingrs) == 1:
+                self.save_fragment(ingrs[0], meal_types, posts)
+
+        if posts == REQUEST_FAILED_MSG:
+            return []
+
+        return await self.async_get_recipes_from_posts(posts, ingrs, meal_types, IngrMatch.FULL)
+
+    async def async_get_recipes_from_posts(self, posts:list, ingrs:list, meal_types:list,
+                                           ingrs_match:str=IngrMatch.FULL) -> list:
+        """ Awaitable version of `get_recipes_from_posts` - the loop isn't blocked while a worker checks the posts """
+        future = None
+        if self.PARSE_POOL is not None:
+            future = self.PARSE_POOL.submit(self, "filter_posts", posts, ingrs, meal_types, ingrs_match,
+                                            size=self.get_posts_size(posts))
+        if future is None:
+            return self.get_recipes_from_posts(posts, ingrs, meal_types, ingrs_match)
+
+        try:
+            with self.measure_parse():
+                return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            logging.warning(f"Parse worker died, {self}'s posts are checked in the loop")
+            self.PARSE_POOL.reset()
+            return self.get_recipes_from_posts(posts, ingrs, meal_types, ingrs_match)
+
+    async def async_get_posts_from_request(self, url:str) -> list:
+        """ Awaitable version of `get_posts_from_request` - the rest of pages are requested at once """
+        response = await self.async_get_response_from_request(url)
+        if response == REQUEST_FAILED_MSG:
+            return REQUEST_FAILED_MSG
+
+        posts = response.json()
+        urls = self.get_next_pages_urls(url, response)
+        for page_response in await asyncio.gather(*[self.async_get_response_from_request(url) for url in urls]):
+            if page_response != REQUEST_FAILED_MSG:
+                posts.extend(page_response.json())
+        return posts
+
+    async def async_get_partial_match_recipes(self, ingrs:list, meal_types:list) -> list:
+        """ Returns recipes when ingrs_match is partial - requests for all not cached ingredients are sent at once """
+        ingrs_posts = await self.async_get_fragments(
+            ingrs, meal_types, lambda ingr: self.async_get_posts_from_request(self.get_url([ingr], meal_types)))
+
+        recipes = []
+        seen_keys = set()
+        for posts in ingrs_posts:
+            if posts == REQUEST_FAILED_MSG:
+                return []
+
+            posts_recipes = await self.async_get_recipes_from_posts(posts, ingrs, meal_types, IngrMatch.PART)
+            recipes.extend(self.deduplicate_recipes(posts_recipes, seen_keys))
+        return recipes
+
+
+class AsyncTagsSearchingWordPressScraper(AsyncWordPressScraper):
+    """ Async version of `TagsSearchingWordPressScraper`'s search """
+
+    async def async_perform_get_recipes(self, ingrs:list, meal_types:list=None, ingrs_match:str=IngrMatch.FULL) -> dict:
+        """ Returns recipes which fulfill the conditions """
+        if self.exclude_by_params(ingrs, meal_types, ingrs_match):
+            return self.data_to_dict([])
+
+        ingrs_copy = ingrs.copy()
+        meal_types_copy = self.meal_types_copy(meal_types)
+
+        ingrs_, meal_types_ = await self.async_prep_args(ingrs, meal_types)
+
+        if self.exclude_before_url(ingrs_, ingrs_copy, meal_types_, meal_types_copy, ingrs_match):
+            return self.data_to_dict([])
+
+        recipes = await self.async_get_recipes_from_params(ingrs_, meal_types_, ingrs_match)
+
+        data = self.data_to_dict(recipes)
+        data = self.clean_data(data)
+        return data
+
+    async def async_prep_args(self, ingrs:list=None, meal_types:list=None) -> (list, list):
+        """ Changes ingredients and meal_types given by user so they can be put into url """
+        meal_types_ = self.get_meal_types_translated(meal_types)
+        if self.ENG_WEB:
+            # translates ingredients - blocking, so done in the executor
+            ingrs_, meal_types_ = await self.run_in_executor(self.prep_data_to_get_tags, ingrs, meal_types_)
+        else:
+            ingrs_, meal_types_ = self.prep_data_to_get_tags(ingrs, meal_types_)
+        ingrs_ = await self.async_get_ingrs_tags(ingrs_, self.TAG_URL)
+        ingrs_, meal_types_ = self.finally_change_data_to_url(ingrs_, meal_types_)
+
+        return ingrs_, meal_types_
+
+    async def async_get_ingrs_tags(self, ingrs:list, url:str) -> list:
+        """ Takes list of strings and url and returns list of their tags, known tags are taken from the cache """
+        slugs = self.get_tags_slugs(ingrs)
+        tags = self.TAG_CACHE.get_tags(url, slugs)
+
+        missing_slugs = [slug for slug in slugs if slug not in tags]
+        if missing_slugs:
+            response = await self.async_get_response_from_request(self.get_tags_url(missing_slugs, url))
+            tags.update(self.save_requested_tags(response, missing_slugs, url))
+
+        return self.get_tags_ids(slugs, tags)
+
+    async def async_get_recipes_from_params(self, ingrs:list=None, meal_types:list=None,
+                                            ingrs_match:str=IngrMatch.FULL) -> list:
+        """ Makes requests for the tags which posts aren't cached, filters data and returns list of recipes """
+        tags_posts = await self.async_get_fragments(
+            ingrs, meal_types, lambda tag: self.async_get_posts_from_request(self.get_url([tag], meal_types)))
+
+        if REQUEST_FAILED_MSG in tags_posts:
+            return []
+
+        return self.get_recipes_from_tagged_posts(self.join_posts(tags_posts), ingrs, meal_types, ingrs_match)
+
+
+class AsyncGeneralSearchScraper(AsyncBaseScraper):
+    """ Async version of `GeneralSearchScraper`'s search """
+
+    async def async_perform_get_recipes(self, ingrs:list, meal_types:list=None, ingrs_match:str=IngrMatch.FULL) -> dict:
+        """ Returns recipes which fulfill the conditions """
+        meal_types_copy = self.meal_types_copy(meal_types)
+
+        if self.ENG_WEB:
+            # translates ingredients - blocking, so done in the executor
+            ingrs, meal_types = await self.run_in_executor(self.prep_args, ingrs, meal_types)
+        else:
+            ingrs, meal_types = self.prep_args(ingrs, meal_types)
+
+        if meal_types_copy is not None and len(meal_types) == 0:
+            return self.data_to_dict([])
+
+        if ingrs_match == IngrMatch.FULL:
+            recipes = await self.async_get_full_match_recipes(ingrs, meal_types)
+        elif ingrs_match == IngrMatch.PART:
+            recipes = await self.async_get_partial_match_recipes(ingrs, meal_types)
+        else:
+            raise Exception(f"`ingrs_match` must be '{IngrMatch.FULL}' or '{IngrMatch.PART}', not '{ingrs_match}'")
+
+        data = self.data_to_dict(recipes)
+        data = self.clean_data(data)
+        return data
+
+    async def async_get_ingr_data(self, ingr:str) -> list or str:
+        """ Awaitable version of `get_ingr_data` """
+        response = await self.async_get_response_from_request(self.get_url([ingr]))
+        if response == REQUEST_FAILED_MSG:
+            return REQUEST_FAILED_MSG
+        return response.json()
+
+    async def async_get_full_match_recipes(self, ingrs:list, meal_types:list=None) -> list:
+        """ Returns list of recipes - puts all parameters to url in one go """
+        url = self.get_url(ingrs)
+        response = await self.async_get_response_from_request(url)
+
+        if response == REQUEST_FAILED_MSG:
+            return []
+
+        with self.measure_parse():
+            return list(self.get_data_from_response(response.json(), meal_types=meal_types))
+
+    async def async_get_partial_match_recipes(self, ingrs:list, meal_types:list=None) -> list:
+        """ Returns list of recipes - requests for all not cached ingredients are sent at once """
+        responses = await self.async_get_fragments(ingrs, None, self.async_get_ingr_data)
+
+        recipes = []
+        seen_keys = set()
+        for response in responses:
+            if response == REQUEST_FAILED_MSG:
+                return []
+
+            with self.measure_parse():
+                response_recipes = list(self.get_data_from_response(response, meal_types=meal_types))
+            recipes.extend(self.deduplicate_recipes(response_recipes, seen_keys))
+        return recipes
+
+
+# sync base class and its async version, the most specific classes first
+ASYNC_VERSIONS = [
+    (TagsSearchingWordPressScraper, AsyncTagsSearchingWordPressScraper),
+    (WordPressScraper, AsyncWordPressScraper),
+    (GeneralSearchScraper, AsyncGeneralSearchScraper),
+    (BaseScraper, AsyncBaseScraper),
+]
+
+_async_classes = {}
+
+
+def restore_async_scraper(scraper_class, state:dict):
+    """ Returns scraper of async version of the class with the state - the one sent to a parse worker """
+    scraper = object.__new__(get_async_scraper_class(scraper_class))
+    scraper.__dict__.update(state)
+    return scraper
+
+
+def get_async_scraper_class(scraper_class):
+    """ Returns async version of scraper's class, e.x. `AsyncWegepediaScraper` for `WegepediaScraper` """
+    async_class = _async_classes.get(scraper_class)
+    if async_class is None:
+        async_base = next(async_base for base, async_base in ASYNC_VERSIONS if issubclass(scraper_class, base))
+        async_class = type(f"Async{scraper_class.__name__}", (async_base, scraper_class), {})
+        _async_classes[scraper_class] = async_class
+    return async_class
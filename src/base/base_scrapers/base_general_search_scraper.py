@@ -4,8 +4,8 @@ from src.base.base_scrapers import BaseScraper
 
 class GeneralSearchScraper(BaseScraper):
 
-    ENG_WEB = False
     PRECISE_SEARCH = True
+    ITEM_FIELDS = ["title", "urlId", "itemUrl", "categories"]  # fields of response's items the scrapers read
 
     def __init__(self):
         super().__init__()
@@ -47,30 +47,42 @@ class GeneralSearchScraper(BaseScraper):
 
         response = response.json()
 
-        recipes = []
-        for recipe in self.get_data_from_response(response, meal_types=meal_types):
-            recipes.append(recipe)
+        with self.measure_parse():
+            recipes = list(self.get_data_from_response(response, meal_types=meal_types))
 
         return recipes
 
     def get_partial_match_recipes(self, ingrs:list, meal_types:list=None) -> list:
-        """ Returns list of recipes - makes requests for all ingredients separately """
-        recipes = []
-        for ingr in ingrs:  # loop through ingredients
-            url = self.get_url([ingr])
-            response = self.get_response_from_request(url)
+        """
+        Returns list of recipes - makes requests for all ingredients which responses aren't cached separately,
+        but at the same time. Meal types are checked in the responses, so they're cached for any meal types
+        """
+        responses = self.get_fragments(ingrs, None, self.get_ingr_data)
 
+        recipes = []
+        seen_keys = set()
+        for response in responses:  # loop through ingredients' responses
             if response == REQUEST_FAILED_MSG:
                 return []
 
-            response = response.json()
-
-            for recipe in self.get_data_from_response(response, meal_types=meal_types):
-                if recipe not in recipes:
-                    recipes.append(recipe)
+            with self.measure_parse():
+                response_recipes = list(self.get_data_from_response(response, meal_types=meal_types))
+            recipes.extend(self.deduplicate_recipes(response_recipes, seen_keys))
 
         return recipes
 
+    def get_ingr_data(self, ingr:str) -> list or str:
+        """ Returns website's data (json) found by the ingredient or REQUEST_FAILED_MSG """
+        response = self.get_response_from_request(self.get_url([ingr]))
+        if response == REQUEST_FAILED_MSG:
+            return REQUEST_FAILED_MSG
+        return response.json()
+
+    def compact_fragment(self, response:dict, ingrs:list) -> dict:
+        """ Returns response's items with only the fields the scrapers read (ITEM_FIELDS) """
+        return {"items": [{field: item[field] for field in self.ITEM_FIELDS if field in item}
+                          for item in response["items"]]}
+
     def get_url(self, ingrs:list, meal_types:list=None, ingrs_match:str=IngrMatch.FULL, web_url:str=None, *args, **kwargs) -> str:
         """ Returns url ready to be send """
         if web_url is None:
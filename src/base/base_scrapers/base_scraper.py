@@ -1,10 +1,18 @@
+import contextvars
 import html
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 
-from googletrans import Translator
+from src.base import IngrMatch, SessionPool, IngredientsTranslator, ResponseCache, DeadlineExceeded, get_deadline, \
+    deduplicate_recipes, METRICS, HealthTracker, SingleFlight, SharedCallFailed, FragmentCache, NegativeCache, \
+    ParsePool, PagesBudget, REQUEST_FAILED_MSG, FAN_OUT_WORKERS
+
 
-from src.base import IngrMatch, REQUEST_FAILED_MSG
+# urls of the running search's failed requests - shared with the threads (and tasks) which copied the context
+_failed_requests = contextvars.ContextVar("failed_requests", default=None)
 
 
 class BaseScraper:
@@ -14,9 +22,25 @@ class BaseScraper:
     REQUEST_URL = None
 
     PRECISE_SEARCH = False  # True if search method enable to search precisely
+    ENG_WEB = False  # True if the website is english - ingredients are translated from polish before the search
 
     MAX_N_PAGES = 4  # while looping through pages (/page/n_page/...) MAX_N_PAGES is max n_page value
+    MAX_WASTED_PAGES = 3  # max number of pages after the last one which may be requested in one search
+    NOT_FOUND_RECIPES_MSG = None  # website's message shown on a page without recipes
     TIMEOUT = 10
+    CACHE_TTL = 60 * 60  # seconds the website's responses are used without asking the website again
+
+    SESSION_POOL = SessionPool()  # shared by all scrapers, keeps connections to the websites alive between searches
+    RESPONSE_CACHE = ResponseCache()  # shared by all scrapers, set to None to turn caching off
+    TRANSLATOR = IngredientsTranslator()  # shared by all scrapers, remembers translations between searches
+    METRICS = METRICS  # shared by all scrapers and managers, see `ScraperManager.get_metrics`
+    HEALTH = HealthTracker()  # shared by all scrapers, adapts timeouts and skips failing websites, None turns it off
+    SINGLE_FLIGHT = SingleFlight()  # shared by all scrapers, identical requests sent at once share one fetch
+    FRAGMENT_CACHE = FragmentCache()  # shared by all scrapers, keeps one-ingredient sub-queries' results, None turns it off
+    NEGATIVE_CACHE = NegativeCache()  # shared by all scrapers, remembers ingredients without recipes, None turns it off
+    PARSE_POOL = ParsePool()  # shared by all scrapers, parses big responses in worker processes, None turns it off
+    # threads shared by all scrapers for their concurrent requests (e.x. one per ingredient), see `fan_out`
+    FAN_OUT_EXECUTOR = ThreadPoolExecutor(max_workers=FAN_OUT_WORKERS, thread_name_prefix="scrapers-fan-out")
 
     def __init__(self):
         if self.WEB_URL is None:
@@ -37,13 +61,61 @@ class BaseScraper:
     def get_recipes(self, ingrs:list, meal_types:list=None, ingrs_match:str=IngrMatch.FULL) -> dict:
         """
         Main function, calls function returning recipes which
-        fulfill the conditions or an empty website's dictionary
+        fulfill the conditions or an empty website's dictionary.
+        Raises DeadlineExceeded if the search's deadline has passed before the website was searched
         """
+        if not self.is_available():
+            return self.data_to_dict([])
+
+        start = time.perf_counter()
+        failed_requests = []
+        token = _failed_requests.set(failed_requests)
         try:
-            return self.perform_get_recipes(ingrs, meal_types, ingrs_match)
+            data = self.perform_get_recipes(ingrs, meal_types, ingrs_match)
+            self.add_empty_search(data, failed_requests, ingrs, meal_types)
+        except DeadlineExceeded:
+            # not an empty result - the manager lists the website in response's 'incomplete'
+            logging.warning(f"{self} missed the search's deadline")
+            self.METRICS.timeouts.inc(scraper=self.NAME, kind="deadline")
+            raise
         except Exception:
             logging.error(f"Problem with: {self}")
-            return self.data_to_dict([])
+            self.METRICS.errors.inc(scraper=self.NAME, kind="search")
+            data = self.data_to_dict([])
+        finally:
+            _failed_requests.reset(token)
+        self.add_search_metrics(data, start)
+        return data
+
+    def is_available(self) -> bool:
+        """ Returns False if the website should be skipped - its circuit breaker is open after recent failures """
+        if self.HEALTH is None or self.HEALTH.allow_request(self.NAME):
+            return True
+        logging.warning(f"{self} is skipped, its recent requests failed")
+        self.METRICS.skipped.inc(scraper=self.NAME)
+        return False
+
+    def is_known_empty(self, ingrs:list, meal_types:list=None, ingrs_match:str=IngrMatch.FULL) -> bool:
+        """ Returns True if the website is known to have no recipes for the search, so it doesn't have to be searched """
+        if self.NEGATIVE_CACHE is None:
+            return False
+        return self.NEGATIVE_CACHE.is_empty(self.NAME, ingrs, meal_types, ingrs_match)
+
+    def add_empty_search(self, data:dict, failed_requests:list, ingrs:list, meal_types:list=None) -> None:
+        """ Remembers the search if it has found nothing and it completed - none of its requests failed or raised """
+        if self.NEGATIVE_CACHE is not None and data["n_recipes"] == 0 and not failed_requests:
+            self.NEGATIVE_CACHE.add_empty_search(self.NAME, ingrs, meal_types)
+
+    def add_failed_request(self, url:str) -> None:
+        """ Adds request to the running search's failed ones - empty result of the search isn't remembered then """
+        failed_requests = _failed_requests.get()
+        if failed_requests is not None:
+            failed_requests.append(url)
+
+    def add_search_metrics(self, data:dict, start:float) -> None:
+        """ Adds time of the search started at `start` (perf_counter) and number of found recipes to the metrics """
+        self.METRICS.search_seconds.observe(time.perf_counter() - start, scraper=self.NAME)
+        self.METRICS.recipes.observe(data["n_recipes"], scraper=self.NAME)
 
     def perform_get_recipes(self, ingrs:list, meal_types:list=None, ingrs_match:str=IngrMatch.FULL, *args, **kwargs) -> dict:
         """ Main function to be programmed, returns recipes which fulfill the conditions """
@@ -92,33 +164,313 @@ class BaseScraper:
         Returns websites response (requests.models.Response object)
         or raise an exception if request failed
         """
-        response = requests.get(url, headers=self.HEADERS, timeout=self.TIMEOUT)
-
-        if response.ok and len(response.text) != 0:
-            self.add_request_log("debug", response, url=self.WEB_URL)
-            return response
-
-        else:
-            self.add_request_log("warning", response)
-            return REQUEST_FAILED_MSG
-            # raise Exception(f"Request failed, code: {response.status_code}, url {response.url}")
+        response = self.send_request(url)
+        return self.get_checked_response(response, url, response.ok and len(response.text) != 0)
 
     def get_response_from_request_with_404(self, url:str) -> requests.models.Response:
         """
         Returns websites "ok" and 404 response (requests.models.Response object)
         or raise an exception if request failed
         """
-        response = requests.get(url, headers=self.HEADERS, timeout=self.TIMEOUT)
+        response = self.send_request(url)
+        return self.get_checked_response(response, url, response.ok or response.status_code == 404)
 
-        if response.ok or response.status_code == 404:
+    def get_checked_response(self, response:requests.models.Response, url:str, is_ok:bool) -> requests.models.Response:
+        """ Returns the response if it's ok, otherwise adds it to search's failed ones and returns REQUEST_FAILED_MSG """
+        if is_ok:
             self.add_request_log("debug", response, url=self.WEB_URL)
             return response
 
         else:
             self.add_request_log("warning", response)
+            self.METRICS.errors.inc(scraper=self.NAME, kind="status")
+            self.add_failed_request(url)
             return REQUEST_FAILED_MSG
             # raise Exception(f"Request failed, code: {response.status_code}, url {response.url}")
 
+    def send_request(self, url:str) -> requests.models.Response:
+        """
+        Returns websites response. Identical requests sent at the same time (e.x. by concurrent searches
+        for the same ingredients) are coalesced - one of them is sent and the rest get its response.
+        Requests which raise are added to the search's failed ones, even if the scraper swallows the exception
+        """
+        try:
+            return self.send_shared_request(url)
+        except (requests.exceptions.RequestException, DeadlineExceeded):
+            self.add_failed_request(url)
+            raise
+
+    def send_shared_request(self, url:str) -> requests.models.Response:
+        """ Returns websites response, coalescing identical requests sent at the same time """
+        deadline = get_deadline()
+        if deadline is not None:
+            deadline.check()
+
+        if self.SINGLE_FLIGHT is None:
+            return self.send_cached_request(url)
+
+        key = (url, tuple(sorted(self.HEADERS.items())))
+        wait_timeout = deadline.remaining() if deadline is not None else None
+        try:
+            response, is_shared = self.SINGLE_FLIGHT.do(key, self.send_cached_request, url, wait_timeout=wait_timeout)
+        except (TimeoutError, SharedCallFailed):
+            # the shared request took longer than this search's deadline or it failed, e.x. it was cut to
+            # the deadline of its search, which may have been shorter - only its response would be shared,
+            # so the request is sent again if this search has time left
+            if deadline is not None:
+                deadline.check()
+            return self.send_cached_request(url)
+
+        if is_shared:
+            self.METRICS.coalesced.inc(scraper=self.NAME)
+        return response
+
+    def send_cached_request(self, url:str) -> requests.models.Response:
+        """ Returns websites response - cached one if it's still fresh or hasn't changed, otherwise the new one """
+        if self.RESPONSE_CACHE is None:
+            return self.send_get_request(url, self.HEADERS)
+
+        key, entry, response = self.get_cached_response(url)
+        if response is not None:
+            return response
+        return self.cache_response(key, entry, self.send_get_request(url, self.get_request_headers(entry)))
+
+    def get_cached_response(self, url:str) -> (str, dict, requests.models.Response):
+        """ Returns (key, cached entry or None, response made of the entry if it's still fresh or None) """
+        cache = self.RESPONSE_CACHE
+        key = cache.get_key(url, self.HEADERS)
+        entry = cache.get(key)
+        if entry is not None and cache.is_fresh(entry):
+            cache.add_stat(self.NAME, "hits")
+            self.METRICS.cache_requests.inc(scraper=self.NAME, result="hits")
+            return key, entry, cache.to_response(entry)
+        return key, entry, None
+
+    def get_request_headers(self, entry:dict=None) -> dict:
+        """ Returns request's headers - stale response is revalidated, the website answers 304 if it hasn't changed """
+        if entry is None:
+            return self.HEADERS
+        return {**self.HEADERS, **self.RESPONSE_CACHE.get_validators(entry)}
+
+    def cache_response(self, key:str, entry:dict, response:requests.models.Response) -> requests.models.Response:
+        """ Returns the website's response or cached one if it hasn't changed, saves the new one in the cache """
+        cache = self.RESPONSE_CACHE
+        if entry is not None and response.status_code == 304:
+            cache.add_stat(self.NAME, "revalidated")
+            self.METRICS.cache_requests.inc(scraper=self.NAME, result="revalidated")
+            cache.refresh(key, entry)
+            return cache.to_response(entry)
+
+        cache.add_stat(self.NAME, "misses")
+        self.METRICS.cache_requests.inc(scraper=self.NAME, result="misses")
+        if cache.is_cacheable(response):
+            cache.set(key, cache.from_response(response, self.CACHE_TTL))
+        return response
+
+    def send_get_request(self, url:str, headers:dict) -> requests.models.Response:
+        """
+        Sends GET request using host's pooled session and returns websites response.
+        Request's timeout is clamped to the time left to the search's deadline
+        """
+        session = self.SESSION_POOL.get_session(url)
+        timeout = self.get_timeout()
+        deadline = get_deadline()
+        if deadline is None:
+            with self.SESSION_POOL.get_host_limit(url):
+                return self.send_with_metrics(session, url, headers, timeout)
+
+        host_limit = self.SESSION_POOL.get_host_limit(url)
+        if not host_limit.acquire(timeout=deadline.remaining()):
+            raise DeadlineExceeded(f"Deadline of {deadline.seconds}s exceeded while waiting for {url}")
+        try:
+            clamped_timeout = deadline.get_timeout(timeout)
+            return self.send_with_metrics(session, url, headers, clamped_timeout,
+                                          is_clamped=clamped_timeout < timeout)
+        except requests.exceptions.Timeout:
+            deadline.check()
+            raise
+        finally:
+            host_limit.release()
+
+    def get_timeout(self) -> float:
+        """ Returns timeout of website's request - adapted to its recent latencies, at most TIMEOUT """
+        if self.HEALTH is None:
+            return self.TIMEOUT
+        return self.HEALTH.get_timeout(self.NAME, self.TIMEOUT)
+
+    def send_with_metrics(self, session:requests.Session, url:str, headers:dict, timeout:float,
+                          is_clamped:bool=False) -> requests.models.Response:
+        """
+        Sends GET request, adds its latency, response's size or its timeout to the metrics and website's health.
+        Timeout clamped to the search's deadline (`is_clamped`) isn't website's failure
+        """
+        start = time.perf_counter()
+        try:
+            response = session.get(url, headers=headers, timeout=timeout)
+        except requests.exceptions.Timeout:
+            self.add_request_timeout(is_clamped)
+            raise
+        except requests.exceptions.RequestException:
+            self.add_request_error()
+            raise
+
+        self.add_response_metrics(response, time.perf_counter() - start)
+        return response
+
+    def add_request_timeout(self, is_clamped:bool=False) -> None:
+        """ Adds request's timeout to the metrics and, if it wasn't clamped to the deadline, to website's health """
+        self.METRICS.timeouts.inc(scraper=self.NAME, kind="request")
+        if not is_clamped:
+            self.add_health(failed=True)
+
+    def add_request_error(self) -> None:
+        """ Adds request's connection error to the metrics and website's health """
+        self.METRICS.errors.inc(scraper=self.NAME, kind="connection")
+        self.add_health(failed=True)
+
+    def add_response_metrics(self, response:requests.models.Response, latency:float) -> None:
+        """ Adds response's latency and size to the metrics and website's health """
+        self.METRICS.request_seconds.observe(latency, scraper=self.NAME)
+        self.METRICS.response_bytes.observe(len(response.content), scraper=self.NAME)
+        self.add_health(failed=response.status_code >= 500 or response.status_code == 429, latency=latency)
+
+    def add_health(self, failed:bool, latency:float=None) -> None:
+        """ Adds result of website's request to its health """
+        if self.HEALTH is None:
+            return
+        if failed:
+            self.HEALTH.add_failure(self.NAME)
+        else:
+            self.HEALTH.add_success(self.NAME, latency)
+
+    def parse(self, method_name:str, *args, size:int=0) -> list:
+        """
+        Returns results of the scraper's parsing method (e.x. `get_data_from_response`) as a list.
+        Response of `size` bytes big enough is parsed in the parse pool's worker process
+        """
+        if self.PARSE_POOL is None:
+            return list(getattr(self, method_name)(*args))
+        return self.PARSE_POOL.run(self, method_name, *args, size=size)
+
+    def measure_parse(self):
+        """ Returns context manager adding time of its block (getting recipes from a response) to the metrics """
+        return self.METRICS.parse_seconds.time(scraper=self.NAME)
+
+    def get_cache_stats(self) -> dict:
+        """ Returns numbers of the scraper's requests answered from the cache (hits, revalidated) and not (misses) """
+        if self.RESPONSE_CACHE is None:
+            return {"hits": 0, "misses": 0, "revalidated": 0}
+        return self.RESPONSE_CACHE.get_stats(self.NAME)
+
+    def fan_out(self, func, items:list) -> list:
+        """
+        Calls `func` for every item concurrently (e.x. makes request for every ingredient) in the threads shared
+        by all scrapers (FAN_OUT_EXECUTOR) and returns list of results in the items' order. The calling thread
+        calls `func` for the first item and for items which no shared thread has taken yet, so nested calls
+        (e.x. pages of every ingredient) never wait for a busy pool. Calls keep context variables (e.x. deadline)
+        of the search
+        """
+        if len(items) <= 1:
+            return [func(item) for item in items]
+
+        futures = [self.FAN_OUT_EXECUTOR.submit(contextvars.copy_context().run, func, item) for item in items[1:]]
+        try:
+            results = [func(items[0])]
+            for item, future in zip(items[1:], futures):
+                if future.cancel():  # not started yet, all shared threads are busy
+                    results.append(func(item))
+                else:
+                    results.append(future.result())
+            return results
+        finally:
+            for future in futures:
+                future.cancel()  # if a call has raised, the calls which haven't started aren't needed
+
+    def get_fragments(self, ingrs:list, meal_types:list, get_fragment) -> list:
+        """
+        Returns results of one-ingredient sub-queries (fragments, e.x. posts found by the ingredient) in the ingredients'
+        order. Cached fragments are taken from the fragment cache, the rest is got concurrently by `get_fragment(ingr)`
+        and saved - unless the sub-query failed (returned REQUEST_FAILED_MSG)
+        """
+        fragments = self.get_cached_fragments(ingrs, meal_types)
+        missing_ingrs = [ingr for ingr in dict.fromkeys(ingrs) if ingr not in fragments]
+        for ingr, fragment in zip(missing_ingrs, self.fan_out(get_fragment, missing_ingrs)):
+            self.save_fragment(ingr, meal_types, fragment, ingrs)
+            fragments[ingr] = fragment
+        return [fragments[ingr] for ingr in ingrs]
+
+    def get_cached_fragments(self, ingrs:list, meal_types:list) -> dict:
+        """ Returns {ingredient: its fragment} of the ingredients whose fragments are cached and usable in the search """
+        fragments = {}
+        if self.FRAGMENT_CACHE is None:
+            return fragments
+
+        for ingr in ingrs:
+            fragment = self.FRAGMENT_CACHE.get(self.FRAGMENT_CACHE.get_key(self.NAME, ingr, meal_types))
+            if fragment is not None and not self.is_fragment_usable(fragment, ingrs):
+                fragment = None
+            result = "misses" if fragment is None else "hits"
+            self.METRICS.fragment_requests.inc(scraper=self.NAME, result=result)
+            if fragment is not None:
+                fragments[ingr] = fragment
+        return fragments
+
+    def save_fragment(self, ingr, meal_types:list, fragment, ingrs:list=None) -> None:
+        """
+        Saves compact version of ingredient's fragment (see `compact_fragment`) in the fragment cache, `ingrs` are all
+        ingredients of the search. Failed sub-query isn't saved
+        """
+        if self.FRAGMENT_CACHE is not None and fragment != REQUEST_FAILED_MSG:
+            fragment = self.compact_fragment(fragment, ingrs if ingrs is not None else [ingr])
+            self.FRAGMENT_CACHE.set(self.FRAGMENT_CACHE.get_key(self.NAME, ingr, meal_types), fragment)
+
+    def compact_fragment(self, fragment, ingrs:list):
+        """
+        Returns the part of the fragment kept in the fragment cache - only what's needed to get recipes of it,
+        `ingrs` are all ingredients of the search. Fragment is kept whole by default (e.x. list of recipes)
+        """
+        return fragment
+
+    def is_fragment_usable(self, fragment, ingrs:list) -> bool:
+        """ Returns True if recipes of the search for `ingrs` can be got from the compact fragment """
+        return True
+
+    def get_pages_responses(self, urls, budget:PagesBudget=None) -> list:
+        """
+        Takes urls of next pages and returns responses of the pages before the last one - 404 or page without recipes.
+        Pages are requested concurrently in windows of one page and the pages taken from the budget (by default
+        MAX_WASTED_PAGES pages), so paging takes one request's time (instead of one per page) and at most
+        the budget's pages are requested needlessly. Pagings sharing the budget (e.x. of search's ingredients)
+        request pages one by one when it's used up
+        """
+        if budget is None:
+            budget = PagesBudget(self.MAX_WASTED_PAGES)
+
+        urls = list(urls)
+        responses = []
+        start = 0
+        while start < len(urls):
+            extra_pages = budget.take(len(urls) - start - 1)
+            window_responses = self.fan_out(self.get_response_from_request_with_404,
+                                            urls[start:start + 1 + extra_pages])
+            for n_page, response in enumerate(window_responses):
+                if self.is_last_page(response):
+                    # pages after the last one have been wasted, the rest of taken pages is given back
+                    budget.give_back(extra_pages - (len(window_responses) - n_page - 1))
+                    return responses
+                responses.append(response)
+            budget.give_back(extra_pages)
+            start += len(window_responses)
+        return responses
+
+    def is_last_page(self, response:requests.models.Response) -> bool:
+        """ Returns True if the page doesn't exist or has no recipes, so next pages don't have to be checked """
+        if response == REQUEST_FAILED_MSG or response.status_code == 404:
+            return True
+        if self.NOT_FOUND_RECIPES_MSG is not None and self.NOT_FOUND_RECIPES_MSG in response.text:
+            return True
+        return False
+
     def recipe_data_to_dict(self, title:str, link:str) -> dict:
         """ Returns dict with info about a recipe """
         return {"title": title, "link": link}
@@ -130,19 +482,28 @@ class BaseScraper:
                 "recipes": recipes,
                 "n_recipes": len(recipes)}
 
+    def deduplicate_recipes(self, recipes, seen_keys:set=None) -> list:
+        """ Returns recipes without duplicates, see `deduplicate_recipes` in utils """
+        return deduplicate_recipes(recipes, seen_keys)
+
     def clean_data(self, data:dict) -> dict:
-        """ Cleans titles from characters encoded with html """
+        """
+        Cleans titles from characters encoded with html. Recipes are replaced with cleaned copies, so recipes
+        shared with the fragment cache aren't changed
+        """
         replace = {"\xa0": " ", "<em>": "", "</em>": ""}
-        if data["recipes"]:
-            for recipe in data["recipes"]:
-
-                for (key, val) in replace.items():
-                    recipe["title"] = recipe["title"].replace(key, val)
-                recipe["title"] = html.unescape(recipe["title"])
-                recipe["title"] = recipe["title"].strip()
-
-                recipe["title"] = self.more_title_cleaning(recipe["title"])
-                recipe["link"] = self.more_link_cleaning(recipe["link"])
+        cleaned_recipes = []
+        for recipe in data["recipes"]:
+            title = recipe["title"]
+            for (key, val) in replace.items():
+                title = title.replace(key, val)
+            title = html.unescape(title)
+            title = title.strip()
+
+            cleaned_recipes.append({**recipe,
+                                    "title": self.more_title_cleaning(title),
+                                    "link": self.more_link_cleaning(recipe["link"])})
+        data["recipes"] = cleaned_recipes
         return data
 
     def meal_type_trans(self, meal_type:str=None) -> list or None:
@@ -170,9 +531,16 @@ class BaseScraper:
 
     def pl_en_translate(self, words:list) -> list:
         """ Translates list of ingredients from polish to english """
-        translator = Translator()
-        translation = [translator.translate(word, src="pl", dest="en").text.lower() for word in words]
-        return translation
+        return self.TRANSLATOR.translate(words)
+
+    def get_website_ingrs(self, ingrs:list) -> list:
+        """
+        Returns ingredients the way they're searched on the website (e.x. to rank its recipes) - english ones
+        if the website is english. Only known translations are used, the words aren't translated again
+        """
+        if self.ENG_WEB:
+            return self.TRANSLATOR.get_translations(ingrs)
+        return ingrs
 
     def more_title_cleaning(self, title:str=None) -> str:
         """ Modifies title in final data """
@@ -1,11 +1,16 @@
+from urllib.parse import unquote
+
 from src.base.base_scrapers import WordPressScraper
-from src.base import IngrMatch, do_list_includes_list
+from src.base import IngrMatch, TagCache, do_list_includes_list, REQUEST_FAILED_MSG
 
 
 class TagsSearchingWordPressScraper(WordPressScraper):
     TAG_URL = None
     PRECISE_SEARCH = True
 
+    TAG_CACHE = TagCache()  # shared by all scrapers, keeps ingredients' tags between searches and restarts
+    MAX_TAGS_PER_REQUEST = 10  # wp-json returns 10 tags per page by default
+
     def __init__(self):
         super().__init__()
 
@@ -72,29 +77,98 @@ class TagsSearchingWordPressScraper(WordPressScraper):
         return ingrs, meal_types
 
     def get_ingrs_tags(self, ingrs:list, url:str) -> list:
-        """ Takes list of strings and url and returns list of their tags """
-        url = self.add_params_to_url(params=ingrs, url=url, delimiter="+", phrase_connector="-")
-        response = self.get_response_from_request(url)
-        response = response.json()
-        tags = [(tag["id"]) for tag in response]
+        """ Takes list of strings and url and returns list of their tags, known tags are taken from the cache """
+        slugs = self.get_tags_slugs(ingrs)
+        tags = self.TAG_CACHE.get_tags(url, slugs)
+
+        missing_slugs = [slug for slug in slugs if slug not in tags]
+        if missing_slugs:
+            tags.update(self.request_tags(missing_slugs, url))
+
+        return self.get_tags_ids(slugs, tags)
+
+    def request_tags(self, slugs:list, url:str) -> dict:
+        """ Requests the tags and returns {slug: tag's id or None}, saves them in the cache """
+        response = self.get_response_from_request(self.get_tags_url(slugs, url))
+        return self.save_requested_tags(response, slugs, url)
+
+    def save_requested_tags(self, response, slugs:list, url:str) -> dict:
+        """ Returns {slug: tag's id or None} of the tags' response and saves them in the cache """
+        if response == REQUEST_FAILED_MSG:
+            raise Exception(f"Tags request failed: {url}")
+
+        tags = self.get_tags_from_response(response.json(), slugs)
+
+        if len(tags) == len(slugs):
+            self.TAG_CACHE.set_tags(url, tags)
+        else:
+            # some returned tags' slugs are written differently than requested ones,
+            # so it's not sure which slugs have no tag - only found tags are saved
+            self.TAG_CACHE.set_tags(url, {slug: tags[slug] for slug in slugs if tags[slug] is not None})
         return tags
 
-    def get_recipes_from_params(self, ingrs:list=None, meal_types:list=None, ingrs_match:str=IngrMatch.FULL) -> list:
-        """ Makes request, filters data and returns list of recipes """
-        url = self.get_url(ingrs, meal_types)
-        response = self.get_response_from_request(url)
-        response = response.json()
+    def get_post_fields(self) -> list:
+        """ Returns fields of posts which wp-json should return - recipes are found by tags, content isn't needed """
+        return ["id", "title", "link", "categories", "tags", self.tags_name, self.get_meal_types_taxonomy()]
+
+    def get_tags_slugs(self, ingrs:list) -> list:
+        """ Returns ingredients written like tags' slugs """
+        return [str(ingr).replace(" ", "-").lower() for ingr in ingrs]
+
+    def get_tags_url(self, slugs:list, url:str) -> str:
+        """ Returns url of request for the tags """
+        return self.add_params_to_url(params=slugs, url=url, delimiter="+", phrase_connector="-")
+
+    def get_tags_from_response(self, response:list, slugs:list) -> dict:
+        """ Takes tags returned by wp-json and requested slugs and returns {slug: tag's id or None} """
+        tags = {slug: None for slug in slugs}
+        for tag in response:
+            slug = unquote(tag["slug"]).lower()
+            tags[slug] = tag["id"]
+        return tags
 
+    def get_tags_ids(self, slugs:list, tags:dict) -> list:
+        """ Returns list of ids of the tags which exist - requested slugs first, then the other returned tags """
+        ids = [tags[slug] for slug in slugs if tags.get(slug) is not None]
+        ids += [tag_id for slug, tag_id in tags.items() if slug not in slugs and tag_id is not None]
+        return ids
+
+    def preload_tags(self, ingrs:list) -> None:
+        """ Saves in the cache tags of many ingredients (e.x. the most popular ones), so searches don't wait for them """
+        slugs = self.get_tags_slugs(ingrs)
+        missing_slugs = [slug for slug in slugs if slug not in self.TAG_CACHE.get_tags(self.TAG_URL, slugs)]
+
+        for start in range(0, len(missing_slugs), self.MAX_TAGS_PER_REQUEST):
+            self.request_tags(missing_slugs[start:start + self.MAX_TAGS_PER_REQUEST], self.TAG_URL)
+
+    def get_recipes_from_params(self, ingrs:list=None, meal_types:list=None, ingrs_match:str=IngrMatch.FULL) -> list:
+        """
+        Makes requests for the tags which posts aren't cached, filters data and returns list of recipes.
+        Posts of the tags are joined - wp-json returns posts with any of requested tags anyway and the full match
+        is checked by posts' tags
+        """
+        tags_posts = self.get_fragments(ingrs, meal_types,
+                                        lambda tag: self.get_posts_from_request(self.get_url([tag], meal_types)))
+
+        if REQUEST_FAILED_MSG in tags_posts:
+            return []
+
+        return self.get_recipes_from_tagged_posts(self.join_posts(tags_posts), ingrs, meal_types, ingrs_match)
+
+    def get_recipes_from_tagged_posts(self, posts:list, ingrs:list=None, meal_types:list=None,
+                                      ingrs_match:str=IngrMatch.FULL) -> list:
+        """ Filters posts returned by wp-json and returns list of recipes """
         recipes = []
 
         ingrs = [int(ingr) for ingr in ingrs]  # `ingrs` is a list of ints - ingredients' tags
-        for recipe in response:  # loop through items in website's response
-            valid_recipe = self.get_recipe_from_response(recipe, ingrs, meal_types, ingrs_match=ingrs_match,
-                                                         check_in_soup=False)
+        with self.measure_parse():
+            for recipe in posts:  # loop through items in website's response
+                valid_recipe = self.get_recipe_from_response(recipe, ingrs, meal_types, ingrs_match=ingrs_match,
+                                                             check_in_soup=False)
 
-            # if recipe is excluded for some reason, `get_recipe_from_response` returns None and it needs to be omitted
-            if valid_recipe:
-                recipes.append(valid_recipe)
+                # if recipe is excluded for some reason, `get_recipe_from_response` returns None and it needs to be omitted
+                if valid_recipe:
+                    recipes.append(valid_recipe)
 
         return recipes
 
@@ -105,7 +179,7 @@ class TagsSearchingWordPressScraper(WordPressScraper):
             return True
 
         if ingrs_match == IngrMatch.FULL:
-            if not do_list_includes_list(recipe[self.tags_name], ingrs):
+            if not do_list_includes_list(recipe.get(self.tags_name, []), ingrs):
                 return True
             return False
         elif ingrs_match == IngrMatch.PART:
@@ -1,12 +1,13 @@
-from bs4 import BeautifulSoup
+import requests
 
 from src.base.base_scrapers import BaseScraper
-from src.base import IngrMatch, REQUEST_FAILED_MSG
+from src.base import IngrMatch, html_to_text, get_ingredients_matcher, REQUEST_FAILED_MSG
 
 
 class WordPressScraper(BaseScraper):
 
     PRECISE_SEARCH = False
+    MAX_WP_PAGES = 5  # max number of pages (100 posts each) of wp-json's results read in one request
 
     def __init__(self):
         super().__init__()
@@ -57,22 +58,95 @@ class WordPressScraper(BaseScraper):
         return False
 
     def get_full_match_recipes(self, ingrs:list, meal_types:list) -> list:
-        """ Returns list of recipes with full ingredients match """
-        url = self.get_url(ingrs, meal_types)
-        response = self.get_response_from_request(url)
-
-        if response == REQUEST_FAILED_MSG:
+        """
+        Returns list of recipes with full ingredients match, made of the ingredients' cached posts
+        if all of them are cached
+        """
+        posts = self.get_posts_from_fragments(ingrs, meal_types)
+        if posts is None:
+            url = self.get_url(ingrs, meal_types)
+            posts = self.get_posts_from_request(url)
+            if len(ingrs) == 1:
+                self.save_fragment(ingrs[0], meal_types, posts)
+
+        if posts == REQUEST_FAILED_MSG:
             return []
 
-        response = response.json()
-
+        return self.get_recipes_from_posts(posts, ingrs, meal_types, IngrMatch.FULL)
+
+    def get_posts_from_fragments(self, ingrs:list, meal_types:list) -> list or None:
+        """
+        Returns posts found by every ingredient - intersection of the ingredients' cached posts, or None if not all
+        of them are cached. Posts' content is checked for the ingredients anyway, so they give the same recipes
+        as posts of the request for all ingredients
+        """
+        fragments = self.get_cached_fragments(ingrs, meal_types)
+        if any(ingr not in fragments for ingr in ingrs):
+            return None
+        return self.intersect_posts([fragments[ingr] for ingr in ingrs])
+
+    def intersect_posts(self, ingrs_posts:list) -> list:
+        """ Returns posts which are in all lists, in the first list's order """
+        ids = set.intersection(*[{post["id"] for post in posts} for posts in ingrs_posts])
+        return [post for post in self.join_posts(ingrs_posts[:1]) if post["id"] in ids]
+
+    def join_posts(self, ingrs_posts:list) -> list:
+        """ Returns posts of all lists without repeated ones, in the lists' order """
+        posts = {}
+        for ingr_posts in ingrs_posts:
+            for post in ingr_posts:
+                posts.setdefault(post["id"], post)
+        return list(posts.values())
+
+    def get_posts_from_request(self, url:str, max_pages:int=None) -> list:
+        """
+        Returns posts of all pages of wp-json's results (up to `max_pages`) or REQUEST_FAILED_MSG if the first
+        page's request failed. Number of pages is read from the first page's X-WP-TotalPages header
+        and the rest of pages are requested concurrently
+        """
+        response = self.get_response_from_request(url)
+        if response == REQUEST_FAILED_MSG:
+            return REQUEST_FAILED_MSG
+
+        posts = response.json()
+        for page_response in self.fan_out(self.get_response_from_request,
+                                          self.get_next_pages_urls(url, response, max_pages)):
+            if page_response != REQUEST_FAILED_MSG:  # posts of the other pages are still returned
+                posts.extend(page_response.json())
+        return posts
+
+    def get_next_pages_urls(self, url:str, response:requests.models.Response, max_pages:int=None) -> list:
+        """ Returns urls of wp-json's results' pages after the first one, up to `max_pages` pages in total """
+        if max_pages is None:
+            max_pages = self.MAX_WP_PAGES
+
+        try:
+            total_pages = int(response.headers.get("X-WP-TotalPages", 1))
+        except ValueError:
+            total_pages = 1
+        return [f"{url}&page={n_page}" for n_page in range(2, min(total_pages, max_pages) + 1)]
+
+    def get_recipes_from_posts(self, posts:list, ingrs:list, meal_types:list, ingrs_match:str=IngrMatch.FULL) -> list:
+        """
+        Returns list of recipes made of the posts returned by wp-json which fulfill the conditions,
+        posts with a lot of content are checked in the parse pool's worker process
+        """
+        with self.measure_parse():
+            return self.parse("filter_posts", posts, ingrs, meal_types, ingrs_match, size=self.get_posts_size(posts))
+
+    def filter_posts(self, posts:list, ingrs:list, meal_types:list, ingrs_match:str=IngrMatch.FULL) -> list:
+        """ Returns recipes of the posts which fulfill the conditions """
         recipes = []
-        for recipe in response:
-            valid_recipe = self.get_recipe_from_response(recipe, ingrs, meal_types, ingrs_match=IngrMatch.FULL)
+        for recipe in posts:
+            valid_recipe = self.get_recipe_from_response(recipe, ingrs, meal_types, ingrs_match=ingrs_match)
             if valid_recipe:
                 recipes.append(valid_recipe)
         return recipes
 
+    def get_posts_size(self, posts:list) -> int:
+        """ Returns length of posts' content - the part of posts which takes time to check """
+        return sum(len(post.get("content", {}).get("rendered", "")) for post in posts)
+
     def get_recipe_from_response(self, recipe, ingrs, meal_types, check_in_soup:bool=True, ingrs_match:str=IngrMatch.FULL) -> dict:
         """ Takes recipe and users search properties like ingredients, meal_types and ingrs_match
         and return recipe's title and link """
@@ -80,12 +154,8 @@ class WordPressScraper(BaseScraper):
         if self.exclude_one_recipe(recipe, ingrs, meal_types, ingrs_match):
             add = False
 
-        elif check_in_soup:
-            soup = BeautifulSoup(recipe["content"]["rendered"], features="html.parser")
-            soup = soup.get_text().lower()
-            for ingr in ingrs:
-                if ingr.lower() not in soup:
-                    add = False
+        elif check_in_soup and not self.has_all_ingredients(recipe, ingrs):
+            add = False
 
         if add:
             title = recipe["title"]["rendered"]
@@ -93,27 +163,61 @@ class WordPressScraper(BaseScraper):
             return self.recipe_data_to_dict(title=title, link=link)
         return None
 
+    def has_all_ingredients(self, post, ingrs:list) -> bool:
+        """
+        Returns True if post's content contains all ingredients. Compact post (see `compact_fragment`)
+        has no content, but knows which ingredients it contains
+        """
+        matcher = get_ingredients_matcher(ingrs)
+        if "found_ingrs" in post:
+            return all(pattern in post["found_ingrs"] for pattern in matcher.patterns)
+        # posts requested without content (see `get_post_fields`) have no text to check
+        return matcher.matches_all(html_to_text(post.get("content", {}).get("rendered", "")))
+
+    def compact_fragment(self, posts:list, ingrs:list) -> list:
+        """
+        Returns posts without content, which is the most of their size - posts know which of the search's ingredients
+        their content contains instead. Posts requested without content are kept whole
+        """
+        matcher = get_ingredients_matcher(ingrs)
+        checked_ingrs = frozenset(matcher.patterns)
+        compact_posts = []
+        for post in posts:
+            if "content" not in post:
+                compact_posts.append(post)
+                continue
+            compact_post = {field: value for field, value in post.items() if field != "content"}
+            compact_post["found_ingrs"] = frozenset(matcher.find(html_to_text(post["content"].get("rendered", ""))))
+            compact_post["checked_ingrs"] = checked_ingrs
+            compact_posts.append(compact_post)
+        return compact_posts
+
+    def is_fragment_usable(self, posts:list, ingrs:list) -> bool:
+        """ Returns True if compact posts have been checked for all ingredients of the search """
+        patterns = get_ingredients_matcher(ingrs).patterns
+        return all(post["checked_ingrs"].issuperset(patterns) for post in posts if "checked_ingrs" in post)
+
     def exclude_one_recipe(self, recipe:str, ingrs=None, meal_types=None, ingrs_match:str=IngrMatch.FULL) -> bool:
         """ Checks if condition which exclude the recipe is fulfilled.
         Returns `True` if it is, otherwise returns `False` """
         return False
 
     def get_partial_match_recipes(self, ingrs:list, meal_types:list) -> list:
-        """ Returns recipes when ingrs_match is partial """
-        recipes = []
-        for ingr in ingrs:
-            url = self.get_url([ingr], meal_types)
-            response = self.get_response_from_request(url)
+        """
+        Returns recipes when ingrs_match is partial - requests for all ingredients which posts aren't cached
+        are sent concurrently
+        """
+        ingrs_posts = self.get_fragments(ingrs, meal_types,
+                                         lambda ingr: self.get_posts_from_request(self.get_url([ingr], meal_types)))
 
-            if response == REQUEST_FAILED_MSG:
+        recipes = []
+        seen_keys = set()
+        for posts in ingrs_posts:
+            if posts == REQUEST_FAILED_MSG:
                 return []
 
-            response = response.json()
-
-            for recipe in response:
-                valid_recipe = self.get_recipe_from_response(recipe, ingrs, meal_types, ingrs_match=IngrMatch.PART)
-                if valid_recipe and valid_recipe not in recipes:
-                    recipes.append(valid_recipe)
+            posts_recipes = self.get_recipes_from_posts(posts, ingrs, meal_types, IngrMatch.PART)
+            recipes.extend(self.deduplicate_recipes(posts_recipes, seen_keys))
         return recipes
 
     def get_url(self, ingrs:list, meal_types:list=None, ingrs_match:str=IngrMatch.FULL, web_url:str=None, *args, **kwargs) -> str:
@@ -126,8 +230,21 @@ class WordPressScraper(BaseScraper):
                                      phrase_connector=self.url_delimiter, delimiter=self.elements_connector)
         url = self.add_params_to_url(meal_types, url=url, param_name=self.meal_type_param,
                                      delimiter=self.elements_connector)
+        fields = list(dict.fromkeys(self.get_post_fields()))  # without repeated taxonomies
+        url = self.add_params_to_url(fields, url=url, param_name="&_fields=")
         return url
 
+    def get_post_fields(self) -> list:
+        """
+        Returns fields of posts which wp-json should return (`_fields`) - only the ones used by the search,
+        content is needed to check if it contains the ingredients
+        """
+        return ["id", "title", "link", "categories", "tags", self.get_meal_types_taxonomy(), "content"]
+
+    def get_meal_types_taxonomy(self) -> str:
+        """ Returns name of the taxonomy meal types are searched by, e.x. 'categories' for '&categories=' """
+        return self.meal_type_param.strip("&=")
+
     def meal_type_trans(self, group_type:str=None) -> list:
         """ Converts universally written meal_types to website's specific format """
         raise NotImplementedError()
@@ -0,0 +1,57 @@
+import contextvars
+import time
+
+
+class DeadlineExceeded(Exception):
+    """ Raised when search's deadline has passed, so its requests and paging loops stop """
+
+
+class Deadline:
+    """
+    Time budget of the whole search, e.x. `Deadline(5)` - the search has to end within 5 seconds.
+    Deadline of the running search is kept in a context variable, so every request sent by the search
+    (in any thread that copied the context) can clamp its timeout to the time that's left.
+    """
+    def __init__(self, seconds:float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """ Returns number of seconds left, 0 if the deadline has passed """
+        return max(self.expires_at - time.monotonic(), 0)
+
+    def expired(self) -> bool:
+        """ Returns True if the deadline has passed """
+        return self.remaining() == 0
+
+    def check(self) -> None:
+        """ Raises DeadlineExceeded if the deadline has passed """
+        if self.expired():
+            raise DeadlineExceeded(f"Deadline of {self.seconds}s exceeded")
+
+    def get_timeout(self, timeout:float) -> float:
+        """ Returns request's timeout clamped to the time left, raises DeadlineExceeded if there's no time left """
+        self.check()
+        return min(timeout, self.remaining())
+
+
+_search_deadline = contextvars.ContextVar("search_deadline", default=None)
+
+
+def get_deadline() -> Deadline or None:
+    """ Returns deadline of the running search or None if the search has no deadline """
+    return _search_deadline.get()
+
+
+def set_deadline(deadline:Deadline or None) -> None:
+    """ Sets the deadline as the running search's one in the current context (e.x. in search's own asyncio task) """
+    _search_deadline.set(deadline)
+
+
+def run_with_deadline(deadline:Deadline or None, func, *args, **kwargs):
+    """ Calls `func` with the deadline set as the running search's one """
+    token = _search_deadline.set(deadline)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _search_deadline.reset(token)
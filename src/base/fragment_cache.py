@@ -0,0 +1,130 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from src.base.utils import FRAGMENT_CACHE_MAX_BYTES, FRAGMENT_CACHE_TTL
+
+
+class FrozenDict(Mapping):
+    """ Read-only dict - cached fragments are shared by all searches, so nothing may change them """
+    __slots__ = ("_dict",)
+
+    def __init__(self, *args, **kwargs):
+        self._dict = dict(*args, **kwargs)
+
+    def __getitem__(self, key):
+        return self._dict[key]
+
+    def __iter__(self):
+        return iter(self._dict)
+
+    def __len__(self) -> int:
+        return len(self._dict)
+
+    def __repr__(self) -> str:
+        return f"FrozenDict({self._dict!r})"
+
+    def __reduce__(self):
+        return FrozenDict, (self._dict,)
+
+
+def freeze(value):
+    """ Returns immutable version of the value - dicts become FrozenDicts, lists and tuples tuples, sets frozensets """
+    if isinstance(value, Mapping):
+        return FrozenDict({key: freeze(val) for key, val in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(val) for val in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    return value
+
+
+def get_size(value, seen:set=None) -> int:
+    """ Returns approximate number of bytes taken by the frozen value, objects shared by its parts are counted once """
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, FrozenDict):
+        size += sys.getsizeof(value._dict)
+        size += sum(get_size(key, seen) + get_size(val, seen) for key, val in value.items())
+    elif isinstance(value, (tuple, frozenset)):
+        size += sum(get_size(val, seen) for val in value)
+    return size
+
+
+class FragmentCache:
+    """
+    In-memory LRU cache of results of scrapers' sub-queries for one ingredient (fragments), e.x. posts returned
+    by wp-json for '&search=tofu', keyed by website's name, ingredient and meal types.
+
+    Search for many ingredients is composed of the fragments - partial match is their union, full match
+    (on websites checking ingredients on their own, e.x. in post's content) their intersection, so a search
+    overlapping with the earlier ones requests only ingredients which haven't been searched yet.
+
+    Scrapers keep only the part of the fragment they need (see `BaseScraper.compact_fragment`). Fragments are
+    frozen when they're saved and shared by the searches without copying, the cache is limited by their
+    approximate size in bytes.
+    """
+    def __init__(self, max_bytes:int=FRAGMENT_CACHE_MAX_BYTES, ttl:float=FRAGMENT_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl  # seconds the fragment is used
+
+        self.entries = OrderedDict()  # key: (fragment, size, saved_at), the least recently used first
+        self.used_bytes = 0
+        self.lock = threading.Lock()
+
+    def get_key(self, web_name:str, ingr, meal_types:list=None) -> tuple:
+        """ Returns key of the fragment - ingredient is case-folded, meal types' order doesn't matter """
+        if isinstance(ingr, str):
+            ingr = ingr.strip().casefold()
+        meal_types = None if meal_types is None else tuple(sorted(set(meal_types), key=str))
+        return web_name, ingr, meal_types
+
+    def get(self, key:tuple):
+        """ Returns the cached (frozen) fragment or None if there's no fragment or it's too old """
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+
+            fragment, _, saved_at = entry
+            if now - saved_at > self.ttl:
+                self.remove(key)
+                return None
+            self.entries.move_to_end(key)
+        return fragment
+
+    def set(self, key:tuple, fragment) -> None:
+        """
+        Saves frozen fragment, removes the least recently used ones if the cache is full.
+        Fragment bigger than the whole cache isn't saved
+        """
+        fragment = freeze(fragment)
+        size = get_size(fragment)
+        with self.lock:
+            self.remove(key)
+            if size > self.max_bytes:
+                return
+
+            self.entries[key] = (fragment, size, time.monotonic())
+            self.used_bytes += size
+            while self.used_bytes > self.max_bytes:
+                self.remove(next(iter(self.entries)))
+
+    def remove(self, key:tuple) -> None:
+        """ Removes the fragment if it's cached, must be called with the lock """
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.used_bytes -= entry[1]
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.used_bytes = 0
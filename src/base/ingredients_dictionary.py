@@ -0,0 +1,138 @@
+"""
+Polish to english translations of the most popular ingredients, used before asking the network translator.
+"""
+
+PL_EN_INGREDIENTS = {
+    # vegetables
+    "awokado": "avocado",
+    "bakłażan": "eggplant",
+    "batat": "sweet potato",
+    "bataty": "sweet potatoes",
+    "brokuł": "broccoli",
+    "brokuły": "broccoli",
+    "brukselka": "brussels sprouts",
+    "burak": "beetroot",
+    "buraki": "beetroots",
+    "cebula": "onion",
+    "cukinia": "zucchini",
+    "czosnek": "garlic",
+    "dynia": "pumpkin",
+    "fasolka szparagowa": "green beans",
+    "groszek": "peas",
+    "jarmuż": "kale",
+    "kalafior": "cauliflower",
+    "kapusta": "cabbage",
+    "kukurydza": "corn",
+    "marchew": "carrot",
+    "marchewka": "carrot",
+    "ogórek": "cucumber",
+    "papryka": "bell pepper",
+    "pieczarki": "mushrooms",
+    "grzyby": "mushrooms",
+    "pietruszka": "parsley",
+    "pomidor": "tomato",
+    "pomidory": "tomatoes",
+    "por": "leek",
+    "rzodkiewka": "radish",
+    "sałata": "lettuce",
+    "seler": "celery",
+    "szczypiorek": "chives",
+    "szparagi": "asparagus",
+    "szpinak": "spinach",
+    "ziemniak": "potato",
+    "ziemniaki": "potatoes",
+    "rukola": "arugula",
+    "imbir": "ginger",
+    # fruits
+    "ananas": "pineapple",
+    "arbuz": "watermelon",
+    "banan": "banana",
+    "banany": "bananas",
+    "borówki": "blueberries",
+    "brzoskwinia": "peach",
+    "cytryna": "lemon",
+    "daktyle": "dates",
+    "gruszka": "pear",
+    "jabłko": "apple",
+    "jabłka": "apples",
+    "jagody": "berries",
+    "limonka": "lime",
+    "malina": "raspberry",
+    "maliny": "raspberries",
+    "mango": "mango",
+    "pomarańcza": "orange",
+    "rodzynki": "raisins",
+    "śliwka": "plum",
+    "śliwki": "plums",
+    "truskawka": "strawberry",
+    "truskawki": "strawberries",
+    "wiśnie": "cherries",
+    "żurawina": "cranberry",
+    "kokos": "coconut",
+    # legumes, grains and pasta
+    "ciecierzyca": "chickpeas",
+    "cieciorka": "chickpeas",
+    "fasola": "beans",
+    "soczewica": "lentils",
+    "tofu": "tofu",
+    "tempeh": "tempeh",
+    "seitan": "seitan",
+    "edamame": "edamame",
+    "soja": "soy",
+    "ryż": "rice",
+    "kasza": "groats",
+    "kasza jaglana": "millet",
+    "kasza gryczana": "buckwheat",
+    "komosa ryżowa": "quinoa",
+    "quinoa": "quinoa",
+    "kuskus": "couscous",
+    "bulgur": "bulgur",
+    "makaron": "pasta",
+    "płatki owsiane": "oats",
+    "owies": "oats",
+    "mąka": "flour",
+    "chleb": "bread",
+    # nuts and seeds
+    "orzechy": "nuts",
+    "orzechy włoskie": "walnuts",
+    "orzechy laskowe": "hazelnuts",
+    "orzeszki ziemne": "peanuts",
+    "masło orzechowe": "peanut butter",
+    "migdały": "almonds",
+    "nerkowce": "cashews",
+    "pistacje": "pistachios",
+    "sezam": "sesame",
+    "tahini": "tahini",
+    "siemię lniane": "flaxseed",
+    "chia": "chia",
+    "słonecznik": "sunflower seeds",
+    "pestki dyni": "pumpkin seeds",
+    # others
+    "bazylia": "basil",
+    "kolendra": "coriander",
+    "mięta": "mint",
+    "kurkuma": "turmeric",
+    "cynamon": "cinnamon",
+    "kakao": "cocoa",
+    "czekolada": "chocolate",
+    "cukier": "sugar",
+    "miód": "honey",
+    "syrop klonowy": "maple syrup",
+    "oliwa": "olive oil",
+    "oliwki": "olives",
+    "olej kokosowy": "coconut oil",
+    "mleko kokosowe": "coconut milk",
+    "mleko roślinne": "plant milk",
+    "mleko sojowe": "soy milk",
+    "mleko owsiane": "oat milk",
+    "jogurt": "yogurt",
+    "ser": "cheese",
+    "jajka": "eggs",
+    "pesto": "pesto",
+    "hummus": "hummus",
+    "curry": "curry",
+    "sos sojowy": "soy sauce",
+    "drożdże": "yeast",
+    "płatki drożdżowe": "nutritional yeast",
+    "wegańskie": "vegan",
+}
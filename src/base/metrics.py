@@ -0,0 +1,207 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+RECIPES_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+def _labels_key(labels:dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels_key:tuple, extra:tuple=()) -> str:
+    labels = list(labels_key) + list(extra)
+    if not labels:
+        return ""
+    escaped = [(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+               for name, value in labels]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value:float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """ Number of events (e.x. errors), separately for every set of labels """
+    TYPE = "counter"
+
+    def __init__(self, name:str, documentation:str):
+        self.name = name
+        self.documentation = documentation
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, value:float=1, **labels) -> None:
+        key = _labels_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def snapshot(self) -> list:
+        with self.lock:
+            return [{"labels": dict(key), "value": value} for key, value in self.values.items()]
+
+    def render(self) -> list:
+        with self.lock:
+            return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in self.values.items()]
+
+
+class Histogram:
+    """
+    Distribution of observed values (e.x. requests' latencies) in cumulative buckets, with their sum and count,
+    separately for every set of labels
+    """
+    TYPE = "histogram"
+
+    def __init__(self, name:str, documentation:str, buckets:tuple=SECONDS_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}  # labels: [counts of buckets (the last one is +Inf), sum]
+        self.lock = threading.Lock()
+
+    def observe(self, value:float, **labels) -> None:
+        key = _labels_key(labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            values = self.values.get(key)
+            if values is None:
+                values = [[0] * (len(self.buckets) + 1), 0]
+                self.values[key] = values
+            values[0][position] += 1
+            values[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """ Observes number of seconds the block took """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> list:
+        snapshot = []
+        with self.lock:
+            for key, (counts, total) in self.values.items():
+                snapshot.append({"labels": dict(key),
+                                 "buckets": dict(zip(list(self.buckets) + [float("inf")], self._cumulative(counts))),
+                                 "sum": total,
+                                 "count": sum(counts)})
+        return snapshot
+
+    def render(self) -> list:
+        lines = []
+        with self.lock:
+            for key, (counts, total) in self.values.items():
+                for bound, count in zip(list(self.buckets) + [float("inf")], self._cumulative(counts)):
+                    lines.append(f"{self.name}_bucket{_format_labels(key, (('le', _format_value(bound)),))} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {sum(counts)}")
+        return lines
+
+    def _cumulative(self, counts:list) -> list:
+        cumulative = []
+        total = 0
+        for count in counts:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+
+class MetricsRegistry:
+    """
+    Keeps metrics and shows them as a snapshot (dict) or in Prometheus' text exposition format,
+    e.x. to be returned by a `/metrics` endpoint
+    """
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def counter(self, name:str, documentation:str) -> Counter:
+        """ Returns counter of the name, creates it if there's no such metric yet """
+        return self.get_or_create(name, lambda: Counter(name, documentation))
+
+    def histogram(self, name:str, documentation:str, buckets:tuple=SECONDS_BUCKETS) -> Histogram:
+        """ Returns histogram of the name, creates it if there's no such metric yet """
+        return self.get_or_create(name, lambda: Histogram(name, documentation, buckets))
+
+    def get_or_create(self, name:str, create):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = create()
+                self.metrics[name] = metric
+            return metric
+
+    def snapshot(self) -> dict:
+        """ Returns {metric's name: list of its values for every set of labels} """
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    def render(self) -> str:
+        """ Returns metrics in Prometheus' text format """
+        with self.lock:
+            metrics = list(self.metrics.values())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.TYPE}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class SearchMetrics:
+    """ Metrics of the scrapers (labeled with website's name) and of the whole searches """
+    def __init__(self, registry:MetricsRegistry=None):
+        self.registry = MetricsRegistry() if registry is None else registry
+        registry = self.registry
+
+        self.request_seconds = registry.histogram(
+            "scraper_request_seconds", "Latency of requests sent to the website")
+        self.response_bytes = registry.histogram(
+            "scraper_response_bytes", "Size of website's responses", BYTES_BUCKETS)
+        self.parse_seconds = registry.histogram(
+            "scraper_parse_seconds", "Time of getting recipes from one website's response")
+        self.search_seconds = registry.histogram(
+            "scraper_search_seconds", "Time of the whole website's search")
+        self.recipes = registry.histogram(
+            "scraper_recipes", "Number of recipes returned by the website's search", RECIPES_BUCKETS)
+        self.errors = registry.counter(
+            "scraper_errors_total", "Failed requests and searches of the website")
+        self.timeouts = registry.counter(
+            "scraper_timeouts_total", "Requests which timed out and searches which missed the deadline")
+        self.skipped = registry.counter(
+            "scraper_skipped_total", "Searches of the website skipped because its circuit breaker was open")
+        self.known_empty = registry.counter(
+            "scraper_known_empty_total", "Searches of the website skipped because it has no recipes for the ingredients")
+        self.coalesced = registry.counter(
+            "scraper_coalesced_requests_total", "Website's requests which shared an identical request in flight")
+        self.cache_requests = registry.counter(
+            "scraper_cache_requests_total", "Website's requests answered from the cache (hits, revalidated) or not")
+        self.fragment_requests = registry.counter(
+            "scraper_fragment_requests_total", "Website's one-ingredient sub-queries answered from the fragment cache or not")
+
+        self.first_result_seconds = registry.histogram(
+            "search_first_result_seconds", "Time from the start of the search to the first website's recipes")
+        self.total_seconds = registry.histogram(
+            "search_seconds", "Time of the whole search of all websites")
+        self.incomplete = registry.counter(
+            "search_incomplete_total", "Websites which weren't searched before the search's deadline")
+
+    def snapshot(self) -> dict:
+        return self.registry.snapshot()
+
+    def render(self) -> str:
+        return self.registry.render()
+
+
+METRICS = SearchMetrics()  # default metrics, shared by all scrapers and managers
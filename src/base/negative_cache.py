@@ -0,0 +1,69 @@
+import threading
+import time
+from collections import OrderedDict
+
+from src.base.utils import IngrMatch, NEGATIVE_CACHE_TTL, NEGATIVE_CACHE_SITE_SIZE
+
+
+class NegativeCache:
+    """
+    Remembers ingredients (with meal types) websites have no recipes for, e.x. Weganon has nothing for 'tempeh',
+    so searches which can't find anything on the website don't send its requests at all.
+
+    Only searches for one ingredient are remembered. Website without recipes for the ingredient
+    has none for the ingredient with any meal types and none for any full match containing it - and none
+    for partial match if all its ingredients are remembered.
+    """
+    def __init__(self, ttl:float=NEGATIVE_CACHE_TTL, site_size:int=NEGATIVE_CACHE_SITE_SIZE):
+        self.ttl = ttl  # seconds after which the website is searched for the ingredient again
+        self.site_size = site_size
+
+        self.sites = {}  # website: {(ingredient, meal types): saved_at}, the oldest first
+        self.lock = threading.Lock()
+
+    def get_key(self, ingr:str, meal_types:list=None) -> tuple:
+        meal_types = None if meal_types is None else tuple(sorted(set(meal_types)))
+        return str(ingr).strip().casefold(), meal_types
+
+    def add_empty_search(self, site:str, ingrs:list, meal_types:list=None) -> None:
+        """ Remembers website's search which has found nothing - if it was a search for one ingredient """
+        keys = {self.get_key(ingr, meal_types) for ingr in ingrs}
+        if len(keys) != 1:
+            return  # nothing is known about every ingredient of the search
+
+        key = keys.pop()
+        with self.lock:
+            entries = self.sites.setdefault(site, OrderedDict())
+            entries[key] = time.monotonic()
+            entries.move_to_end(key)
+            while len(entries) > self.site_size:
+                entries.popitem(last=False)
+
+    def is_empty(self, site:str, ingrs:list, meal_types:list=None, ingrs_match:str=IngrMatch.FULL) -> bool:
+        """ Returns True if the website is known to have no recipes for the search """
+        if not ingrs:
+            return False
+
+        are_empty = [self.is_ingr_empty(site, ingr, meal_types) for ingr in ingrs]
+        return any(are_empty) if ingrs_match == IngrMatch.FULL else all(are_empty)
+
+    def is_ingr_empty(self, site:str, ingr:str, meal_types:list=None) -> bool:
+        """ Returns True if the website has no recipes for the ingredient - with any meal types or with these ones """
+        now = time.monotonic()
+        keys = {self.get_key(ingr), self.get_key(ingr, meal_types)}
+        with self.lock:
+            entries = self.sites.get(site, {})
+            for key in keys:
+                saved_at = entries.get(key)
+                if saved_at is not None and now - saved_at < self.ttl:
+                    return True
+        return False
+
+    def get_stats(self) -> dict:
+        """ Returns {website: number of remembered ingredients} """
+        with self.lock:
+            return {site: len(entries) for site, entries in self.sites.items()}
+
+    def clear(self) -> None:
+        with self.lock:
+            self.sites.clear()
@@ -0,0 +1,24 @@
+import threading
+
+
+class PagesBudget:
+    """
+    Number of pages which may be requested needlessly (after the last page) by one search of a website.
+    Pagings of the search's ingredients share it, so pages are requested ahead only while the budget lasts
+    and the rest of pages is requested one by one (see `BaseScraper.get_pages_responses`)
+    """
+    def __init__(self, pages:int):
+        self.pages = pages
+        self.lock = threading.Lock()
+
+    def take(self, pages:int) -> int:
+        """ Takes at most `pages` pages of the budget, returns number of taken ones """
+        with self.lock:
+            taken = max(min(pages, self.pages), 0)
+            self.pages -= taken
+            return taken
+
+    def give_back(self, pages:int) -> None:
+        """ Returns pages taken, but not wasted, to the budget """
+        with self.lock:
+            self.pages += pages
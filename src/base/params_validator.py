@@ -1,6 +1,6 @@
 import logging
 
-from src.base.utils import MealType, IngrMatch
+from src.base.utils import MealType, IngrMatch, RankBy, MAX_RANKED_RECIPES
 
 
 class ParamsValidator:
@@ -148,3 +148,26 @@ class ParamsValidator:
             response["error"]["ingrs_match"] = error
 
         return can_continue, ingrs_match, response
+
+    def is_ranking_valid(self, limit:int, rank_by:str, response:dict) -> (bool, dict):
+        """ Checks if `limit` (None or positive int) and `rank_by` (None or RankBy variable value) are valid
+
+        Returns:
+            can_continue [bool] - True if limit and rank_by are valid, otherwise False
+            manager_response [dict] - managers response with added errors or messages
+        """
+        error = ""
+
+        if limit is not None and (not isinstance(limit, int) or isinstance(limit, bool)):
+            error = f"`limit` is {type(limit)}, must be an int"
+
+        elif limit is not None and not 0 < limit <= MAX_RANKED_RECIPES:
+            error = f"`limit` must be between 1 and {MAX_RANKED_RECIPES}, is {limit}"
+
+        elif rank_by is not None and rank_by not in RankBy.show_variables():
+            error = f"Invalid `rank_by`: '{rank_by}'"
+
+        if error:
+            response["error"]["other"] = error
+
+        return not error, response
@@ -0,0 +1,101 @@
+import logging
+import multiprocessing
+import pickle
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from src.base.deadline import DeadlineExceeded, get_deadline
+from src.base.utils import PARSE_PROCESSES, PARSE_MIN_SIZE
+
+
+def call_parser(scraper, method_name:str, args:tuple) -> list:
+    """ Returns results of scraper's parsing method (e.x. `get_data_from_response`) as a list - run by the workers """
+    return list(getattr(scraper, method_name)(*args))
+
+
+class ParsePool:
+    """
+    Pool of worker processes parsing websites' responses (e.x. html pages with BeautifulSoup), so parsing
+    of many searches runs on all cores instead of waiting for the GIL in the threads sending requests.
+    Raw body is sent to a worker and only recipes (titles and links) come back.
+
+    Responses smaller than `min_size` and scrapers which can't be sent to another process (e.x. classes defined
+    in a function) are parsed in the calling thread. Workers are started with the first big response.
+    """
+    def __init__(self, max_workers:int=PARSE_PROCESSES, min_size:int=PARSE_MIN_SIZE):
+        self.max_workers = max_workers
+        self.min_size = min_size  # bytes of response worth sending to a worker
+
+        self.executor = None
+        self.sendable = {}  # scraper's class: True if its scrapers can be sent to the workers
+        self.lock = threading.Lock()
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        with self.lock:
+            if self.executor is None:
+                # workers aren't forked from this process - its I/O threads may hold locks while it's copied
+                start_methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in start_methods else "spawn")
+                self.executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+            return self.executor
+
+    def can_send(self, scraper) -> bool:
+        """ Returns True if the scraper can be sent to the workers, checked once for every scraper's class """
+        scraper_class = type(scraper)
+        sendable = self.sendable.get(scraper_class)
+        if sendable is None:
+            try:
+                pickle.dumps(scraper)
+                sendable = True
+            except Exception:
+                logging.debug(f"{scraper} can't be sent to the parse workers, its responses are parsed in threads")
+                sendable = False
+            self.sendable[scraper_class] = sendable
+        return sendable
+
+    def submit(self, scraper, method_name:str, *args, size:int=0) -> Future or None:
+        """
+        Returns future of the parsing method's results computed by a worker or None if the response (of `size`
+        bytes) should be parsed in the calling thread
+        """
+        if size < self.min_size or not self.can_send(scraper):
+            return None
+        try:
+            return self.get_executor().submit(call_parser, scraper, method_name, args)
+        except BrokenProcessPool:
+            self.reset()
+            return None
+
+    def run(self, scraper, method_name:str, *args, size:int=0) -> list:
+        """
+        Returns results of scraper's parsing method as a list, computed by a worker if the response is big enough.
+        Waits for the worker until the search's deadline
+        """
+        future = self.submit(scraper, method_name, *args, size=size)
+        if future is None:
+            return call_parser(scraper, method_name, args)
+
+        deadline = get_deadline()
+        try:
+            return future.result(timeout=deadline.remaining() if deadline is not None else None)
+        except TimeoutError:
+            future.cancel()
+            raise DeadlineExceeded(f"Deadline of {deadline.seconds}s exceeded while parsing {scraper}'s response")
+        except BrokenProcessPool:
+            logging.warning(f"Parse worker died, {scraper}'s response is parsed in the thread")
+            self.reset()
+            return call_parser(scraper, method_name, args)
+
+    def reset(self) -> None:
+        """ Drops broken pool, the next big response starts new workers """
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
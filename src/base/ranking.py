@@ -0,0 +1,61 @@
+import heapq
+
+from src.base.utils import RankBy
+from src.base.text_matching import get_ingredients_matcher
+
+
+class TopRecipes:
+    """
+    Keeps `limit` best recipes of the search (all of them if `limit` is None) while websites' recipes come in.
+    Recipe's score is number of searched ingredients in its title and precision of its website (PRECISE_SEARCH),
+    `rank_by` tells which one counts first. Titles are matched against the ingredients the way they're searched
+    on the recipe's website (e.x. translated ones on english websites). Recipes are kept in a min-heap of at most
+    `limit` elements - the worst kept recipe is at the top and is replaced by a better one, so memory doesn't grow
+    with number of found recipes. Of equally scored recipes the earlier found ones are kept.
+    """
+    def __init__(self, limit:int or None, ingrs:list, rank_by:str=RankBy.INGREDIENTS):
+        self.limit = limit
+        self.ingrs = ingrs
+        self.rank_by = rank_by
+
+        self.heap = []
+        self.n_added = 0
+
+    def get_score(self, recipe:dict, precise:bool, matcher) -> tuple:
+        """ Returns recipe's score, the greater the better - `matcher` finds the ingredients in its title """
+        n_ingrs = len(matcher.find(recipe["title"].lower()))
+        if self.rank_by == RankBy.PRECISION:
+            return int(precise), n_ingrs
+        return n_ingrs, int(precise)
+
+    def add(self, web_recipes:dict, precise:bool=False, web_ingrs:list=None) -> None:
+        """
+        Adds website's recipes (dict like the ones in manager's response), `web_ingrs` are the searched ingredients
+        the way they're searched on the website (by default the searched ones)
+        """
+        web = {name: value for name, value in web_recipes.items() if name not in ["recipes", "n_recipes"]}
+        matcher = get_ingredients_matcher(self.ingrs if web_ingrs is None else web_ingrs)
+        for recipe in web_recipes["recipes"]:
+            # -n_added - of equal scores the later found recipe is the smaller one
+            item = (self.get_score(recipe, precise, matcher), -self.n_added, recipe, web)
+            self.n_added += 1
+
+            if self.limit is None or len(self.heap) < self.limit:
+                heapq.heappush(self.heap, item)
+            elif item[:2] > self.heap[0][:2]:
+                heapq.heapreplace(self.heap, item)
+
+    def get_websites_recipes(self) -> list:
+        """
+        Returns kept recipes as websites' dicts (like the ones in manager's response). Websites are in order
+        of their best recipes, recipes are in order of their scores and have their 'rank' in the whole search
+        """
+        websites = {}
+        for rank, (_, _, recipe, web) in enumerate(sorted(self.heap, key=lambda item: item[:2], reverse=True), 1):
+            if web["web_name"] not in websites:
+                websites[web["web_name"]] = {**web, "recipes": []}
+            websites[web["web_name"]]["recipes"].append({**recipe, "rank": rank})
+
+        for web_recipes in websites.values():
+            web_recipes["n_recipes"] = len(web_recipes["recipes"])
+        return list(websites.values())
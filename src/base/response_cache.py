@@ -0,0 +1,179 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import timedelta
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from src.base.utils import RESPONSE_CACHE_PATH, RESPONSE_CACHE_MEMORY_SIZE, RESPONSE_CACHE_DISK_SIZE
+
+
+class ResponseCache:
+    """
+    Cache of websites' responses, keyed by url and headers which change the response.
+    Responses are kept in a small in-memory tier in front of a size-bounded on-disk (SQLite) tier with compressed
+    bodies. Both tiers evict the least recently used responses.
+
+    Entries are dicts: url, status_code, headers, content, encoding, stored_at and ttl (seconds the response is
+    fresh). Stale responses with ETag or Last-Modified are revalidated with a conditional request.
+    """
+    KEY_HEADERS = ["Accept", "Accept-Language"]  # request's headers which change the response
+    CACHEABLE_STATUS_CODES = [200, 404]  # 404 ends paging, so it's worth remembering too
+
+    def __init__(self, path:str=RESPONSE_CACHE_PATH, memory_size:int=RESPONSE_CACHE_MEMORY_SIZE,
+                 disk_size:int=RESPONSE_CACHE_DISK_SIZE):
+        self.path = path
+        self.memory_size = memory_size  # max number of responses kept in memory
+        self.disk_size = disk_size  # max number of bytes of compressed bodies kept on disk
+
+        self.memory = OrderedDict()  # the least recently used responses first
+        self.connection = None  # opened with the first use
+
+        self.stats = {}  # {scraper's name: {"hits": int, "misses": int, "revalidated": int}}
+        self.lock = threading.Lock()
+
+    def get_key(self, url:str, headers:dict) -> str:
+        """ Returns key of the request - its url and values of headers which change the response """
+        key_headers = [f"{name}={headers.get(name, '')}" for name in self.KEY_HEADERS]
+        return "|".join([url, *key_headers])
+
+    def get(self, key:str) -> dict or None:
+        """ Returns cached entry (fresh or stale) or None """
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+                return entry
+
+            entry = self.get_from_disk(key)
+            if entry is not None:
+                self.remember(key, entry)
+            return entry
+
+    def set(self, key:str, entry:dict) -> None:
+        """ Saves entry in memory and on disk """
+        with self.lock:
+            self.remember(key, entry)
+            self.save_on_disk(key, entry)
+
+    def refresh(self, key:str, entry:dict) -> None:
+        """ Marks entry as fresh again - after the website confirmed it hasn't changed (304) """
+        entry["stored_at"] = time.time()
+        self.set(key, entry)
+
+    def is_fresh(self, entry:dict) -> bool:
+        """ Returns True if the entry may be used without asking the website """
+        return time.time() - entry["stored_at"] < entry["ttl"]
+
+    def is_cacheable(self, response:requests.models.Response) -> bool:
+        """ Returns True if the response may be cached """
+        if response.status_code not in self.CACHEABLE_STATUS_CODES:
+            return False
+        if "no-store" in response.headers.get("Cache-Control", ""):
+            return False
+        return response.status_code != 200 or len(response.content) != 0
+
+    def get_validators(self, entry:dict) -> dict:
+        """ Returns headers making the request conditional - website answers 304 if the response hasn't changed """
+        headers = {}
+        if entry["headers"].get("ETag"):
+            headers["If-None-Match"] = entry["headers"]["ETag"]
+        if entry["headers"].get("Last-Modified"):
+            headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+        return headers
+
+    def from_response(self, response:requests.models.Response, ttl:int) -> dict:
+        """ Returns entry made of the response """
+        return {"url": response.url,
+                "status_code": response.status_code,
+                "headers": CaseInsensitiveDict(response.headers),
+                "content": response.content,
+                "encoding": response.encoding,
+                "stored_at": time.time(),
+                "ttl": ttl}
+
+    def to_response(self, entry:dict) -> requests.models.Response:
+        """ Returns response made of the entry, the same as the one returned by requests """
+        response = requests.models.Response()
+        response.url = entry["url"]
+        response.status_code = entry["status_code"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response._content = entry["content"]
+        response.encoding = entry["encoding"]
+        response.elapsed = timedelta(0)
+        return response
+
+    def add_stat(self, scraper_name:str, stat:str) -> None:
+        """ Counts hit, miss or revalidation of the scraper's request """
+        with self.lock:
+            scraper_stats = self.stats.setdefault(scraper_name, {"hits": 0, "misses": 0, "revalidated": 0})
+            scraper_stats[stat] += 1
+
+    def get_stats(self, scraper_name:str=None) -> dict:
+        """ Returns copy of the stats of all scrapers or of the scraper """
+        with self.lock:
+            if scraper_name is not None:
+                return dict(self.stats.get(scraper_name, {"hits": 0, "misses": 0, "revalidated": 0}))
+            return {name: dict(scraper_stats) for name, scraper_stats in self.stats.items()}
+
+    def remember(self, key:str, entry:dict) -> None:
+        """ Puts entry in memory, removes the least recently used one if there's too many of them """
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def get_connection(self) -> sqlite3.Connection:
+        """ Returns connection to the database, creates the table if it doesn't exist """
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS responses ("
+                                    "key TEXT PRIMARY KEY, meta TEXT, content BLOB, size INTEGER, accessed_at REAL)")
+            self.connection.commit()
+        return self.connection
+
+    def get_from_disk(self, key:str) -> dict or None:
+        """ Returns entry saved on disk or None """
+        connection = self.get_connection()
+        row = connection.execute("SELECT meta, content FROM responses WHERE key = ?", [key]).fetchone()
+        if row is None:
+            return None
+
+        connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", [time.time(), key])
+        connection.commit()
+
+        meta, content = row
+        entry = json.loads(meta)
+        entry["headers"] = CaseInsensitiveDict(entry["headers"])
+        entry["content"] = zlib.decompress(content)
+        return entry
+
+    def save_on_disk(self, key:str, entry:dict) -> None:
+        """
+        Saves entry with compressed body on disk, removes the least recently used ones if they take too much.
+        The database may be shared by many processes, so the taken size is counted in the saving transaction
+        """
+        meta = {name: value for name, value in entry.items() if name != "content"}
+        meta["headers"] = dict(meta["headers"])
+        content = zlib.compress(entry["content"])
+        if len(content) > self.disk_size:
+            return
+
+        connection = self.get_connection()
+        connection.execute("INSERT OR REPLACE INTO responses (key, meta, content, size, accessed_at) "
+                           "VALUES (?, ?, ?, ?, ?)", [key, json.dumps(meta), content, len(content), time.time()])
+
+        disk_used = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        while disk_used > self.disk_size:
+            row = connection.execute("SELECT key, size FROM responses ORDER BY accessed_at LIMIT 1").fetchone()
+            if row is None:
+                break
+            oldest_key, size = row
+            connection.execute("DELETE FROM responses WHERE key = ?", [oldest_key])
+            disk_used -= size
+
+        connection.commit()
@@ -0,0 +1,74 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from src.base.utils import IngrMatch, SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL, SEARCH_CACHE_STALE_TTL
+
+
+class SearchCache:
+    """
+    In-memory LRU cache of managers' responses, keyed by the canonical form of the search - set of case-folded
+    ingredients, set of meal types, ingredients' match and manager's options (e.x. `precise`), so
+    ['tofu', 'pesto'] and ['Pesto', 'tofu'] are the same search.
+
+    Response younger than `ttl` is fresh. Older one (but younger than `stale_ttl`) is stale - it's still returned
+    at once, while the search is refreshed in the background (stale-while-revalidate).
+    """
+    def __init__(self, max_size:int=SEARCH_CACHE_SIZE, ttl:float=SEARCH_CACHE_TTL,
+                 stale_ttl:float=SEARCH_CACHE_STALE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl  # seconds the response is fresh
+        self.stale_ttl = stale_ttl  # seconds the response may be returned while it's refreshed
+
+        self.entries = OrderedDict()  # key: (response, saved_at), the least recently used first
+        self.refreshing = set()  # keys of searches being refreshed
+        self.lock = threading.Lock()
+
+    def get_key(self, params:dict, **options) -> tuple:
+        """ Returns key of the search with validated params """
+        ingrs = tuple(sorted({ingr.strip().casefold() for ingr in params["ingrs"]}))
+        meal_types = tuple(sorted(set(params.get("meal_types") or [])))
+        ingrs_match = params.get("ingrs_match") or IngrMatch.FULL
+        return (ingrs, meal_types, ingrs_match) + tuple(sorted(options.items()))
+
+    def get(self, key:tuple) -> (dict or None, bool):
+        """ Returns copy of the cached response (None if there's no response or it's too old) and True if it's stale """
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None, False
+
+            response, saved_at = entry
+            if now - saved_at > self.stale_ttl:
+                del self.entries[key]
+                return None, False
+            self.entries.move_to_end(key)
+
+        return copy.deepcopy(response), now - saved_at > self.ttl
+
+    def set(self, key:tuple, response:dict) -> None:
+        """ Saves copy of the response, removes the least recently used ones if the cache is full """
+        response = copy.deepcopy(response)
+        with self.lock:
+            self.entries[key] = (response, time.monotonic())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def start_refresh(self, key:tuple) -> bool:
+        """ Returns True if the search should be refreshed - False if it's already being refreshed """
+        with self.lock:
+            if key in self.refreshing:
+                return False
+            self.refreshing.add(key)
+            return True
+
+    def end_refresh(self, key:tuple) -> None:
+        with self.lock:
+            self.refreshing.discard(key)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
@@ -0,0 +1,65 @@
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.base.utils import POOL_CONNECTIONS, POOL_MAXSIZE
+
+
+class SessionPool:
+    """
+    Keeps one pooled, keep-alive `requests.Session` per host, so requests sent to the same website
+    reuse already opened TCP/TLS connections - within one search and between searches.
+    """
+    def __init__(self, pool_connections:int=POOL_CONNECTIONS, pool_maxsize:int=POOL_MAXSIZE):
+        self.pool_connections = pool_connections  # number of connection pools cached by every session
+        self.pool_maxsize = pool_maxsize  # max number of connections kept open to one host
+
+        self.sessions = {}
+        self.hosts_limits = {}
+        self.lock = threading.Lock()
+
+    def get_session(self, url:str) -> requests.Session:
+        """ Returns session bound to the url's host, creates it if there's no such session yet """
+        host = self.get_host(url)
+
+        with self.lock:
+            session = self.sessions.get(host)
+            if session is None:
+                session = self.create_session()
+                self.sessions[host] = session
+
+        return session
+
+    def get_host_limit(self, url:str) -> threading.BoundedSemaphore:
+        """ Returns semaphore limiting number of requests sent to the url's host at the same time """
+        host = self.get_host(url)
+
+        with self.lock:
+            limit = self.hosts_limits.get(host)
+            if limit is None:
+                limit = threading.BoundedSemaphore(self.pool_maxsize)
+                self.hosts_limits[host] = limit
+
+        return limit
+
+    def create_session(self) -> requests.Session:
+        """ Returns new session with connection pools of configured sizes """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def get_host(self, url:str) -> str:
+        """ Returns scheme and host of the url, e.x. 'https://www.jadlonomia.com' """
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}".lower()
+
+    def close(self) -> None:
+        """ Closes all sessions and their connections """
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions = {}
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import weakref
+
+
+class SharedCallFailed(Exception):
+    """ Raised to followers when the leader's call has raised - its exception isn't shared, see SingleFlight """
+
+
+class _Call:
+    """ Call in flight - its result is shared by all callers waiting for it """
+    def __init__(self, done):
+        self.done = done  # event set when the call ends
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces identical calls made at the same time. The first caller of a key (leader) makes the call,
+    callers of the same key which come before it ends (followers) wait and get the same result.
+    Exceptions aren't shared - leader's call may have failed for reasons of its own (e.x. its search's deadline),
+    so followers get SharedCallFailed and may make the call on their own.
+    Ended calls aren't remembered, the next caller of the key makes a new call.
+    """
+    def __init__(self):
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def do(self, key, func, *args, wait_timeout:float=None, **kwargs) -> tuple:
+        """
+        Returns result of `func(*args, **kwargs)` made once for all concurrent callers of the key and True
+        if the result is shared (the call was made by another caller). Follower raises TimeoutError
+        if the call hasn't ended within `wait_timeout` seconds and SharedCallFailed if the call has raised
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call(threading.Event())
+                self.calls[key] = call
+
+        if is_leader:
+            try:
+                call.result = func(*args, **kwargs)
+                return call.result, False
+            except BaseException as error:
+                call.error = error
+                raise
+            finally:
+                with self.lock:
+                    del self.calls[key]
+                call.done.set()
+
+        if not call.done.wait(wait_timeout):
+            raise TimeoutError(f"Shared call of {key} hasn't ended within {wait_timeout}s")
+        if call.error is not None:
+            raise SharedCallFailed(f"Shared call of {key} has raised {call.error!r}") from call.error
+        return call.result, True
+
+    def get_n_calls(self) -> int:
+        """ Returns number of calls in flight """
+        with self.lock:
+            return len(self.calls)
+
+
+class AsyncSingleFlight:
+    """
+    Async version of SingleFlight - coalesces identical coroutine calls made at the same time by tasks
+    of one event loop. Calls of every loop are kept apart, asyncio events can be used only by their loop
+    """
+    def __init__(self):
+        self.loops_calls = weakref.WeakKeyDictionary()  # loop: {key: call in flight}
+
+    async def do(self, key, func, *args, wait_timeout:float=None, **kwargs) -> tuple:
+        """ Awaitable version of `SingleFlight.do`, `func` is a coroutine function """
+        calls = self.loops_calls.setdefault(asyncio.get_running_loop(), {})
+        call = calls.get(key)
+        if call is None:
+            call = _Call(asyncio.Event())
+            calls[key] = call
+            try:
+                call.result = await func(*args, **kwargs)
+                return call.result, False
+            except BaseException as error:
+                call.error = error
+                raise
+            finally:
+                del calls[key]
+                call.done.set()
+
+        try:
+            await asyncio.wait_for(call.done.wait(), wait_timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Shared call of {key} hasn't ended within {wait_timeout}s")
+        if call.error is not None:
+            raise SharedCallFailed(f"Shared call of {key} has raised {call.error!r}") from call.error
+        return call.result, True
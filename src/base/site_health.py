@@ -0,0 +1,124 @@
+import math
+import threading
+import time
+from collections import deque
+
+from src.base.utils import HEALTH_WINDOW, HEALTH_MIN_SAMPLES, HEALTH_TIMEOUT_PERCENTILE, HEALTH_TIMEOUT_FACTOR, \
+    HEALTH_MIN_TIMEOUT, BREAKER_FAILURES, BREAKER_COOLDOWN
+
+
+class CircuitState:
+    CLOSED = "closed"  # website is searched
+    OPEN = "open"  # website is skipped until the cool-down ends
+    HALF_OPEN = "half-open"  # one search (probe) checks if the website is back
+
+
+class SiteHealth:
+    """ Latencies of the last requests and state of the circuit breaker of one website """
+    def __init__(self, window:int):
+        self.latencies = deque(maxlen=window)
+        self.state = CircuitState.CLOSED
+        self.failures = 0  # consecutive failures
+        self.opened_at = None
+        self.probe_started_at = None
+
+
+class HealthTracker:
+    """
+    Tracks websites' health. Request's timeout adapts to the website - it's a percentile of its recent latencies
+    times `timeout_factor` (between `min_timeout` and scraper's TIMEOUT), so a slow request of a fast website
+    doesn't take the whole TIMEOUT.
+
+    Circuit breaker skips website after `max_failures` consecutive failed requests (timeouts, connection errors,
+    5xx and 429 answers) for `cooldown` seconds. Then one search is let through as a probe - its successful
+    request closes the circuit, failed one opens it for the next cool-down.
+    Latencies are forgotten when the circuit opens and the probe's requests get the whole `default` timeout,
+    so a website which has become slower isn't failed again by a timeout adapted to its old latencies.
+    """
+    def __init__(self, window:int=HEALTH_WINDOW, min_samples:int=HEALTH_MIN_SAMPLES,
+                 percentile:float=HEALTH_TIMEOUT_PERCENTILE, timeout_factor:float=HEALTH_TIMEOUT_FACTOR,
+                 min_timeout:float=HEALTH_MIN_TIMEOUT, max_failures:int=BREAKER_FAILURES,
+                 cooldown:float=BREAKER_COOLDOWN):
+        self.window = window
+        self.min_samples = min_samples  # latencies needed to adapt the timeout
+        self.percentile = percentile
+        self.timeout_factor = timeout_factor
+        self.min_timeout = min_timeout
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+
+        self.sites = {}
+        self.lock = threading.Lock()
+
+    def get_site(self, site:str) -> SiteHealth:
+        health = self.sites.get(site)
+        if health is None:
+            health = SiteHealth(self.window)
+            self.sites[site] = health
+        return health
+
+    def get_timeout(self, site:str, default:float) -> float:
+        """
+        Returns request's timeout adapted to the website's latencies, `default` if there are too few of them
+        or the website is probed
+        """
+        with self.lock:
+            health = self.get_site(site)
+            latencies = sorted(health.latencies)
+            state = health.state
+        if state != CircuitState.CLOSED or len(latencies) < self.min_samples:
+            return default
+
+        position = min(math.ceil(len(latencies) * self.percentile / 100) - 1, len(latencies) - 1)
+        return min(max(latencies[position] * self.timeout_factor, self.min_timeout), default)
+
+    def allow_request(self, site:str) -> bool:
+        """ Returns False if the website should be skipped - its circuit is open or another search probes it """
+        now = time.monotonic()
+        with self.lock:
+            health = self.get_site(site)
+            if health.state == CircuitState.CLOSED:
+                return True
+
+            if health.state == CircuitState.OPEN and now - health.opened_at < self.cooldown:
+                return False
+            if health.state == CircuitState.HALF_OPEN and now - health.probe_started_at < self.cooldown:
+                return False
+
+            # the cool-down has ended (or the probe didn't send any request) - this search is the probe
+            health.state = CircuitState.HALF_OPEN
+            health.probe_started_at = now
+            return True
+
+    def add_success(self, site:str, latency:float) -> None:
+        """ Saves latency of the website's request, closes its circuit """
+        with self.lock:
+            health = self.get_site(site)
+            health.latencies.append(latency)
+            health.failures = 0
+            health.state = CircuitState.CLOSED
+
+    def add_failure(self, site:str) -> None:
+        """
+        Counts website's failed request, opens its circuit (and forgets its latencies) after too many failures
+        or a failed probe
+        """
+        with self.lock:
+            health = self.get_site(site)
+            health.failures += 1
+            if health.state == CircuitState.HALF_OPEN or health.failures >= self.max_failures:
+                health.state = CircuitState.OPEN
+                health.opened_at = time.monotonic()
+                health.latencies.clear()
+
+    def get_state(self, site:str) -> str:
+        with self.lock:
+            return self.get_site(site).state
+
+    def get_stats(self) -> dict:
+        """ Returns {website: its state, consecutive failures and number of latencies} """
+        with self.lock:
+            return {site: {"state": health.state,
+                           "failures": health.failures,
+                           "n_latencies": len(health.latencies)}
+                    for site, health in self.sites.items()}
@@ -0,0 +1,71 @@
+import sqlite3
+import threading
+import time
+
+from src.base.utils import TAG_CACHE_PATH, TAG_CACHE_TTL, TAG_CACHE_MISSING_TTL
+
+
+class TagCache:
+    """
+    Persistent (SQLite) cache of websites' tags ids, e.x. {'tofu': 123} for ingredients' slugs.
+    Slugs which have no tag on the website are kept too (with None as id), so they aren't looked up again.
+
+    Websites are identified by their TAG_URL, so different taxonomies of one website don't mix.
+    """
+    def __init__(self, path:str=TAG_CACHE_PATH, ttl:int=TAG_CACHE_TTL, missing_ttl:int=TAG_CACHE_MISSING_TTL):
+        self.path = path
+        self.ttl = ttl  # seconds after which found tag is looked up again
+        self.missing_ttl = missing_ttl  # seconds after which slug without tag is looked up again
+
+        self.connection = None  # opened with the first use
+        self.lock = threading.Lock()
+
+    def get_connection(self) -> sqlite3.Connection:
+        """ Returns connection to the database, creates the table if it doesn't exist """
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS tags ("
+                                    "site TEXT, slug TEXT, tag_id INTEGER, updated_at REAL, "
+                                    "PRIMARY KEY (site, slug))")
+            self.connection.commit()
+        return self.connection
+
+    def get_tags(self, site:str, slugs:list) -> dict:
+        """ Returns {slug: tag's id or None} of the slugs which are in the cache and haven't expired """
+        if not slugs:
+            return {}
+
+        now = time.time()
+        query = f"SELECT slug, tag_id, updated_at FROM tags WHERE site = ? AND slug IN ({', '.join('?' * len(slugs))})"
+        with self.lock:
+            rows = self.get_connection().execute(query, [site, *slugs]).fetchall()
+
+        tags = {}
+        for slug, tag_id, updated_at in rows:
+            ttl = self.ttl if tag_id is not None else self.missing_ttl
+            if now - updated_at < ttl:
+                tags[slug] = tag_id
+        return tags
+
+    def set_tags(self, site:str, tags:dict) -> None:
+        """ Saves {slug: tag's id or None} of the website in one go """
+        if not tags:
+            return
+
+        now = time.time()
+        rows = [(site, slug, tag_id, now) for slug, tag_id in tags.items()]
+        with self.lock:
+            connection = self.get_connection()
+            connection.executemany("INSERT OR REPLACE INTO tags (site, slug, tag_id, updated_at) VALUES (?, ?, ?, ?)",
+                                   rows)
+            connection.commit()
+
+    def clear(self, site:str=None) -> None:
+        """ Removes all cached tags or only tags of the website """
+        with self.lock:
+            connection = self.get_connection()
+            if site is None:
+                connection.execute("DELETE FROM tags")
+            else:
+                connection.execute("DELETE FROM tags WHERE site = ?", [site])
+            connection.commit()
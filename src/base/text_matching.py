@@ -0,0 +1,57 @@
+import html
+import re
+from functools import lru_cache
+
+
+# comments, scripts and styles aren't a part of the text, the same as for BeautifulSoup's `get_text`
+_SKIPPED_HTML = re.compile(r"<!--.*?-->|<(script|style)\b[^>]*>.*?</\1\s*>", re.S | re.I)
+_HTML_TAG = re.compile(r"<[a-zA-Z/!?][^>]*>")
+
+
+def html_to_text(rendered_html:str) -> str:
+    """
+    Returns lowercased text of post's rendered html - the same as `BeautifulSoup(...).get_text().lower()`
+    for wp-json's content, without building the whole tree
+    """
+    text = _HTML_TAG.sub("", _SKIPPED_HTML.sub("", rendered_html))
+    return html.unescape(text).lower()
+
+
+class IngredientMatcher:
+    """
+    Checks which ingredients are in a text, e.x. post's content. Ingredients are normalized and deduplicated once
+    per search and, like in Aho-Corasick's output links, every ingredient knows which others it contains -
+    if 'mleko kokosowe' is found, 'mleko' is found too without looking for it.
+    """
+    def __init__(self, ingrs:list):
+        # the longest first, so ingredients contained in the found ones are skipped
+        self.patterns = sorted(dict.fromkeys(str(ingr).lower() for ingr in ingrs), key=len, reverse=True)
+        self.contained = {pattern: [other for other in self.patterns if other != pattern and other in pattern]
+                          for pattern in self.patterns}
+
+    def find(self, text:str) -> set:
+        """ Returns ingredients (lowercased) which are in the text """
+        found = set()
+        for pattern in self.patterns:
+            if pattern not in found and pattern in text:
+                found.add(pattern)
+                found.update(self.contained[pattern])
+        return found
+
+    def matches_all(self, text:str) -> bool:
+        """ Returns True if the text contains all ingredients """
+        return all(pattern in text for pattern in self.patterns)
+
+    def matches_any(self, text:str) -> bool:
+        """ Returns True if the text contains at least one ingredient """
+        return any(pattern in text for pattern in self.patterns)
+
+
+@lru_cache(maxsize=256)
+def _get_ingredients_matcher(ingrs:tuple) -> IngredientMatcher:
+    return IngredientMatcher(list(ingrs))
+
+
+def get_ingredients_matcher(ingrs:list) -> IngredientMatcher:
+    """ Returns matcher of the ingredients, the same one for all posts of the search """
+    return _get_ingredients_matcher(tuple(ingrs))
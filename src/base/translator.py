@@ -0,0 +1,132 @@
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from googletrans import Translator
+
+from src.base.ingredients_dictionary import PL_EN_INGREDIENTS
+from src.base.utils import TRANSLATIONS_PATH, TRANSLATIONS_MEMORY_SIZE
+
+
+class IngredientsTranslator:
+    """
+    Translates ingredients from polish to english. A word is looked for in the bundled dictionary,
+    then in the in-memory LRU and in the on-disk store (SQLite). Only words which are unknown to all of them
+    are translated by googletrans - all together, in one batch - and then remembered in memory and on disk.
+    """
+    def __init__(self, path:str=TRANSLATIONS_PATH, memory_size:int=TRANSLATIONS_MEMORY_SIZE,
+                 dictionary:dict=None, src:str="pl", dest:str="en"):
+        self.path = path
+        self.memory_size = memory_size
+        self.dictionary = PL_EN_INGREDIENTS if dictionary is None else dictionary
+        self.src = src
+        self.dest = dest
+
+        self.memory = OrderedDict()  # the least recently used translations first
+        self.translator = None  # created with the first network translation and reused
+        self.connection = None  # opened with the first use
+
+        self.lock = threading.Lock()  # guards memory and the database
+        self.network_lock = threading.Lock()  # one batch at once - the same words aren't translated twice
+
+    def translate(self, words:list) -> list:
+        """ Returns list of translated words in the same order """
+        words_ = [self.normalize(word) for word in words]
+        translations = self.get_known_translations(words_)
+
+        unknown_words = [word for word in dict.fromkeys(words_) if word not in translations]
+        if unknown_words:
+            translations.update(self.translate_unknown_words(unknown_words))
+
+        return [translations.get(word, word) for word in words_]
+
+    def get_translations(self, words:list) -> list:
+        """ Returns list of known translations of the words in the same order, unknown words aren't translated """
+        words_ = [self.normalize(word) for word in words]
+        translations = self.get_known_translations(words_)
+        return [translations.get(word, word) for word in words_]
+
+    def normalize(self, word:str) -> str:
+        """ Returns word the way it's kept in the cache """
+        return str(word).strip().lower()
+
+    def get_known_translations(self, words:list) -> dict:
+        """ Returns {word: translation} of words which are in the dictionary, memory or on-disk store """
+        translations = {}
+        with self.lock:
+            for word in words:
+                if word in self.dictionary:
+                    translations[word] = self.dictionary[word]
+                elif word in self.memory:
+                    self.memory.move_to_end(word)
+                    translations[word] = self.memory[word]
+
+            stored_words = [word for word in words if word not in translations]
+            for word, translation in self.get_stored_translations(stored_words).items():
+                self.remember(word, translation)
+                translations[word] = translation
+
+        return translations
+
+    def translate_unknown_words(self, words:list) -> dict:
+        """ Translates words by googletrans in one batch, remembers and returns {word: translation} """
+        with self.network_lock:
+            # the words might have been translated by another search while waiting for the lock
+            translations = self.get_known_translations(words)
+            words = [word for word in words if word not in translations]
+            if not words:
+                return translations
+
+            try:
+                if self.translator is None:
+                    self.translator = Translator()
+                translated = self.translator.translate(words, src=self.src, dest=self.dest)
+            except Exception:
+                logging.exception(f"Translation of {words} failed, they're used untranslated")
+                return translations
+
+            new_translations = {word: result.text.lower() for word, result in zip(words, translated)}
+
+        with self.lock:
+            for word, translation in new_translations.items():
+                self.remember(word, translation)
+            self.store_translations(new_translations)
+
+        translations.update(new_translations)
+        return translations
+
+    def remember(self, word:str, translation:str) -> None:
+        """ Puts translation into the memory, removes the least recently used one if there's too many of them """
+        self.memory[word] = translation
+        self.memory.move_to_end(word)
+        if len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def get_connection(self) -> sqlite3.Connection:
+        """ Returns connection to the database, creates the table if it doesn't exist """
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS translations ("
+                                    "src TEXT, dest TEXT, word TEXT, translation TEXT, "
+                                    "PRIMARY KEY (src, dest, word))")
+            self.connection.commit()
+        return self.connection
+
+    def get_stored_translations(self, words:list) -> dict:
+        """ Returns {word: translation} of words saved on disk """
+        if not words:
+            return {}
+
+        query = f"SELECT word, translation FROM translations " \
+                f"WHERE src = ? AND dest = ? AND word IN ({', '.join('?' * len(words))})"
+        rows = self.get_connection().execute(query, [self.src, self.dest, *words]).fetchall()
+        return dict(rows)
+
+    def store_translations(self, translations:dict) -> None:
+        """ Saves translations on disk """
+        rows = [(self.src, self.dest, word, translation) for word, translation in translations.items()]
+        connection = self.get_connection()
+        connection.executemany("INSERT OR REPLACE INTO translations (src, dest, word, translation) VALUES (?, ?, ?, ?)",
+                               rows)
+        connection.commit()
@@ -1,3 +1,6 @@
+from urllib.parse import urlsplit, unquote, parse_qsl, urlencode
+
+
 def do_lists_have_common_element(list_1:list, list_2:list) -> bool:
     """ Checks if two lists have at least one common element """
     if set(list_1) & set(list_2):
@@ -14,10 +17,95 @@ def list_el_merged_with_plus(list_to_merge:list) -> str:
     """ Merges list of ints/floats/strings with '+' """
     return '+'.join([str(category_id) for category_id in list_to_merge])
 
+def canonical_link(link:str) -> str:
+    """
+    Returns recipe's link written the same way as the links of its copies, e.x. 'https://www.web.pl/tofu/?utm_source=x'
+    and 'http://web.pl/tofu' both give 'web.pl/tofu' - without scheme, 'www.', default port, trailing slash,
+    fragment and tracking parameters
+    """
+    parts = urlsplit(str(link).strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[len("www."):]
+    for default_port in [":80", ":443"]:
+        if host.endswith(default_port):
+            host = host[:-len(default_port)]
+
+    path = unquote(parts.path).rstrip("/")
+    params = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                    if not name.lower().startswith("utm_") and name.lower() not in TRACKING_PARAMS)
+    query = f"?{urlencode(params)}" if params else ""
+    return f"{host}{path}{query}"
+
+def deduplicate_recipes(recipes, seen_keys:set=None) -> list:
+    """
+    Returns recipes without duplicates - recipes with the same canonical link (the first copy is kept),
+    in the same order. Keys of the returned recipes are added to `seen_keys`, so they can be omitted
+    in the next lists too
+    """
+    seen_keys = set() if seen_keys is None else seen_keys
+    unique_recipes = []
+    for recipe in recipes:
+        key = canonical_link(recipe["link"])
+        if key not in seen_keys:
+            seen_keys.add(key)
+            unique_recipes.append(recipe)
+    return unique_recipes
+
+
+TRACKING_PARAMS = ["fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "ref", "_ga"]  # and all 'utm_...' ones
 
 REQUEST_FAILED_MSG = "Request failed"
 EXCEPTION_LOG_MSG = "Exception has occurred:"
 
+POOL_CONNECTIONS = 1  # connection pools cached by a host's session - every host has its own session
+POOL_MAXSIZE = 10  # connections kept open to (and requests sent at once to) one host, one per every ingredient
+
+TAG_CACHE_PATH = "tag_cache.sqlite3"
+TAG_CACHE_TTL = 30 * 24 * 60 * 60  # found tags almost never change - a month in seconds
+TAG_CACHE_MISSING_TTL = 7 * 24 * 60 * 60  # but missing ones may be added by the author - a week in seconds
+
+TRANSLATIONS_PATH = "translations.sqlite3"
+TRANSLATIONS_MEMORY_SIZE = 2048  # translations kept in memory
+
+RESPONSE_CACHE_PATH = "response_cache.sqlite3"
+RESPONSE_CACHE_MEMORY_SIZE = 256  # responses kept in memory
+RESPONSE_CACHE_DISK_SIZE = 100 * 1024 * 1024  # bytes of compressed responses kept on disk
+
+ASYNC_MAX_REQUESTS = 64  # requests sent at the same time by all async searches in the process
+ASYNC_IO_WORKERS = 16  # threads shared by all async searches for blocking calls (translations, non-async scrapers)
+
+FAN_OUT_WORKERS = 32  # threads shared by all scrapers' concurrent requests, the calling threads make requests too
+SEARCH_WORKERS = 32  # threads shared by all ScraperManager's searches, scrapers are run there
+SEARCH_MIN_WORKERS = 8  # scrapers of one search run at the same time at least, when other searches run too
+
+HEALTH_WINDOW = 50  # number of website's last requests whose latencies are kept
+HEALTH_MIN_SAMPLES = 5  # latencies needed before the website's timeout is adapted
+HEALTH_TIMEOUT_PERCENTILE = 95
+HEALTH_TIMEOUT_FACTOR = 3  # adapted timeout is the percentile of latencies times the factor
+HEALTH_MIN_TIMEOUT = 2  # seconds, adapted timeout isn't shorter
+BREAKER_FAILURES = 3  # consecutive failed requests which open website's circuit
+BREAKER_COOLDOWN = 60  # seconds the website is skipped before it's probed again
+
+MAX_RANKED_RECIPES = 1000  # max `limit` of the ranked search
+
+SEARCH_CACHE_SIZE = 256  # number of searches whose responses are kept in memory
+SEARCH_CACHE_TTL = 10 * 60  # seconds search's response is returned without searching again
+SEARCH_CACHE_STALE_TTL = 60 * 60  # seconds older response is still returned, while the search is refreshed
+
+FRAGMENT_CACHE_MAX_BYTES = 64 * 1024 * 1024  # approximate size of sub-queries' results kept in memory
+FRAGMENT_CACHE_TTL = 30 * 60  # seconds sub-query's result is used without asking the website again
+
+NEGATIVE_CACHE_TTL = 24 * 60 * 60  # seconds website is known to have no recipes for the ingredient
+NEGATIVE_CACHE_SITE_SIZE = 10000  # number of website's ingredients without recipes kept in memory
+
+PARSE_PROCESSES = None  # worker processes parsing websites' responses, None - number of CPUs
+PARSE_MIN_SIZE = 32 * 1024  # bytes, smaller responses are parsed in the thread which got them
+
+CORPUS_PATH = "corpus.sqlite3"
+CORPUS_MAX_PAGES = 200  # max number of pages (100 posts each) of one website crawled into the corpus
+CORPUS_SYNC_INTERVAL = 15 * 60  # seconds between syncs of the corpus with the websites
+
 class IngrMatch:
     FULL = "full"
     PART = "partial"
@@ -26,6 +114,14 @@ class IngrMatch:
     def show_variables(cls):
         return [value for name, value in vars(cls).items() if name.isupper()]
 
+class RankBy:
+    INGREDIENTS = "ingredients"  # the most matched ingredients first, then recipes of precise websites
+    PRECISION = "precision"  # recipes of precise websites first, then the most matched ingredients
+
+    @classmethod
+    def show_variables(cls):
+        return [value for name, value in vars(cls).items() if name.isupper()]
+
 class CuisineType:
     VEGAN = "vegan"
     VEGETARIAN = "vegetarian"
@@ -0,0 +1,10 @@
+"""
+Imports classes of the local recipes' corpus from recipe_store, inverted_index, crawler, sync
+and local_scraper.
+"""
+
+from src.corpus.recipe_store import RecipeStore
+from src.corpus.inverted_index import InvertedIndex
+from src.corpus.crawler import CorpusCrawler
+from src.corpus.sync import CorpusSync
+from src.corpus.local_scraper import LocalScraper
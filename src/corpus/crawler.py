@@ -0,0 +1,78 @@
+import logging
+from urllib.parse import unquote
+
+from src.base import html_to_text, CORPUS_MAX_PAGES, REQUEST_FAILED_MSG
+from src.base.base_scrapers import WordPressScraper, TagsSearchingWordPressScraper
+from src.corpus.recipe_store import RecipeStore
+
+
+class CorpusCrawler:
+    """
+    Pulls all recipe posts of WordPress websites into RecipeStore, using scrapers' knowledge - their REQUEST_URLs
+    (with categories which are always included or excluded), wp-json endpoints and TAG_URLs.
+    Posts are requested 100 per page, the rest of pages concurrently after the first one tells how many there are.
+    """
+    def __init__(self, store:RecipeStore=None, max_pages:int=CORPUS_MAX_PAGES):
+        self.store = RecipeStore() if store is None else store
+        self.max_pages = max_pages
+
+    def can_crawl(self, scraper) -> bool:
+        """ Returns True if the website's posts can be pulled from wp-json """
+        return isinstance(scraper, WordPressScraper)
+
+    def crawl(self, scrapers:list) -> dict:
+        """ Crawls websites of the scrapers which can be crawled, returns {website's name: number of recipes} """
+        crawled = {}
+        for scraper in scrapers:
+            if not self.can_crawl(scraper):
+                continue
+            try:
+                crawled[scraper.NAME] = self.crawl_website(scraper)
+            except Exception:
+                logging.exception(f"Crawling {scraper} failed")
+        return crawled
+
+    def crawl_website(self, scraper:WordPressScraper) -> int:
+        """ Saves all website's posts (and tags if they're used by the search) in the store, returns number of posts """
+        if isinstance(scraper, TagsSearchingWordPressScraper):
+            self.store.set_tags(scraper.TAG_URL, self.get_tags(scraper))
+
+        recipes = [self.get_recipe_from_post(post) for post in self.get_posts(scraper, scraper.REQUEST_URL)]
+        self.store.replace_recipes(scraper.REQUEST_URL, recipes)
+        logging.info(f"{scraper} crawled, {len(recipes)} recipes")
+        return len(recipes)
+
+    def get_posts(self, scraper:WordPressScraper, url:str) -> list:
+        """ Returns items of all pages of wp-json's list, e.x. posts or tags """
+        posts = scraper.get_posts_from_request(url, max_pages=self.max_pages)
+        if posts == REQUEST_FAILED_MSG:
+            raise Exception(f"Crawling request failed: {url}")
+        return posts
+
+    def get_page_url(self, url:str, n_page:int) -> str:
+        """ Returns url of the list's page """
+        delimiter = "&" if "?" in url else "?"
+        return f"{url}{delimiter}page={n_page}"
+
+    def get_tags(self, scraper:TagsSearchingWordPressScraper) -> dict:
+        """ Returns {slug: tag's id} of all website's tags """
+        tags_url = scraper.TAG_URL.split("?")[0] + "?per_page=100"
+        return self.get_tags_from_list(self.get_posts(scraper, tags_url))
+
+    def get_tags_from_list(self, tags:list) -> dict:
+        """ Returns {slug: tag's id} of the tags returned by wp-json """
+        return {unquote(tag["slug"]).lower(): tag["id"] for tag in tags}
+
+    def get_recipe_from_post(self, post:dict) -> dict:
+        """ Returns recipe saved in the store made of the post returned by wp-json """
+        terms = {name: value for name, value in post.items()
+                 if isinstance(value, list) and all(isinstance(term_id, int) for term_id in value)}
+        text = html_to_text(post["content"]["rendered"])
+
+        return {"id": post["id"],
+                "title": post["title"]["rendered"],
+                "link": post["link"],
+                "date": post.get("date", ""),
+                "modified": post.get("modified", ""),
+                "terms": terms,
+                "text": text}
@@ -0,0 +1,74 @@
+import re
+from bisect import bisect_left
+
+
+class InvertedIndex:
+    """
+    In-memory inverted index of one website's recipes from RecipeStore. Words of recipes' text
+    and ids of their terms (categories, tags, ...) point to the recipes which contain them.
+
+    Ingredients are looked for the way live search does it - as a phrase anywhere in the text, so 'pomidor'
+    finds 'pomidory' too. The index finds recipes having words which start with the ingredient's words
+    (prefixes are found by bisect in sorted vocabulary) and only they're checked if they contain the phrase.
+    """
+    WORD_PATTERN = re.compile(r"\w+")
+
+    def __init__(self, recipes:list):
+        self.recipes = recipes  # recipes' positions are their ids in the index
+        self.words = {}  # {word: set of recipes' positions}
+        self.terms = {}  # {(taxonomy, term's id): set of recipes' positions}
+
+        for position, recipe in enumerate(recipes):
+            for word in set(self.get_words(recipe["text"])):
+                self.words.setdefault(word, set()).add(position)
+            for taxonomy, ids in recipe["terms"].items():
+                for term_id in ids:
+                    self.terms.setdefault((taxonomy, term_id), set()).add(position)
+
+        self.vocabulary = sorted(self.words)
+
+    def get_words(self, text:str) -> list:
+        """ Returns lowercased words of the text """
+        return self.WORD_PATTERN.findall(text.lower())
+
+    def find_prefix(self, prefix:str) -> set:
+        """ Returns positions of recipes having a word which starts with the prefix """
+        positions = set()
+        start = bisect_left(self.vocabulary, prefix)
+        for word in self.vocabulary[start:]:
+            if not word.startswith(prefix):
+                break
+            positions |= self.words[word]
+        return positions
+
+    def find_phrase(self, phrase:str) -> set:
+        """ Returns positions of recipes whose text contains the phrase """
+        phrase = phrase.lower()
+        words = self.get_words(phrase)
+        if not words:
+            return set()
+
+        positions = self.find_prefix(words[0])
+        for word in words[1:]:
+            positions &= self.find_prefix(word)
+        return {position for position in positions if phrase in self.recipes[position]["text"]}
+
+    def find_phrases(self, phrases:list, match_all:bool=True) -> set:
+        """ Returns positions of recipes containing all (or any) of the phrases """
+        return self.combine([self.find_phrase(phrase) for phrase in phrases], match_all)
+
+    def find_terms(self, taxonomy:str, ids:list, match_all:bool=True) -> set:
+        """ Returns positions of recipes having all (or any) of the terms of the taxonomy """
+        return self.combine([self.terms.get((taxonomy, term_id), set()) for term_id in ids], match_all)
+
+    def combine(self, positions:list, match_all:bool) -> set:
+        """ Returns common part (match_all) or union of the sets of positions """
+        if not positions:
+            return set()
+        if match_all:
+            return set.intersection(*positions)
+        return set.union(*positions)
+
+    def get_recipes(self, positions:set) -> list:
+        """ Returns recipes on the positions, in the index's (the newest first) order """
+        return [self.recipes[position] for position in sorted(positions)]
@@ -0,0 +1,107 @@
+import logging
+import threading
+
+from src.base import IngrMatch
+from src.base.base_scrapers import WordPressScraper, TagsSearchingWordPressScraper
+from src.corpus.recipe_store import RecipeStore
+from src.corpus.inverted_index import InvertedIndex
+
+
+class LocalScraper:
+    """
+    Searches website's recipes in the local corpus instead of the website, using the scraper's rules - meal types'
+    categories, excluded categories and posts, ingredients' tags. Websites which haven't been crawled
+    (and the ones whose local search failed) are searched live by the scraper.
+    """
+    def __init__(self, scraper, store:RecipeStore):
+        self.scraper = scraper
+        self.store = store
+        self.NAME = scraper.NAME
+        self.PRECISE_SEARCH = scraper.PRECISE_SEARCH
+
+        self.index = None
+        self.index_version = None
+        self.lock = threading.Lock()
+
+    def __str__(self):
+        return f"{self.scraper}"
+
+    def get_recipes(self, ingrs:list, meal_types:list=None, ingrs_match:str=IngrMatch.FULL) -> dict:
+        """ Returns recipes found in the corpus or, if the website isn't there, found live """
+        if self.can_search_locally():
+            try:
+                return self.perform_get_recipes(ingrs, meal_types, ingrs_match)
+            except Exception:
+                logging.exception(f"Local search of {self} failed, the website is searched live")
+        return self.scraper.get_recipes(ingrs, meal_types, ingrs_match)
+
+    def get_website_ingrs(self, ingrs:list) -> list:
+        """ Returns ingredients the way they're searched on the website, see `BaseScraper.get_website_ingrs` """
+        return self.scraper.get_website_ingrs(ingrs)
+
+    def is_known_empty(self, *args, **kwargs) -> bool:
+        """ Corpus is searched without requests, so the website is always searched """
+        return False
+
+    def can_search_locally(self) -> bool:
+        """ Returns True if the website's recipes are in the corpus """
+        return isinstance(self.scraper, WordPressScraper) and self.store.has_site(self.scraper.REQUEST_URL)
+
+    def get_index(self) -> InvertedIndex:
+        """ Returns index of the website's recipes, builds it again if the recipes have changed """
+        with self.lock:
+            version = self.store.get_version(self.scraper.REQUEST_URL)
+            if self.index is None or self.index_version != version:
+                self.index = InvertedIndex(self.store.get_recipes(self.scraper.REQUEST_URL))
+                self.index_version = version
+            return self.index
+
+    def perform_get_recipes(self, ingrs:list, meal_types:list=None, ingrs_match:str=IngrMatch.FULL) -> dict:
+        """ Returns recipes which fulfill the conditions, the same ones the scraper would find on the website """
+        scraper = self.scraper
+        if scraper.exclude_by_params(ingrs, meal_types, ingrs_match):
+            return scraper.data_to_dict([])
+
+        ingrs_copy = ingrs.copy()
+        meal_types_copy = scraper.meal_types_copy(meal_types)
+        index = self.get_index()
+
+        meal_types_ = scraper.get_meal_types_translated(meal_types)
+        if isinstance(scraper, TagsSearchingWordPressScraper):
+            ingrs_, meal_types_ = scraper.prep_data_to_get_tags(ingrs, meal_types_)
+            slugs = scraper.get_tags_slugs(ingrs_)
+            tags = self.store.get_tags(scraper.TAG_URL, slugs)
+            ingrs_ = [tags[slug] for slug in slugs if slug in tags]
+        else:
+            ingrs_ = ingrs
+        ingrs_, meal_types_ = scraper.finally_change_data_to_url(ingrs_, meal_types_)
+
+        if scraper.exclude_before_url(ingrs_, ingrs_copy, meal_types_, meal_types_copy, ingrs_match):
+            return scraper.data_to_dict([])
+
+        if isinstance(scraper, TagsSearchingWordPressScraper):
+            positions = index.find_terms(scraper.tags_name, ingrs_, match_all=ingrs_match == IngrMatch.FULL)
+        else:
+            # live search checks if post's content contains all ingredients, whatever `ingrs_match` is
+            positions = index.find_phrases(ingrs_, match_all=True)
+
+        if meal_types_:
+            positions &= index.find_terms(scraper.get_meal_types_taxonomy(), meal_types_, match_all=False)
+
+        recipes = []
+        for recipe in index.get_recipes(positions):
+            valid_recipe = scraper.get_recipe_from_response(self.to_post(recipe), ingrs_, meal_types_,
+                                                            check_in_soup=False, ingrs_match=ingrs_match)
+            if valid_recipe:
+                recipes.append(valid_recipe)
+
+        data = scraper.data_to_dict(recipes)
+        data = scraper.clean_data(data)
+        return data
+
+    def to_post(self, recipe:dict) -> dict:
+        """ Returns recipe written like post returned by wp-json, so scraper's filters can be used """
+        return {"id": recipe["id"],
+                "title": {"rendered": recipe["title"]},
+                "link": recipe["link"],
+                **recipe["terms"]}
@@ -0,0 +1,146 @@
+import json
+import sqlite3
+import threading
+import time
+
+from src.base import CORPUS_PATH
+
+
+class RecipeStore:
+    """
+    Local (SQLite) corpus of websites' recipe posts. Websites are identified by their REQUEST_URL, their tags
+    (ingredients' taxonomies) by TAG_URL - the same way TagCache does.
+
+    Recipes are dicts: id, title, link, date, modified, terms ({taxonomy: [ids]}, e.x. categories and tags)
+    and text - lowercased text of the post's content, the one ingredients are looked for in.
+    """
+    def __init__(self, path:str=CORPUS_PATH):
+        self.path = path
+
+        self.connection = None  # opened with the first use
+        self.lock = threading.Lock()
+        self.versions = {}  # {site: number of changes}, lets indexes know they're out of date
+
+    def get_connection(self) -> sqlite3.Connection:
+        """ Returns connection to the database, creates the tables if they don't exist """
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS recipes ("
+                                    "site TEXT, post_id INTEGER, title TEXT, link TEXT, date TEXT, modified TEXT, "
+                                    "terms TEXT, text TEXT, updated_at REAL, PRIMARY KEY (site, post_id))")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS tags ("
+                                    "site TEXT, slug TEXT, tag_id INTEGER, PRIMARY KEY (site, slug))")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS sync_state (site TEXT PRIMARY KEY, state TEXT)")
+            self.connection.commit()
+        return self.connection
+
+    def upsert_recipes(self, site:str, recipes:list) -> None:
+        """ Saves new recipes of the website and replaces the changed ones """
+        if not recipes:
+            return
+
+        with self.lock:
+            connection = self.get_connection()
+            self.insert_recipes(connection, site, recipes)
+            connection.commit()
+            self.versions[site] = self.versions.get(site, 0) + 1
+
+    def replace_recipes(self, site:str, recipes:list) -> None:
+        """ Replaces all recipes of the website with the given ones in one transaction """
+        with self.lock:
+            connection = self.get_connection()
+            connection.execute("DELETE FROM recipes WHERE site = ?", [site])
+            self.insert_recipes(connection, site, recipes)
+            connection.commit()
+            self.versions[site] = self.versions.get(site, 0) + 1
+
+    def insert_recipes(self, connection:sqlite3.Connection, site:str, recipes:list) -> None:
+        """ Inserts or replaces the recipes, without committing """
+        now = time.time()
+        rows = [(site, recipe["id"], recipe["title"], recipe["link"], recipe["date"], recipe["modified"],
+                 json.dumps(recipe["terms"]), recipe["text"], now) for recipe in recipes]
+        connection.executemany("INSERT OR REPLACE INTO recipes "
+                               "(site, post_id, title, link, date, modified, terms, text, updated_at) "
+                               "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def delete_recipes(self, site:str, ids:list=None) -> None:
+        """ Removes recipes of the website with given ids or all of them """
+        with self.lock:
+            connection = self.get_connection()
+            if ids is None:
+                connection.execute("DELETE FROM recipes WHERE site = ?", [site])
+            else:
+                connection.executemany("DELETE FROM recipes WHERE site = ? AND post_id = ?",
+                                       [(site, post_id) for post_id in ids])
+            connection.commit()
+            self.versions[site] = self.versions.get(site, 0) + 1
+
+    def get_recipes(self, site:str) -> list:
+        """ Returns all recipes of the website, the newest first """
+        with self.lock:
+            rows = self.get_connection().execute("SELECT post_id, title, link, date, modified, terms, text "
+                                                 "FROM recipes WHERE site = ? ORDER BY date DESC", [site]).fetchall()
+
+        return [{"id": post_id, "title": title, "link": link, "date": date, "modified": modified,
+                 "terms": json.loads(terms), "text": text}
+                for post_id, title, link, date, modified, terms, text in rows]
+
+    def has_site(self, site:str) -> bool:
+        """ Returns True if the website has been crawled """
+        with self.lock:
+            row = self.get_connection().execute("SELECT 1 FROM recipes WHERE site = ? LIMIT 1", [site]).fetchone()
+        return row is not None
+
+    def get_last_modified(self, site:str) -> str or None:
+        """ Returns the latest modification date of the website's recipes or None if there're no recipes """
+        with self.lock:
+            row = self.get_connection().execute("SELECT MAX(modified) FROM recipes WHERE site = ?", [site]).fetchone()
+        return row[0]
+
+    def get_version(self, site:str) -> int:
+        """ Returns number of changes of the website's recipes made by this store """
+        return self.versions.get(site, 0)
+
+    def set_tags(self, site:str, tags:dict) -> None:
+        """ Saves {slug: tag's id} of the website """
+        if not tags:
+            return
+
+        rows = [(site, slug, tag_id) for slug, tag_id in tags.items()]
+        with self.lock:
+            connection = self.get_connection()
+            connection.executemany("INSERT OR REPLACE INTO tags (site, slug, tag_id) VALUES (?, ?, ?)", rows)
+            connection.commit()
+
+    def get_tags(self, site:str, slugs:list) -> dict:
+        """ Returns {slug: tag's id} of the slugs which are the website's tags """
+        if not slugs:
+            return {}
+
+        query = f"SELECT slug, tag_id FROM tags WHERE site = ? AND slug IN ({', '.join('?' * len(slugs))})"
+        with self.lock:
+            rows = self.get_connection().execute(query, [site, *slugs]).fetchall()
+        return dict(rows)
+
+    def get_known_tags_ids(self, site:str, ids:list) -> set:
+        """ Returns ids which are saved as the website's tags """
+        if not ids:
+            return set()
+
+        query = f"SELECT tag_id FROM tags WHERE site = ? AND tag_id IN ({', '.join('?' * len(ids))})"
+        with self.lock:
+            rows = self.get_connection().execute(query, [site, *ids]).fetchall()
+        return {tag_id for tag_id, in rows}
+
+    def get_sync_state(self, site:str) -> dict or None:
+        """ Returns saved state of the website's sync (watermark and timing stats) or None if it's never been synced """
+        with self.lock:
+            row = self.get_connection().execute("SELECT state FROM sync_state WHERE site = ?", [site]).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def set_sync_state(self, site:str, state:dict) -> None:
+        """ Saves state of the website's sync """
+        with self.lock:
+            connection = self.get_connection()
+            connection.execute("INSERT OR REPLACE INTO sync_state (site, state) VALUES (?, ?)", [site, json.dumps(state)])
+            connection.commit()
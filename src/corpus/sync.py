@@ -0,0 +1,146 @@
+import logging
+import threading
+import time
+from urllib.parse import quote
+
+from src.base import CORPUS_SYNC_INTERVAL
+from src.base.base_scrapers import WordPressScraper, TagsSearchingWordPressScraper
+from src.corpus.recipe_store import RecipeStore
+from src.corpus.crawler import CorpusCrawler
+
+
+class CorpusSync:
+    """
+    Keeps the corpus fresh. Website which isn't in the corpus is crawled once, then only posts modified after
+    the website's watermark (the latest `modified` date seen) are pulled with wp-json's `modified_after`
+    and upserted. Usually it's one small request per website.
+
+    Websites ignoring `modified_after` (WordPress older than 5.7) are synced with `after` - only new posts
+    are pulled then, changes of old ones come with the next full crawl.
+    Watermarks and stats of the last sync are saved in the store, so syncs continue after restarts.
+    """
+    PAGE_SIZE = 100  # posts per page, REQUEST_URLs ask for per_page=100
+
+    def __init__(self, store:RecipeStore=None, crawler:CorpusCrawler=None):
+        self.store = RecipeStore() if store is None else store
+        self.crawler = CorpusCrawler(self.store) if crawler is None else crawler
+
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def sync(self, scrapers:list) -> dict:
+        """ Syncs websites of the scrapers which can be crawled, returns {website's name: number of changed posts} """
+        synced = {}
+        for scraper in scrapers:
+            if not self.crawler.can_crawl(scraper):
+                continue
+            try:
+                synced[scraper.NAME] = self.sync_website(scraper)
+            except Exception:
+                logging.exception(f"Sync of {scraper} failed")
+        return synced
+
+    def sync_website(self, scraper:WordPressScraper) -> int:
+        """ Pulls posts changed since the last sync (or all if the website isn't in the corpus), returns their number """
+        site = scraper.REQUEST_URL
+        start = time.monotonic()
+        state = self.store.get_sync_state(site) or {"param": "modified_after", "n_syncs": 0}
+        if state.get("watermark") is None:  # crawled before syncs were used
+            state["watermark"] = self.store.get_last_modified(site)
+
+        if not self.store.has_site(site) or state["watermark"] is None:
+            n_changes = self.crawler.crawl_website(scraper)
+            n_requests = None
+            mode = "full"
+        else:
+            posts, n_requests = self.get_changed_posts(scraper, state["param"], state["watermark"])
+
+            if state["param"] == "modified_after" and any(post["modified"] <= state["watermark"] for post in posts):
+                logging.warning(f"{scraper} ignores `modified_after`, it's synced by `after` from now on")
+                state["param"] = "after"
+                posts = [post for post in posts if post["modified"] > state["watermark"]]
+
+            if isinstance(scraper, TagsSearchingWordPressScraper):
+                self.sync_tags(scraper, posts)
+            self.store.upsert_recipes(site, [self.crawler.get_recipe_from_post(post) for post in posts])
+            n_changes = len(posts)
+            mode = "incremental"
+
+        state.update({"watermark": self.store.get_last_modified(site),
+                      "n_syncs": state["n_syncs"] + 1,
+                      "last_mode": mode,
+                      "last_sync_at": time.time(),
+                      "last_duration": round(time.monotonic() - start, 3),
+                      "last_requests": n_requests,
+                      "last_changes": n_changes})
+        self.store.set_sync_state(site, state)
+        logging.info(f"{scraper} synced ({mode}), {n_changes} changed posts")
+        return n_changes
+
+    def get_changed_posts(self, scraper:WordPressScraper, param:str, watermark:str) -> (list, int):
+        """ Returns posts modified (or published if param is 'after') after the watermark and number of requests """
+        url = f"{scraper.REQUEST_URL}&{param}={quote(watermark)}&orderby=modified&order=asc"
+
+        posts = []
+        n_requests = 0
+        for n_page in range(1, self.crawler.max_pages + 1):
+            # responses cache is omitted, cached list of changes wouldn't show the newest ones
+            response = scraper.send_get_request(self.crawler.get_page_url(url, n_page), scraper.HEADERS)
+            n_requests += 1
+            if not response.ok:
+                if n_page == 1:
+                    raise Exception(f"Sync request failed, code: {response.status_code}, url {response.url}")
+                break  # wp-json answers 400 to a page after the last one
+
+            page_posts = response.json()
+            posts.extend(page_posts)
+            if len(page_posts) < self.PAGE_SIZE:
+                break
+        return posts, n_requests
+
+    def sync_tags(self, scraper:TagsSearchingWordPressScraper, posts:list) -> None:
+        """ Saves tags of the posts which aren't in the corpus yet - e.x. the ones added with the posts """
+        ids = {tag_id for post in posts for tag_id in post.get(scraper.tags_name, [])}
+        missing_ids = sorted(ids - self.store.get_known_tags_ids(scraper.TAG_URL, list(ids)))
+
+        tags_url = scraper.TAG_URL.split("?")[0]
+        tags = {}
+        for start in range(0, len(missing_ids), self.PAGE_SIZE):
+            include = ",".join(str(tag_id) for tag_id in missing_ids[start:start + self.PAGE_SIZE])
+            response = scraper.send_get_request(f"{tags_url}?per_page={self.PAGE_SIZE}&include={include}",
+                                                scraper.HEADERS)
+            if response.ok:
+                tags.update(self.crawler.get_tags_from_list(response.json()))
+        self.store.set_tags(scraper.TAG_URL, tags)
+
+    def get_stats(self, scrapers:list) -> dict:
+        """ Returns {website's name: saved state of its sync} of the scrapers which have been synced """
+        stats = {}
+        for scraper in scrapers:
+            if self.crawler.can_crawl(scraper):
+                state = self.store.get_sync_state(scraper.REQUEST_URL)
+                if state is not None:
+                    stats[scraper.NAME] = state
+        return stats
+
+    def start(self, scrapers:list, interval:float=CORPUS_SYNC_INTERVAL) -> None:
+        """ Starts syncing the websites every `interval` seconds in a background thread """
+        if self.thread is not None and self.thread.is_alive():
+            return
+
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, args=(scrapers, interval), name="corpus-sync", daemon=True)
+        self.thread.start()
+
+    def run(self, scrapers:list, interval:float) -> None:
+        """ Syncs the websites until the sync is stopped """
+        while not self.stopped.is_set():
+            self.sync(scrapers)
+            self.stopped.wait(interval)
+
+    def stop(self) -> None:
+        """ Stops the background sync, waits for the current one to end """
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
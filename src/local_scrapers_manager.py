@@ -0,0 +1,53 @@
+import logging
+
+from scrapers_manager import ScraperManager
+from src.base import CORPUS_SYNC_INTERVAL
+from src.corpus import RecipeStore, CorpusSync, LocalScraper
+
+
+class LocalScraperManager(ScraperManager):
+    """
+    Manager searching WordPress websites in the local corpus, without any requests. Websites which
+    can't be crawled or haven't been crawled yet are searched live:
+
+        sm = LocalScraperManager(precise=False)
+        sm.crawl()  # once, the corpus is kept on disk
+        sm.start_sync()  # pulls only posts changed since the last sync, every 15 minutes
+        recipes = sm.get_recipes(ingrs=ingrs, meal_types=types, ingrs_match=IngrMatch.PART)
+    """
+    def __init__(self, precise=False, store:RecipeStore=None):
+        self.store = RecipeStore() if store is None else store
+        self.corpus_sync = CorpusSync(self.store)
+        super().__init__(precise)
+
+    def create_scraper(self, scraper_class):
+        """ Returns scraper searching the corpus, falling back to the website """
+        return LocalScraper(scraper_class(), self.store)
+
+    def crawl(self) -> dict:
+        """ Pulls recipes of all WordPress websites into the corpus, returns {website's name: number of recipes} """
+        crawled = self.corpus_sync.crawler.crawl(self.get_websites_scrapers())
+        logging.info(f"Corpus crawled: {crawled}")
+        return crawled
+
+    def sync(self) -> dict:
+        """ Pulls posts changed since the last sync into the corpus, returns {website's name: number of changes} """
+        synced = self.corpus_sync.sync(self.get_websites_scrapers())
+        logging.info(f"Corpus synced: {synced}")
+        return synced
+
+    def start_sync(self, interval:float=CORPUS_SYNC_INTERVAL) -> None:
+        """ Starts syncing the corpus every `interval` seconds in a background thread """
+        self.corpus_sync.start(self.get_websites_scrapers(), interval)
+
+    def stop_sync(self) -> None:
+        """ Stops the background sync """
+        self.corpus_sync.stop()
+
+    def get_sync_stats(self) -> dict:
+        """ Returns {website's name: watermark and stats of its last sync} """
+        return self.corpus_sync.get_stats(self.get_websites_scrapers())
+
+    def get_websites_scrapers(self) -> list:
+        """ Returns scrapers of the websites (the ones LocalScrapers fall back to) """
+        return [scraper.scraper for scraper in self.scrapers]
@@ -1,27 +1,60 @@
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import contextvars
+import copy
 from datetime import datetime
 import logging
+import threading
+import time
 
 from scrapers_dict import scrapers_
-from src.base import ParamsValidator
+from src.base import ParamsValidator, Deadline, DeadlineExceeded, run_with_deadline, deduplicate_recipes, TopRecipes, RankBy, \
+    METRICS, SearchCache, SEARCH_WORKERS, SEARCH_MIN_WORKERS
 
 class ScraperManager:
+    METRICS = METRICS  # shared with the scrapers, see `get_metrics`
+    SEARCH_CACHE = SearchCache()  # shared by all managers, set to None to search every time
+    # threads shared by all searches of all managers, so one manager may serve many searches at the same time
+    SEARCH_EXECUTOR = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="scrapers")
+    SEARCH_WORKERS = SEARCH_WORKERS
+    SEARCH_MIN_WORKERS = SEARCH_MIN_WORKERS  # scrapers of one search submitted at the same time at least
+    active_searches = 0  # searches running in SEARCH_EXECUTOR at the moment, of all managers
+    active_searches_lock = threading.Lock()
+
     def __init__(self, precise=False):
         self.logger_setup()
+        self.precise = precise
+        self.scrapers = [self.create_scraper(scraper) for scraper in self.get_scrapers_classes(precise)]
+        self.scrapers_by_name = {scraper.NAME: scraper for scraper in self.scrapers}
+
+    def get_scrapers_classes(self, precise=False) -> list:
+        """ Returns classes of scrapers used in the search - only precise ones if `precise` is True """
         if precise:
-            self.scrapers = [scraper() for scraper in scrapers_.values() if scraper.PRECISE_SEARCH is True]
-        else:
-            self.scrapers = [scraper() for scraper in scrapers_.values()]
+            return [scraper for scraper in scrapers_.values() if scraper.PRECISE_SEARCH is True]
+        return list(scrapers_.values())
 
-        self.manager_response = {
+    def create_scraper(self, scraper_class):
+        """ Returns scraper's instance used by the manager """
+        return scraper_class()
+
+    def get_empty_response(self) -> dict:
+        """ Returns manager's response with no errors and no recipes """
+        return {
             "error": {"ingrs": "", "meal_types": "", "ingrs_match": "", "other": ""},
             "msg": "",
             "recipes": [],
             "number_of_recipes": 0,
+            "incomplete": [],  # names of websites which weren't searched before the deadline
         }
 
     def get_recipes(self, *args, **kwargs):
-        """ Returns get_recipes function, running the program or raises an exception """
+        """
+        Returns get_recipes function, running the program or raises an exception.
+        `deadline` (seconds) limits time of the whole search - recipes of websites searched before it are returned
+        and the rest of websites is listed in response's 'incomplete'.
+        `limit` and/or `rank_by` (RankBy) rank recipes - only `limit` best ones (all of them if `limit` isn't given)
+        are returned, each with its 'rank', see TopRecipes.
+        Responses of complete searches are cached (see SearchCache), the same search is answered from the cache
+        """
         try:
             return self.perform_get_recipes(*args, **kwargs)
         except Exception:
@@ -29,32 +62,196 @@ class ScraperManager:
 
     def perform_get_recipes(self, *args, **kwargs):
         """ Main function managing scrapers and returning info about found recipes """
+        manager_response = None
+        for manager_response in self.iter_recipes(*args, **kwargs):
+            pass  # the last yielded value is the manager's response
+        return manager_response
 
-        logging.info(f"New search: {kwargs}")
+    def iter_recipes(self, *args, deadline:float=None, limit:int=None, rank_by:str=None, **kwargs):
+        """
+        Generator managing scrapers - yields website's recipes (dict like the ones in response's 'recipes')
+        as soon as the website is searched, in order of finishing. The last yielded value is manager's response
+        with all recipes and `number_of_recipes`, like the one returned by `get_recipes`.
+        State of the search is kept in the generator, so one manager may run many searches at the same time
+        """
+
+        kwargs, manager_response, search_key, ready_response = self.start_search(args, kwargs, limit, rank_by)
+        if ready_response is not None:
+            yield from self.iter_cached_response(ready_response)
+            return
 
-        self.args = args
+        yield from self.iter_search(args, kwargs, manager_response, deadline, limit, rank_by, search_key)
+
+    def iter_search(self, args:tuple, kwargs:dict, manager_response:dict, deadline:float=None,
+                    limit:int=None, rank_by:str=None, search_key:tuple=None):
+        """ Searches the websites with validated params, yields like `iter_recipes` and caches complete response """
+        search = self.get_search_state(kwargs, limit, rank_by)
+        search_deadline = Deadline(deadline) if deadline is not None else None
+        for web_recipes in self.iter_scrapers_recipes(self.scrapers, args, kwargs, search_deadline):
+            yield self.add_web_recipes(search, web_recipes)
+        yield self.finish_search(search, manager_response, search_key)
+
+    def start_search(self, args:tuple, kwargs:dict, limit:int=None, rank_by:str=None) -> (dict, dict, tuple, dict):
+        """
+        Validates params of the search and looks it up in the search cache, shared by sync and async managers.
+        Returns (validated params, manager's response, search's key, ready response) - ready response
+        (invalid params' one or cached one) is None if the websites have to be searched
+        """
+        logging.info(f"New search: {kwargs}")
 
         logging.debug("Validation starts")
         validator = ParamsValidator()
-        can_continue, self.kwargs, self.manager_response = \
-            validator.validation(params=kwargs, response=self.manager_response)
+        can_continue, kwargs, manager_response = \
+            validator.validation(params=kwargs, response=self.get_empty_response())
+        is_ranking_valid, manager_response = validator.is_ranking_valid(limit, rank_by, manager_response)
+        can_continue = can_continue and is_ranking_valid
         logging.debug("Validation ended")
 
         if not can_continue:
-            logging.warning(f"Program can't continue, invalid params. Returned response {self.manager_response}")
-            return self.manager_response
+            logging.warning(f"Program can't continue, invalid params. Returned response {manager_response}")
+            return kwargs, manager_response, None, manager_response
+
+        search_key = self.get_search_key(kwargs, limit, rank_by)
+        cached_response = self.get_cached_response(search_key, manager_response, args, kwargs, limit, rank_by)
+        return kwargs, manager_response, search_key, cached_response
+
+    def get_search_state(self, kwargs:dict, limit:int=None, rank_by:str=None) -> dict:
+        """ Returns state of a new search - its start, recipes found so far and searched websites """
+        return {"start": datetime.now(),
+                "start_time": time.perf_counter(),
+                "top_recipes": self.get_top_recipes(limit, rank_by, kwargs["ingrs"]),
+                "recipes": [],
+                "searched_webs": [],
+                "seen_keys": set()}  # recipes already yielded, the same recipe may be found on many websites
 
-        start = datetime.now()
+    def add_web_recipes(self, search:dict, web_recipes:dict) -> dict:
+        """ Adds website's recipes to the search's ones and returns them without the already found ones """
+        web_recipes = self.remove_duplicates(web_recipes, search["seen_keys"])
+        if not search["searched_webs"]:
+            self.METRICS.first_result_seconds.observe(time.perf_counter() - search["start_time"])
+        search["searched_webs"].append(web_recipes["web_name"])
+        self.add_recipes(search["recipes"], search["top_recipes"], web_recipes)
+        return web_recipes
 
-        recipes = self.manage_many_scrapers_at_once(self.scrapers)
+    def finish_search(self, search:dict, manager_response:dict, search_key:tuple=None) -> dict:
+        """ Returns manager's response with all recipes of the search and caches it if the search is complete """
         logging.debug("Recipes are ready")
 
-        taken_time = round((datetime.now()-start).total_seconds(), 2)
+        recipes = search["recipes"]
+        if search["top_recipes"] is not None:
+            recipes = search["top_recipes"].get_websites_recipes()
+
+        manager_response["incomplete"] = [scraper.NAME for scraper in self.scrapers
+                                          if scraper.NAME not in search["searched_webs"]]
+        if manager_response["incomplete"]:
+            logging.warning(f"Websites not searched before the deadline: {manager_response['incomplete']}")
+        for web_name in manager_response["incomplete"]:
+            self.METRICS.incomplete.inc(scraper=web_name)
+        self.METRICS.total_seconds.observe(time.perf_counter() - search["start_time"])
+
+        taken_time = round((datetime.now() - search["start"]).total_seconds(), 2)
         logging.info(f"Time taken: {taken_time}s")
 
-        self.manager_response["recipes"] = recipes
-        self.manager_response["number_of_recipes"] = sum([recipe["n_recipes"] for recipe in recipes])
-        return self.manager_response
+        manager_response["recipes"] = recipes
+        manager_response["number_of_recipes"] = sum([recipe["n_recipes"] for recipe in recipes])
+        self.save_response(search_key, manager_response)
+        return manager_response
+
+    def get_search_key(self, params:dict, limit:int=None, rank_by:str=None) -> tuple or None:
+        """ Returns key of the search in the search cache """
+        if self.SEARCH_CACHE is None:
+            return None
+        return self.SEARCH_CACHE.get_key(params, precise=self.precise, limit=limit, rank_by=rank_by)
+
+    def get_cached_response(self, search_key:tuple, manager_response:dict, args:tuple, kwargs:dict,
+                            limit:int=None, rank_by:str=None) -> dict or None:
+        """ Returns cached response of the search or None, refreshes the search in the background if it's stale """
+        if self.SEARCH_CACHE is None:
+            return None
+
+        response, is_stale = self.SEARCH_CACHE.get(search_key)
+        if response is None:
+            return None
+
+        if is_stale and self.SEARCH_CACHE.start_refresh(search_key):
+            self.refresh_in_background(search_key, args, kwargs, limit, rank_by)
+        response["msg"] = manager_response["msg"]  # warnings of this search's params
+        logging.info(f"Response from the search cache, stale: {is_stale}")
+        return response
+
+    def iter_cached_response(self, response:dict):
+        """ Yields cached websites' recipes and the response, like `iter_recipes` """
+        yield from response["recipes"]
+        yield response
+
+    def save_response(self, search_key:tuple, response:dict) -> None:
+        """ Saves response in the search cache if all websites have been searched """
+        if self.SEARCH_CACHE is not None and search_key is not None and not response["incomplete"]:
+            self.SEARCH_CACHE.set(search_key, response)
+
+    def refresh_in_background(self, search_key:tuple, args:tuple, kwargs:dict, limit:int=None, rank_by:str=None) -> None:
+        """ Searches again in a background thread and saves the new response in the search cache """
+        threading.Thread(target=self.refresh_search, args=(search_key, args, copy.deepcopy(kwargs), limit, rank_by),
+                         name="search-cache-refresh", daemon=True).start()
+
+    def refresh_search(self, search_key:tuple, args:tuple, kwargs:dict, limit:int=None, rank_by:str=None) -> None:
+        try:
+            for _ in self.iter_search(args, kwargs, self.get_empty_response(), None, limit, rank_by, search_key):
+                pass
+        except Exception:
+            logging.exception("Refresh of the cached search failed")
+        finally:
+            self.SEARCH_CACHE.end_refresh(search_key)
+
+    def get_top_recipes(self, limit:int, rank_by:str, ingrs:list) -> TopRecipes or None:
+        """ Returns TopRecipes keeping the best recipes of the search or None if recipes aren't ranked """
+        if limit is None and rank_by is None:
+            return None
+        return TopRecipes(limit, ingrs, RankBy.INGREDIENTS if rank_by is None else rank_by)
+
+    def add_recipes(self, recipes:list, top_recipes:TopRecipes, web_recipes:dict) -> None:
+        """ Adds website's recipes to the search's ones - all of them or, if recipes are ranked, the best ones """
+        if top_recipes is None:
+            recipes.append(web_recipes)
+        elif web_recipes["web_name"] not in self.scrapers_by_name:
+            top_recipes.add(web_recipes)
+        else:
+            # recipes of english websites are ranked by the translated ingredients
+            scraper = self.scrapers_by_name[web_recipes["web_name"]]
+            top_recipes.add(web_recipes, scraper.PRECISE_SEARCH, scraper.get_website_ingrs(top_recipes.ingrs))
+
+    def get_metrics(self) -> dict:
+        """
+        Returns snapshot of the metrics of all searches - per website (requests' latency, responses' size,
+        parse time, recipes, errors, timeouts, cache) and per search (time to the first result, whole time)
+        """
+        return self.METRICS.snapshot()
+
+    def get_metrics_text(self) -> str:
+        """ Returns the metrics in Prometheus' text format """
+        return self.METRICS.render()
+
+    def remove_duplicates(self, web_recipes:dict, seen_keys:set) -> dict:
+        """
+        Removes website's recipes which have been already returned in the search (by this or other website),
+        recipes are compared by their canonical links. Keys of the rest are added to `seen_keys`
+        """
+        unique_recipes = deduplicate_recipes(web_recipes["recipes"], seen_keys)
+        if len(unique_recipes) != len(web_recipes["recipes"]):
+            logging.debug(f"{web_recipes['web_name']} - {len(web_recipes['recipes']) - len(unique_recipes)} "
+                          f"duplicated recipes have been removed")
+        web_recipes["recipes"] = unique_recipes
+        web_recipes["n_recipes"] = len(unique_recipes)
+        return web_recipes
+
+    def preload_tags(self, ingrs:list) -> None:
+        """ Saves in the tags' cache tags of the ingredients on all websites searching by tags """
+        for scraper in self.scrapers:
+            if hasattr(scraper, "preload_tags"):
+                try:
+                    scraper.preload_tags(ingrs)
+                except Exception:
+                    logging.error(f"Tags of {scraper} weren't preloaded")
 
     def logger_setup(self):
         """ Config of the project's logger """
@@ -64,24 +261,93 @@ class ScraperManager:
                             format='[%(asctime)s] [%(levelname)s] | %(message)s',
                             datefmt='%Y-%m-%d %H:%M:%S')
 
-    def manage_many_scrapers_at_once(self, scrapers=None):
+    def manage_many_scrapers_at_once(self, scrapers=None, args:tuple=(), kwargs:dict=None) -> list:
         """ The function is responsible for multithreading """
-        recipes = []
+        recipes = list(self.iter_scrapers_recipes(scrapers, args, kwargs))
+        logging.debug("Multithreading finished")
 
-        def make_request(scraper):
-            args = self.args
-            kwargs = self.kwargs
-            web_recipes = scraper.get_recipes(*args, **kwargs)
-            logging.debug(f"{scraper.NAME} - recipes will be added immediately")
-            recipes.append(web_recipes)
-            logging.debug(f"{scraper.NAME} - recipes have been added")
+        return recipes
 
-        def make_all_requests(scrapers) -> None:
-            with ThreadPoolExecutor(max_workers=30) as executor:
-                executor.map(make_request, scrapers)
-                logging.debug("Mapping has been finished")
+    def iter_scrapers_recipes(self, scrapers=None, args:tuple=(), kwargs:dict=None, deadline:Deadline=None):
+        """
+        Runs scrapers in threads shared by all searches (SEARCH_EXECUTOR) and yields their recipes in order
+        of finishing. The search gets its share of the threads (see `get_search_workers`) - the next scraper
+        is submitted when one of them finishes, so scrapers of concurrent searches take turns in the threads.
+        The share is applied only when scrapers are submitted - scrapers submitted before another search
+        started (e.x. all scrapers of a search which was alone) keep their places in the executor's queue,
+        so the new search's scrapers wait for them and get their share as they finish.
+        Scrapers which haven't finished before the deadline are dropped - their requests and paging loops
+        stop as soon as they see the deadline has passed. Dropped scrapers and the ones which missed the deadline
+        (raised DeadlineExceeded) aren't yielded, so they're listed in response's 'incomplete'
+        """
+        kwargs = kwargs or {}
+        scrapers, empty_webs_recipes = self.split_known_empty(scrapers, args, kwargs)
+        scrapers = iter(scrapers)
+        futures = set()
 
-        make_all_requests(scrapers)
-        logging.debug("Multithreading finished")
+        def submit_next_scrapers():
+            # share is checked on every submit, so the search gets more threads when other searches finish
+            while len(futures) < self.get_search_workers():
+                scraper = next(scrapers, None)
+                if scraper is None:
+                    return
+                futures.add(self.SEARCH_EXECUTOR.submit(contextvars.copy_context().run, run_with_deadline, deadline,
+                                                        scraper.get_recipes, *args, **kwargs))
 
-        return recipes
+        self.add_active_search(1)
+        try:
+            submit_next_scrapers()
+            logging.debug("Scrapers have been submitted")
+
+            while futures:
+                timeout = deadline.remaining() if deadline is not None else None
+                done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    logging.debug("Search's deadline has passed")
+                    break
+
+                futures.difference_update(done)
+                submit_next_scrapers()
+                for future in done:
+                    try:
+                        web_recipes = future.result()
+                    except DeadlineExceeded:
+                        continue
+                    logging.debug(f"{web_recipes['web_name']} - recipes have been added")
+                    yield web_recipes
+        finally:
+            self.add_active_search(-1)
+            # scrapers which haven't started yet are cancelled, the running ones end on their next request
+            for future in futures:
+                future.cancel()
+        yield from empty_webs_recipes
+
+    def add_active_search(self, n:int) -> None:
+        """ Adds `n` to the number of searches running in SEARCH_EXECUTOR (negative when they finish) """
+        with ScraperManager.active_searches_lock:
+            ScraperManager.active_searches += n
+
+    def get_search_workers(self) -> int:
+        """
+        Returns number of scrapers one search may submit to SEARCH_EXECUTOR at the same time - all its threads
+        if it's the only search, their equal share under load, but never less than SEARCH_MIN_WORKERS
+        """
+        active_searches = max(1, ScraperManager.active_searches)
+        return max(self.SEARCH_MIN_WORKERS, self.SEARCH_WORKERS // active_searches)
+
+    def split_known_empty(self, scrapers:list, args:tuple, kwargs:dict) -> (list, list):
+        """
+        Returns scrapers which have to be searched and empty recipes of the other ones - websites known to have
+        no recipes for the search (see `BaseScraper.NEGATIVE_CACHE`), which aren't searched at all
+        """
+        searched_scrapers = []
+        empty_webs_recipes = []
+        for scraper in scrapers:
+            if scraper.is_known_empty(*args, **kwargs):
+                self.METRICS.known_empty.inc(scraper=scraper.NAME)
+                empty_webs_recipes.append(scraper.data_to_dict([]))
+            else:
+                searched_scrapers.append(scraper)
+        if empty_webs_recipes:
+            logging.debug(f"Websites without recipes for the search: {[web['web_name'] for web in empty_webs_recipes]}")
+        return searched_scrapers, empty_webs_recipes
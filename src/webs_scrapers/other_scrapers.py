@@ -5,6 +5,7 @@ from bs4 import BeautifulSoup
 from src.base.base_scrapers import BaseScraper
 from src.base import CuisineType, MealType, IngrMatch  # classes
 from src.base import REQUEST_FAILED_MSG, EXCEPTION_LOG_MSG  # strings
+from src.base import DeadlineExceeded, PagesBudget
 
 
 class JadlonomiaScraper(BaseScraper):
@@ -45,9 +46,8 @@ class JadlonomiaScraper(BaseScraper):
 
         response = response.text
 
-        recipes = []  # add scrapped recipes to list
-        for recipe in self.get_data_from_response(response):
-            recipes.append(recipe)
+        with self.measure_parse():
+            recipes = self.parse("get_data_from_response", response, size=len(response))  # add scrapped recipes to list
 
         data = self.data_to_dict(recipes)  # add data to dict
         data = self.clean_data(data)  # clean data
@@ -139,34 +139,30 @@ class WeganonScraper(BaseScraper):
 
     def get_full_match_recipes(self, ingrs:list, meal_types:list=None) -> list:
         """ Return list of recipes which ingredients match fully """
-        recipes = []
-        for recipe in self.get_match_recipes(ingrs, meal_types):
-            if recipe not in recipes:
-                recipes.append(recipe)
+        recipes = self.deduplicate_recipes(self.get_match_recipes(ingrs, meal_types))
         return recipes
 
     def get_partial_match_recipes(self, ingrs:list, meal_types:list=None) -> list:
-        """ Return list of recipes which ingredients match partially """
+        """ Return list of recipes which ingredients match partially, searches for all not cached ingredients at the same time """
         recipes = []
+        seen_keys = set()
 
-        for ingr in ingrs:
-            for recipe in self.get_match_recipes([ingr], meal_types=meal_types):
-                if recipe not in recipes:
-                    recipes.append(recipe)
+        # pagings of all ingredients share the search's limit of wasted pages
+        budget = PagesBudget(self.MAX_WASTED_PAGES)
+        ingrs_recipes = self.get_fragments(
+            ingrs, meal_types, lambda ingr: list(self.get_match_recipes([ingr], meal_types, budget)))
+        for ingr_recipes in ingrs_recipes:
+            recipes.extend(self.deduplicate_recipes(ingr_recipes, seen_keys))
 
         return recipes
 
-    def get_match_recipes(self, ingrs:list, meal_types:list=None) -> dict:
+    def get_match_recipes(self, ingrs:list, meal_types:list=None, budget:PagesBudget=None) -> dict:
         """ Creates and makes requests and yields recipes which are returns in the requests """
-        for url in self.get_url(ingrs, meal_types):
-
-            response = self.get_response_from_request_with_404(url)
-            # loops through next pages: 1st, 2nd, 3rd so on and stops when ther's no such page (status_code 404 occurs) -
-            if response.status_code == 404:
-                break
-
-            for recipe in self.get_data_from_response(response.text):
-                yield recipe
+        # gets next pages: 1st, 2nd, 3rd so on until there's no such page (status_code 404 occurs)
+        for response in self.get_pages_responses(self.get_url(ingrs, meal_types), budget):
+            with self.measure_parse():
+                recipes = self.parse("get_data_from_response", response.text, size=len(response.content))
+            yield from recipes
 
     def get_data_from_response(self, web_response:str=None, ingrs:list=None, meal_types:list=None, *args, **kwargs) -> dict:
         """ Gets web's response and returns dictionary with recipes' title and link """
@@ -248,23 +244,17 @@ class VeganbandaScraper(BaseScraper):
         recipes = []
 
         try:
-            for url in self.get_url(ingrs, meal_types,ingrs_match, web_url):
-
-                response = self.get_response_from_request_with_404(url)
-                # loops through pages: 1st, 2nd, 3rd and so on and when there's no more (response with status code 404 occurs), stops
-                if response.status_code == 404:
-                    break
-                if self.NOT_FOUND_RECIPES_MSG in response.text:
-                    break
-
-                for recipe in self.get_data_from_response(response.text):
-                    if recipe not in recipes:
-                        recipes.append(recipe)
+            # gets pages: 1st, 2nd, 3rd and so on until there's no more (response with status code 404 occurs)
+            for response in self.get_pages_responses(self.get_url(ingrs, meal_types, ingrs_match, web_url)):
+                with self.measure_parse():
+                    recipes.extend(self.parse("get_data_from_response", response.text, size=len(response.content)))
 
+        except DeadlineExceeded:
+            raise  # the search is incomplete, it mustn't look as if the website had no recipes
         except Exception:
             logging.exception(EXCEPTION_LOG_MSG)
 
-        return recipes
+        return self.deduplicate_recipes(recipes)
 
     def get_data_from_response(self, web_response:str=None, ingrs:list=None, meal_types:list=None, *args, **kwargs) -> dict:
         """ Gets websites response and yields recipes """
@@ -356,23 +346,17 @@ class EkspresjaSmakuScraper(BaseScraper):
         recipes = []
 
         try:
-            for url in self.get_url(ingrs, meal_types,ingrs_match, web_url):
-
-                response = self.get_response_from_request_with_404(url)
-                # loops through pages: 1st, 2nd, 3rd and so on and when there's no more (response with status code 404 occurs), stops
-                if response.status_code == 404:
-                    break
-                if self.NOT_FOUND_RECIPES_MSG in response.text:
-                    break
-
-                for recipe in self.get_data_from_response(response.text):
-                    if recipe not in recipes:
-                        recipes.append(recipe)
+            # gets pages: 1st, 2nd, 3rd and so on until there's no more (response with status code 404 occurs)
+            for response in self.get_pages_responses(self.get_url(ingrs, meal_types, ingrs_match, web_url)):
+                with self.measure_parse():
+                    recipes.extend(self.parse("get_data_from_response", response.text, size=len(response.content)))
 
+        except DeadlineExceeded:
+            raise  # the search is incomplete, it mustn't look as if the website had no recipes
         except Exception:
             logging.exception(EXCEPTION_LOG_MSG)
 
-        return recipes
+        return self.deduplicate_recipes(recipes)
 
     def get_data_from_response(self, web_response:str=None, ingrs:list=None, meal_types:list=None, *args, **kwargs) -> dict:
         """ Gets websites response and yields recipes """
@@ -461,22 +445,19 @@ class WegannerdScraper(BaseScraper):
         return data
 
     def get_partial_match_recipes(self, ingrs:list) -> list:
-        """ Return list of recipes which ingredients match partially """
+        """ Return list of recipes which ingredients match partially, searches for all not cached ingredients at the same time """
         recipes = []
+        seen_keys = set()
 
-        for ingr in ingrs:
-            for recipe in self.get_match_recipes([ingr]):
-                if recipe not in recipes:
-                    recipes.append(recipe)
+        ingrs_recipes = self.get_fragments(ingrs, None, lambda ingr: list(self.get_match_recipes([ingr])))
+        for ingr_recipes in ingrs_recipes:
+            recipes.extend(self.deduplicate_recipes(ingr_recipes, seen_keys))
 
         return recipes
 
     def get_full_match_recipes(self, ingrs:list) -> list:
         """ Return list of recipes which ingredients match fully """
-        recipes = []
-        for recipe in self.get_match_recipes(ingrs):
-            if recipe not in recipes:
-                recipes.append(recipe)
+        recipes = self.deduplicate_recipes(self.get_match_recipes(ingrs))
 
         return recipes
 
@@ -485,8 +466,9 @@ class WegannerdScraper(BaseScraper):
         url = self.get_url(ingrs)
         response = self.get_response_from_request(url)
 
-        for recipe in self.get_data_from_response(response.text):
-            yield recipe
+        with self.measure_parse():
+            recipes = self.parse("get_data_from_response", response.text, size=len(response.content))
+        yield from recipes
 
     def get_data_from_response(self, web_resp:str=None, ingrs:list=None, meal_types:list=None, *args, **kwargs) -> dict:
         """ Gets websites response, makes html scraping and yields recipes """
@@ -549,22 +531,19 @@ class TrueTasteHuntersScraper(BaseScraper):
         return data
 
     def get_partial_match_recipes(self, ingrs:list) -> list:
-        """ Return list of recipes which ingredients match partially """
+        """ Return list of recipes which ingredients match partially, searches for all not cached ingredients at the same time """
         recipes = []
+        seen_keys = set()
 
-        for ingr in ingrs:
-            for recipe in self.get_match_recipes([ingr]):
-                if recipe not in recipes:
-                    recipes.append(recipe)
+        ingrs_recipes = self.get_fragments(ingrs, None, lambda ingr: list(self.get_match_recipes([ingr])))
+        for ingr_recipes in ingrs_recipes:
+            recipes.extend(self.deduplicate_recipes(ingr_recipes, seen_keys))
 
         return recipes
 
     def get_full_match_recipes(self, ingrs:list) -> list:
         """ Return list of recipes which ingredients match fully """
-        recipes = []
-        for recipe in self.get_match_recipes(ingrs):
-            if recipe not in recipes:
-                recipes.append(recipe)
+        recipes = self.deduplicate_recipes(self.get_match_recipes(ingrs))
 
         return recipes
 
@@ -573,9 +552,10 @@ class TrueTasteHuntersScraper(BaseScraper):
         url = self.get_url(ingrs)
         response = self.get_response_from_request(url)
 
-        for recipe in self.get_data_from_response(response.text):
-            if not self.do_exclude_recipe(recipe):
-                yield recipe
+        with self.measure_parse():
+            recipes = [recipe for recipe in self.parse("get_data_from_response", response.text, size=len(response.content))
+                       if not self.do_exclude_recipe(recipe)]
+        yield from recipes
 
     def get_data_from_response(self, web_resp:str=None, ingrs:list=None, meal_types:list=None, *args, **kwargs) -> dict:
         """ Gets websites response, makes html scraping and yields recipes """
@@ -653,22 +633,18 @@ class WegankaScraper(BaseScraper):
 
     def get_full_match_recipes(self, ingrs:list) -> list:
         """ Return list of recipes which ingredients match fully """
-        recipes = []
-
-        for recipe in self.get_match_recipes(ingrs):
-            if recipe not in recipes:
-                recipes.append(recipe)
+        recipes = self.deduplicate_recipes(self.get_match_recipes(ingrs))
 
         return recipes
 
     def get_partial_match_recipes(self, ingrs:list) -> list:
-        """ Return list of recipes which ingredients match partially """
+        """ Return list of recipes which ingredients match partially, searches for all not cached ingredients at the same time """
         recipes = []
+        seen_keys = set()
 
-        for ingr in ingrs:
-            for recipe in self.get_match_recipes([ingr]):
-                if recipe not in recipes:
-                    recipes.append(recipe)
+        ingrs_recipes = self.get_fragments(ingrs, None, lambda ingr: list(self.get_match_recipes([ingr])))
+        for ingr_recipes in ingrs_recipes:
+            recipes.extend(self.deduplicate_recipes(ingr_recipes, seen_keys))
 
         return recipes
 
@@ -677,8 +653,9 @@ class WegankaScraper(BaseScraper):
         url = self.get_url(ingrs)
         response = self.get_response_from_request(url)
 
-        for recipe in self.get_data_from_response(response.text):
-            yield recipe
+        with self.measure_parse():
+            recipes = self.parse("get_data_from_response", response.text, size=len(response.content))
+        yield from recipes
 
     def get_data_from_response(self, web_resp:str=None, ingrs:list=None, meal_types:list=None, *args, **kwargs) -> dict:
         """ Gets websites response, makes html scraping and yields recipes """
@@ -10,6 +10,7 @@ class OhMyVeggiesScraper(TagsSearchingWordPressScraper):
     NAME = "Oh My Veggies"
     DIET = CuisineType.VEGETARIAN
     WEB_URL = "https://ohmyveggies.com"
+    ENG_WEB = True
 
     TAG_URL = WEB_URL + "/wp-json/wp/v2/tags?slug="
 
@@ -395,6 +396,7 @@ class HealthyLivingJamesScraper(TagsSearchingWordPressScraper):
     NAME = "Healthy Living James"
     DIET = CuisineType.REGULAR
     WEB_URL = "https://healthylivingjames.co.uk"
+    ENG_WEB = True
 
     TAG_URL = WEB_URL + "/wp-json/wp/v2/tags?slug="
 
@@ -458,6 +460,7 @@ class VeganRichaScraper(TagsSearchingWordPressScraper):
     NAME = "Vegan Richa"
     DIET = CuisineType.VEGAN
     WEB_URL = "https://www.veganricha.com"
+    ENG_WEB = True
 
     TAG_URL = WEB_URL + "/wp-json/wp/v2/tags?slug="
 